@@ -0,0 +1,275 @@
+"""Automatic focus-distance search for recorded holograms.
+
+The hologram spectrum is computed once per search and every candidate
+distance only costs a kernel multiply and an inverse FFT. Instead of a
+dense sweep the search evaluates a coarse grid and then refines around
+the best plane (or runs a golden-section search inside that bracket), so
+a focus distance is usually found with a few dozen reconstructions.
+"""
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from reconstruction import (DEFAULT_PIXEL_PITCH, DEFAULT_WAVELENGTH, fft2, ifft2,
+                            kernels_from_offset, to_gray, wavenumber_offset)
+
+SEARCHES = ("coarse_to_fine", "golden")
+
+# -- Sharpness metrics ---------------------------------------------------------
+# Each metric takes a float32 amplitude plane and returns a float that is
+# largest at best focus. Register new ones with @register_metric("name").
+METRICS = {}
+DEFAULT_METRIC = "gradient_variance"
+
+
+def register_metric(name):
+    def decorator(func):
+        METRICS[name] = func
+        return func
+    return decorator
+
+
+@register_metric("gradient_variance")
+def gradient_variance(plane):
+    """Variance of the gradient magnitude.
+
+    The default: it peaks at focus for absorbing and phase objects alike on
+    a bright in-line hologram background.
+    """
+    gx = plane[:-1, 1:] - plane[:-1, :-1]
+    gy = plane[1:, :-1] - plane[:-1, :-1]
+    return float(np.var(np.sqrt(gx * gx + gy * gy)))
+
+
+@register_metric("tamura")
+def tamura_coefficient(plane):
+    """sqrt(std / mean): sparse (focused) amplitude images score highest.
+
+    Suits sparse bright objects on a dark field. On ordinary bright-field
+    holograms the twin image and the fringes keep the amplitude from being
+    sparsest at focus, and it tends to pick an end of the search range.
+    """
+    mean = float(plane.mean())
+    return math.sqrt(float(plane.std()) / mean) if mean > 0 else 0.0
+
+
+@register_metric("laplacian_energy")
+def laplacian_energy(plane):
+    """Mean squared 4-neighbour Laplacian, normalised by the mean level.
+
+    Weighs the finest detail most, so it suits small high-contrast objects
+    and is easily pulled off focus by noise and out-of-focus fringes.
+    """
+    lap = (4 * plane[1:-1, 1:-1] - plane[:-2, 1:-1] - plane[2:, 1:-1]
+           - plane[1:-1, :-2] - plane[1:-1, 2:])
+    mean = float(plane.mean()) or 1.0
+    return float(np.mean(lap * lap)) / (mean * mean)
+
+
+# -- Results -------------------------------------------------------------------
+class FocusResult:
+    """Outcome of an autofocus run; ``history`` holds every (z, score) tried."""
+
+    def __init__(self, z, score, metric, search, history, elapsed):
+        self.z = z
+        self.score = score
+        self.metric = metric
+        self.search = search
+        self.history = history
+        self.elapsed = elapsed
+
+    @property
+    def evaluations(self):
+        return len(self.history)
+
+    def to_dict(self):
+        return {
+            'z': self.z,
+            'score': self.score,
+            'metric': self.metric,
+            'search': self.search,
+            'evaluations': self.evaluations,
+            'elapsed': self.elapsed,
+            'history': [[z, s] for z, s in self.history],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['z'], data['score'], data['metric'], data['search'],
+                   [tuple(h) for h in data.get('history', [])], data.get('elapsed', 0.0))
+
+    def __repr__(self):
+        return f"FocusResult(z={self.z:.6g}, metric={self.metric!r}, evaluations={self.evaluations})"
+
+
+def focus_path(image_path):
+    """Sidecar file holding the focus result for an image."""
+    return os.path.splitext(image_path)[0] + "_focus.json"
+
+
+def save_focus(result, image_path):
+    path = focus_path(image_path)
+    with open(path, 'w') as f:
+        json.dump(result.to_dict(), f, indent=2)
+    return path
+
+
+def load_focus(image_path):
+    path = focus_path(image_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return FocusResult.from_dict(json.load(f))
+
+
+# -- Search --------------------------------------------------------------------
+class _Focuser:
+    """Scores candidate distances for one image, memoising every result."""
+
+    def __init__(self, image, wavelength, pixel_pitch, method, metric, progress=None):
+        mean = float(image.mean()) or 1.0
+        self.spectrum = fft2(np.sqrt(np.maximum(image, 0) / mean).astype(np.complex64))
+        self.offset = wavenumber_offset(method, image.shape, wavelength, pixel_pitch)
+        self.metric = METRICS[metric]
+        self.scores = {}
+        self.progress = progress  # called with the z of every plane evaluated
+
+    def evaluate(self, zs):
+        todo = [z for z in dict.fromkeys(float(z) for z in zs) if z not in self.scores]
+        # Small batches keep memory low while still batching the FFTs
+        for start in range(0, len(todo), 8):
+            chunk = todo[start:start + 8]
+            kernels = kernels_from_offset(*self.offset, -np.asarray(chunk))
+            kernels *= self.spectrum
+            fields = ifft2(kernels, overwrite=True)
+            for z, field in zip(chunk, fields):
+                self.scores[z] = self.metric(np.abs(field))
+                if self.progress:
+                    self.progress(z)
+        return [self.scores[float(z)] for z in zs]
+
+    def best(self):
+        z = max(self.scores, key=self.scores.get)
+        return z, self.scores[z]
+
+
+def _grid_bracket(focuser, lo, hi, planes):
+    zs = np.linspace(lo, hi, planes)
+    scores = focuser.evaluate(zs)
+    i = int(np.argmax(scores))
+    return zs[max(i - 1, 0)], zs[min(i + 1, planes - 1)]
+
+
+def _coarse_to_fine(focuser, lo, hi, tolerance, coarse_planes, fine_planes):
+    lo, hi = _grid_bracket(focuser, lo, hi, coarse_planes)
+    while hi - lo > tolerance:
+        a, b = _grid_bracket(focuser, lo, hi, fine_planes)
+        if b - a >= hi - lo:
+            break  # the bracket stopped shrinking (peak at float resolution)
+        lo, hi = a, b
+    return lo, hi
+
+
+def _golden(focuser, lo, hi, tolerance, coarse_planes, fine_planes):
+    # A coarse scan first, so golden-section starts on a unimodal bracket
+    lo, hi = _grid_bracket(focuser, lo, hi, coarse_planes)
+    inv_phi = (math.sqrt(5) - 1) / 2
+    a, b = lo, hi
+    c = b - inv_phi * (b - a)
+    d = a + inv_phi * (b - a)
+    fc, fd = focuser.evaluate([c, d])
+    while b - a > tolerance:
+        if fc > fd:
+            b, d, fd = d, c, fc
+            c = b - inv_phi * (b - a)
+            fc = focuser.evaluate([c])[0]
+        else:
+            a, c, fc = c, d, fd
+            d = a + inv_phi * (b - a)
+            fd = focuser.evaluate([d])[0]
+    return a, b
+
+
+_SEARCHES = {
+    "coarse_to_fine": _coarse_to_fine,
+    "golden": _golden,
+}
+
+
+def _expected_planes(search, width, tolerance, first_planes, fine_planes):
+    """About how many planes a search over ``width`` evaluates (for progress)."""
+    bracket = 2 * width / (first_planes - 1)
+    if bracket <= tolerance:
+        return first_planes
+    if search == "golden":
+        return first_planes + 2 + math.ceil(math.log(bracket / tolerance) / math.log(2 / (math.sqrt(5) - 1)))
+    return first_planes + fine_planes * math.ceil(math.log(bracket / tolerance) / math.log((fine_planes - 1) / 2))
+
+
+def _centre_crop(image, factor):
+    """The central 1/``factor`` of ``image`` along each axis."""
+    ny, nx = image.shape
+    h, w = max(ny // factor, 16), max(nx // factor, 16)
+    y0, x0 = (ny - h) // 2, (nx - w) // 2
+    return image[y0:y0 + h, x0:x0 + w]
+
+
+def autofocus(frame, z_min, z_max, wavelength=DEFAULT_WAVELENGTH, pixel_pitch=DEFAULT_PIXEL_PITCH,
+              method="angular_spectrum", metric=DEFAULT_METRIC, search="coarse_to_fine", roi=None,
+              downsample=1, tolerance=1e-6, coarse_planes=15, fine_planes=7, progress=None):
+    """Find the reconstruction distance in [z_min, z_max] that maximises ``metric``.
+
+    ``roi`` is (x, y, w, h) in pixels. With ``downsample`` > 1 a first pass
+    runs on the central 1/``downsample`` of the image along each axis, at
+    full resolution, and the full search is then restricted to the bracket
+    it found. ``progress(fraction, message)`` is called after every plane
+    evaluated (the fraction is estimated from the expected number of
+    planes); it may raise to abort.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown focus metric: {metric}")
+    if search not in _SEARCHES:
+        raise ValueError(f"Unknown focus search: {search}")
+    if fine_planes < 4:
+        # With 3 planes a peak in the middle brackets the whole interval again
+        raise ValueError(f"fine_planes must be at least 4, got {fine_planes}")
+    started = time.perf_counter()
+    run = _SEARCHES[search]
+
+    if roi is not None:
+        # Crop first: on a memory-mapped raw frame only the ROI is read
+        x, y, w, h = roi
+        frame = frame[y:y + h, x:x + w]
+    image = to_gray(frame)
+
+    lo, hi = float(z_min), float(z_max)
+    step = (hi - lo) / (coarse_planes - 1)
+    if downsample > 1:
+        expected = (_expected_planes(search, hi - lo, step / 2, coarse_planes, fine_planes)
+                    + _expected_planes(search, 4 * step, tolerance, fine_planes, fine_planes))
+    else:
+        expected = _expected_planes(search, hi - lo, tolerance, coarse_planes, fine_planes)
+    done = [0]
+
+    def report(z):
+        done[0] += 1
+        if progress:
+            progress(min(done[0] / expected, 0.99), f"plane {done[0]}: {z * 1e3:.3f} mm")
+
+    history = []
+    if downsample > 1:
+        # A crop, not a block average: averaging drops the fine fringes of
+        # weak (phase) objects and the preview then favours the range ends
+        preview = _Focuser(_centre_crop(image, downsample), wavelength, pixel_pitch, method, metric, report)
+        a, b = run(preview, lo, hi, step / 2, coarse_planes, fine_planes)
+        history.extend(preview.scores.items())
+        lo, hi = max(lo, a - step), min(hi, b + step)
+
+    focuser = _Focuser(image, wavelength, pixel_pitch, method, metric, report)
+    run(focuser, lo, hi, tolerance, coarse_planes if downsample <= 1 else fine_planes, fine_planes)
+    history.extend(focuser.scores.items())
+    z, score = focuser.best()
+    return FocusResult(z, score, metric, search, history, time.perf_counter() - started)
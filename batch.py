@@ -0,0 +1,391 @@
+"""Headless batch processing of hologram captures.
+
+Runs a configurable pipeline over a folder (or glob) of captures on a
+process pool with one worker per core, without the GUI:
+
+    python batch.py captures/ -o results --steps autofocus,reconstruct,colorize,report \
+        --z-range 0.2 5 --fields report_fields.json
+
+Every finished frame is appended to ``progress.jsonl`` in the output
+directory, so an interrupted run picks up where it stopped; pass
+``--restart`` to process everything again. A throughput summary is
+printed and written to ``summary.json``. The ``normalize`` step applies
+dark/background flat-field correction (``--dark``, ``--background``, raw
+reference frames as recorded from the capture dialog) before anything else.
+The ``localize`` step sweeps ``--z-range`` in ``--planes`` planes and
+exports the 3D particle positions found in the stack.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+
+import autofocus
+import detect
+import images
+import localize
+import phase
+import preprocess
+import reconstruction as recon
+
+PROGRESS_FILE = "progress.jsonl"
+SUMMARY_FILE = "summary.json"
+
+
+# -- Pipeline steps ------------------------------------------------------------
+# Each step takes the per-frame context dict and updates it in place. Steps
+# always run in the order they are registered here, whatever order the user
+# lists them in.
+_normalizer = None  # one per worker process, the references are read on first use
+
+
+def _step_normalize(ctx):
+    global _normalizer
+
+    cfg = ctx['config']
+    if _normalizer is None:
+        references = []
+        for path in (cfg['dark'], cfg['background']):
+            frame = images.read_image(path, cv2.IMREAD_ANYDEPTH) if path else None
+            if path and frame is None:
+                raise IOError(f"Failed to load reference {path}")
+            references.append(frame)
+        _normalizer = preprocess.Normalizer(*references)
+    ctx['frame'] = _normalizer.apply(ctx['frame'])
+    ctx['display'] = images.ImageHandle.from_array(recon.to_uint8(ctx['frame']))
+
+
+def _step_autofocus(ctx):
+    cfg = ctx['config']
+    focus = autofocus.autofocus(ctx['frame'], cfg['z_min'], cfg['z_max'], cfg['wavelength'],
+                                cfg['pixel_pitch'], cfg['method'], metric=cfg['metric'],
+                                downsample=cfg['downsample'])
+    ctx['focus'] = focus
+    ctx['z'] = focus.z
+    ctx['outputs']['focus'] = autofocus.save_focus(focus, ctx['output_base'] + ".png")
+
+
+def _step_reconstruct(ctx):
+    cfg = ctx['config']
+    if cfg['tile']:
+        # One process per core already, so the tiles run one after another
+        field = recon.reconstruct_tiled(ctx['frame'], ctx['z'], cfg['wavelength'], cfg['pixel_pitch'],
+                                        cfg['method'], tile=cfg['tile'], workers=1)
+    else:
+        field = recon.reconstruct(ctx['frame'], ctx['z'], cfg['wavelength'], cfg['pixel_pitch'], cfg['method'])
+    ctx['field'] = field
+    ctx['display'] = images.ImageHandle.from_array(recon.to_uint8(recon.amplitude(field)), z=ctx['z'])
+    ctx['outputs']['reconstruction'] = ctx['display'].save(ctx['output_base'] + "_recon.png")
+
+
+def _step_phase(ctx):
+    cfg = ctx['config']
+    phase_map = phase.phase_map(ctx['field'], cfg['wavelength'], cfg['unwrap'], quality=cfg['unwrap_quality'])
+    raw_path, preview = phase.save_phase(phase_map, ctx['output_base'])
+    ctx['outputs']['phase'] = raw_path
+    ctx['phase'] = phase_map.phase
+    ctx['extra_images'].append((f"Phase map: {phase_map.summary()}", images.ImageHandle.from_file(preview)))
+
+
+def _step_detect(ctx):
+    cfg = ctx['config']
+    phase_plane = ctx.get('phase')
+    plane = phase_plane if cfg['detect_on'] == "phase" and phase_plane is not None else recon.amplitude(ctx['field'])
+    result = detect.detect(plane, phase_plane, cfg['pixel_pitch'], cfg['threshold'], min_area=cfg['min_area'])
+    ctx['outputs']['objects'] = result.save_csv(ctx['output_base'] + "_objects.csv")
+    ctx['count'] = result.count
+    ctx['tables'].extend(result.report_tables())
+
+
+def _step_localize(ctx):
+    cfg = ctx['config']
+    # One process per core already: keep the sweep's memory and threads per frame modest
+    stack = recon.z_stack(ctx['frame'], cfg['z_min'], cfg['z_max'], cfg['planes'], wavelength=cfg['wavelength'],
+                          pixel_pitch=cfg['pixel_pitch'], method=cfg['method'], memory_budget=256 * 1024 ** 2)
+    particles = localize.localize(stack, workers=1)
+    path = ctx['output_base'] + "_particles." + cfg['particle_format']
+    ctx['outputs']['particles'] = particles.save(path)
+    ctx['particles'] = particles.count
+    ctx['extra_images'].append(("Particle positions (top and side views, colour = depth)",
+                                images.ImageHandle.from_array(particles.overview())))
+    ctx['tables'].extend(particles.report_tables())
+
+
+_colorizer = None  # one per worker process, the model is loaded on first use
+
+
+def _step_colorize(ctx):
+    global _colorizer
+    import colorize
+
+    cfg = ctx['config']
+    if _colorizer is None:
+        _colorizer = colorize.Colorizer(colorize.load_color_net(cfg['model_dir']), cfg['dnn_backend'])
+    colored = images.ImageHandle.from_array(_colorizer.colorize(ctx['display'].array))
+    ctx['outputs']['colorized'] = colored.save(ctx['output_base'] + "_color.png")
+    ctx['extra_images'].append(("Colorized", colored))
+
+
+def _step_report(ctx):
+    import report  # reportlab is only needed when reports are requested
+
+    data = dict(ctx['config']['fields'])
+    data.setdefault('image_name', ctx['stem'])
+    pdf_path = os.path.join(os.path.dirname(ctx['output_base']), f"Report_{ctx['stem']}.pdf")
+    ctx['warnings'].extend(report.draw_report(pdf_path, data, ctx['display'], ctx.get('focus'),
+                                              ctx['extra_images'], tables=ctx['tables']))
+    ctx['outputs']['report'] = pdf_path
+
+
+STEPS = OrderedDict([
+    ("normalize", _step_normalize),
+    ("autofocus", _step_autofocus),
+    ("reconstruct", _step_reconstruct),
+    ("phase", _step_phase),
+    ("detect", _step_detect),
+    ("localize", _step_localize),
+    ("colorize", _step_colorize),
+    ("report", _step_report),
+])
+
+
+def _init_worker():
+    # One process per core already; keep each FFT single threaded
+    recon.FFT_WORKERS = 1
+
+
+def output_stems(paths):
+    """Output name stem for each input path.
+
+    Inputs from different folders may share a file name; repeats get _2,
+    _3, ... in input order so no two frames write to the same outputs.
+    """
+    used = set()
+    stems = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        candidate, n = name, 1
+        while candidate in used:
+            n += 1
+            candidate = f"{name}_{n}"
+        used.add(candidate)
+        stems[path] = candidate
+    return stems
+
+
+def process_image(path, config, stem=None):
+    """Run the configured steps on one image; returns a progress record."""
+    started = time.perf_counter()
+    stem = stem or os.path.splitext(os.path.basename(path))[0]
+    ctx = {
+        'config': config,
+        'path': path,
+        'stem': stem,
+        'output_base': os.path.join(config['output_dir'], stem),
+        'z': config['z'],
+        'outputs': {},
+        'extra_images': [],
+        'tables': [],
+        'warnings': [],
+    }
+    record = {'source': path}
+    try:
+        handle = images.ImageHandle.from_file(path)
+        if handle is None:
+            raise IOError(f"Failed to load {path}")
+        ctx['frame'] = handle.array
+        ctx['display'] = handle  # what the report shows; steps may replace it
+        for name, step in STEPS.items():
+            if name in config['steps']:
+                step(ctx)
+        if 'count' in ctx:
+            record['count'] = ctx['count']
+        if 'particles' in ctx:
+            record['particles'] = ctx['particles']
+        record.update(status='ok', z=ctx['z'], outputs=ctx['outputs'], warnings=ctx['warnings'])
+    except Exception as e:
+        record.update(status='error', error=f"{type(e).__name__}: {e}")
+    record['seconds'] = round(time.perf_counter() - started, 4)
+    return record
+
+
+# -- Progress ------------------------------------------------------------------
+def load_progress(output_dir):
+    """Sources already processed successfully in an earlier run."""
+    done = set()
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                if record.get('status') == 'ok':
+                    done.add(record['source'])
+    return done
+
+
+def run_batch(paths, config, workers=None, restart=False, log=print):
+    """Process ``paths`` on a process pool and return the summary dict."""
+    os.makedirs(config['output_dir'], exist_ok=True)
+    progress_path = os.path.join(config['output_dir'], PROGRESS_FILE)
+    if restart and os.path.exists(progress_path):
+        os.remove(progress_path)
+    done = load_progress(config['output_dir'])
+    # Stems come from the whole input list so a resumed run names frames the same
+    stems = output_stems(paths)
+    todo = [p for p in paths if p not in done]
+    workers = workers or os.cpu_count() or 1
+    log(f"{len(paths)} images, {len(paths) - len(todo)} already done, {len(todo)} to process on {workers} workers")
+
+    started = time.perf_counter()
+    ok = failed = 0
+    with open(progress_path, 'a') as progress, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        queue = iter(todo)
+        # Keep only a few tasks per worker in flight so memory stays flat
+        for path in queue:
+            pending.add(pool.submit(process_image, path, config, stems[path]))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                progress.write(json.dumps(record) + "\n")
+                progress.flush()
+                if record['status'] == 'ok':
+                    ok += 1
+                else:
+                    failed += 1
+                    log(f"FAILED {record['source']}: {record['error']}")
+                next_path = next(queue, None)
+                if next_path is not None:
+                    pending.add(pool.submit(process_image, next_path, config, stems[next_path]))
+            count = ok + failed
+            if count % 50 == 0 or not pending:
+                elapsed = time.perf_counter() - started
+                log(f"{count}/{len(todo)} done, {count / elapsed if elapsed else 0:.2f} frames/s")
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'total': len(paths),
+        'skipped': len(paths) - len(todo),
+        'processed': ok,
+        'failed': failed,
+        'elapsed_s': round(elapsed, 3),
+        'frames_per_s': round((ok + failed) / elapsed, 3) if elapsed > 0 else 0.0,
+        'workers': workers,
+        'steps': list(config['steps']),
+    }
+    with open(os.path.join(config['output_dir'], SUMMARY_FILE), 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch-process lensless hologram captures without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="batch_output", help="output directory")
+    parser.add_argument("--steps", default="reconstruct",
+                        help=f"comma separated steps from: {', '.join(STEPS)}")
+    parser.add_argument("--wavelength", type=float, default=recon.DEFAULT_WAVELENGTH * 1e9, help="nm")
+    parser.add_argument("--pitch", type=float, default=recon.DEFAULT_PIXEL_PITCH * 1e6, help="pixel pitch in µm")
+    parser.add_argument("--z", type=float, default=recon.DEFAULT_DISTANCE * 1e3,
+                        help="reconstruction distance in mm (when not autofocusing)")
+    parser.add_argument("--method", choices=recon.METHODS, default="angular_spectrum")
+    parser.add_argument("--tile", type=int, default=0,
+                        help="reconstruct in overlapping tiles of about this many pixels (0: whole frame)")
+    parser.add_argument("--z-range", type=float, nargs=2, default=(0.2, 5.0), metavar=("MIN", "MAX"),
+                        help="autofocus search range and localize sweep in mm")
+    parser.add_argument("--planes", type=int, default=100, help="planes in the localize sweep")
+    parser.add_argument("--particle-format", choices=localize.EXPORT_FORMATS, default="csv",
+                        help="particle table format (parquet needs pyarrow)")
+    parser.add_argument("--unwrap", choices=phase.METHODS, default=phase.METHODS[0],
+                        help="phase unwrapping method for the phase step")
+    parser.add_argument("--unwrap-quality", choices=phase.QUALITIES, default=phase.QUALITIES[0],
+                        help="quality map for quality-guided unwrapping")
+    parser.add_argument("--detect-on", choices=("amplitude", "phase"), default="amplitude",
+                        help="plane the detect step segments (phase needs the phase step)")
+    parser.add_argument("--threshold", choices=detect.THRESHOLDS, default="otsu")
+    parser.add_argument("--min-area", type=int, default=9, help="smallest object in pixels")
+    parser.add_argument("--metric", choices=sorted(autofocus.METRICS), default=autofocus.DEFAULT_METRIC)
+    parser.add_argument("--downsample", type=int, default=2, help="autofocus first searches the central 1/N of the frame")
+    parser.add_argument("--model-dir", default="model", help="colorization model directory")
+    parser.add_argument("--dnn-backend", default="auto", help="colorization backend: auto, cpu, openvino, opencl")
+    parser.add_argument("--dark", help="dark frame for the normalize step")
+    parser.add_argument("--background", help="background frame for the normalize step")
+    parser.add_argument("--fields", help="JSON file with report field values")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--restart", action="store_true", help="ignore earlier progress")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    unknown = [s for s in steps if s not in STEPS]
+    if unknown:
+        print(f"Unknown step(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    if "normalize" in steps and not (args.dark or args.background):
+        print("The normalize step needs --dark and/or --background", file=sys.stderr)
+        return 2
+
+    for step in ("phase", "detect"):
+        if step in steps and "reconstruct" not in steps:
+            print(f"The {step} step needs the reconstruct step", file=sys.stderr)
+            return 2
+
+    fields = {}
+    if args.fields:
+        with open(args.fields) as f:
+            fields = json.load(f)
+
+    paths = images.find_images(args.inputs)
+    if not paths:
+        print("No images found.", file=sys.stderr)
+        return 1
+
+    config = {
+        'output_dir': args.output,
+        'steps': steps,
+        'wavelength': args.wavelength * 1e-9,
+        'pixel_pitch': args.pitch * 1e-6,
+        'z': args.z * 1e-3,
+        'method': args.method,
+        'tile': args.tile,
+        'z_min': args.z_range[0] * 1e-3,
+        'z_max': args.z_range[1] * 1e-3,
+        'metric': args.metric,
+        'unwrap': args.unwrap,
+        'unwrap_quality': args.unwrap_quality,
+        'detect_on': args.detect_on,
+        'threshold': args.threshold,
+        'min_area': args.min_area,
+        'planes': args.planes,
+        'particle_format': args.particle_format,
+        'downsample': args.downsample,
+        'model_dir': args.model_dir,
+        'dnn_backend': args.dnn_backend,
+        'dark': args.dark,
+        'background': args.background,
+        'fields': fields,
+    }
+    summary = run_batch(paths, config, args.workers, args.restart)
+    print(f"Processed {summary['processed']} frames ({summary['failed']} failed, "
+          f"{summary['skipped']} skipped) in {summary['elapsed_s']:.1f} s: "
+          f"{summary['frames_per_s']:.2f} frames/s")
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
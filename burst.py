@@ -0,0 +1,208 @@
+"""Burst and time-lapse recording.
+
+A BurstRecorder is fed frames from the camera grab thread (``offer``). It
+copies each accepted frame into one of a fixed set of preallocated arrays
+and hands that slot to a writer thread pool, so the grab loop never waits
+for disk or encoding. When every slot is still waiting to be written the
+frame is dropped and counted as back-pressure instead of stalling the
+camera. Frames go into one memory-mapped raw stack (see rawstore) or, with
+``fmt="png"``, into numbered PNG files. The raw stack grows as frames
+are written and is trimmed to the recorded count when the burst ends, and
+a raw burst is capped to the frames the disk has room for.
+``burst.json`` in the output directory records per-frame timestamps and
+the final statistics.
+
+Nothing in here imports Qt.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import rawstore
+
+FORMATS = ("raw", "png")
+STATS_FILE = "burst.json"
+DISK_RESERVE = 1 << 30  # bytes left free when capping a raw burst to the disk
+
+
+class BurstRecorder:
+    """Records ``count`` frames, every ``interval`` seconds (0: every frame).
+
+    ``memory_budget`` bounds the slot buffers: the number of slots is
+    worked out from the first frame's size (between ``min_slots`` and
+    ``max_slots``). A raw burst is capped to the frames that fit in this
+    recorder's ``disk_share`` of the free disk space (use 1/n when n
+    recorders share a disk).
+    """
+
+    def __init__(self, out_dir, count, interval=0.0, fmt="raw", writers=2,
+                 memory_budget=512 << 20, min_slots=4, max_slots=256, disk_share=1.0, **meta):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown burst format: {fmt}")
+        self.out_dir = out_dir
+        self.count = int(count)
+        self.interval = float(interval)
+        self.fmt = fmt
+        self.memory_budget = memory_budget
+        self.min_slots = min_slots
+        self.max_slots = max_slots
+        self.disk_share = disk_share
+        self.meta = meta
+
+        self.offered = 0
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0  # no free slot: the writers were behind
+        self.skipped = 0  # frame size changed mid-burst
+        self.disk_limited = False  # count was lowered to fit the free disk space
+        self.errors = []
+        self.peak_queue = 0
+        self.started_at = None
+        self.finished_at = None
+        self.slot_count = 0
+        self.timestamps = [None] * self.count
+
+        self._slots = None
+        self._free = deque()
+        self._stack = None
+        self._next_due = None
+        self._closed = False
+        self._finishing = False
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=writers, thread_name_prefix="burst-writer")
+        self.finished = threading.Event()
+        self._write_times = deque(maxlen=60)
+
+    # -- Grab side -------------------------------------------------------------
+    def offer(self, frame, timestamp=None, seq=None):
+        """Take a frame from the grab thread; returns True if it was recorded."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self._closed:
+                return False
+            self.offered += 1
+            if self._slots is None:
+                self._allocate(frame)
+            if self.interval > 0:
+                if self._next_due is not None and timestamp < self._next_due:
+                    return False
+            if frame.shape != self._slots[0].shape or frame.dtype != self._slots[0].dtype:
+                self.skipped += 1
+                return False
+            if not self._free:
+                self.dropped += 1
+                return False
+            slot = self._free.popleft()
+            index = self.accepted
+            self.accepted += 1
+            self.timestamps[index] = {'t': timestamp, 'seq': seq}
+            if self.interval > 0:
+                # Schedule from the nominal start so intervals do not drift
+                self._next_due = self.started_at + self.accepted * self.interval
+            self.peak_queue = max(self.peak_queue, len(self._slots) - len(self._free))
+            if self.accepted >= self.count:
+                self._closed = True
+        np.copyto(self._slots[slot], frame)
+        self._pool.submit(self._write, index, slot)
+        return True
+
+    def _allocate(self, frame):
+        os.makedirs(self.out_dir, exist_ok=True)
+        if self.fmt == "raw":
+            free = shutil.disk_usage(self.out_dir).free * self.disk_share - DISK_RESERVE
+            fits = max(1, int(free // max(frame.nbytes, 1)))
+            if fits < self.count:
+                self.count = fits
+                self.timestamps = self.timestamps[:fits]
+                self.disk_limited = True
+            # The file grows as frames arrive; no space is taken for frames never recorded
+            self._stack = rawstore.StackWriter(os.path.join(self.out_dir, "frames" + rawstore.RAW_EXT),
+                                               self.count, frame.shape, frame.dtype, **self.meta)
+        n = int(np.clip(self.memory_budget // max(frame.nbytes, 1), self.min_slots, self.max_slots))
+        n = min(n, self.count)
+        self._slots = [np.empty_like(frame) for _ in range(n)]
+        self.slot_count = n
+        self._free.extend(range(n))
+        self.started_at = time.time()
+
+    # -- Writer side -----------------------------------------------------------
+    def _write(self, index, slot):
+        try:
+            if self._stack is not None:
+                self._stack[index] = self._slots[slot]
+            else:
+                path = os.path.join(self.out_dir, f"frame_{index:06d}.png")
+                if not cv2.imwrite(path, self._slots[slot]):
+                    raise IOError(f"Failed to write {path}")
+        except Exception as e:
+            with self._lock:
+                self.errors.append(f"frame {index}: {e}")
+        with self._lock:
+            self._free.append(slot)
+            self.written += 1
+            self._write_times.append(time.perf_counter())
+            done = self._closed and self.written == self.accepted
+        if done:
+            self._finish()
+
+    def stop(self):
+        """Stop accepting frames; pending writes still complete."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            done = self.written == self.accepted
+        if done:
+            self._finish()
+
+    def _finish(self):
+        with self._lock:
+            if self._finishing:
+                return
+            self._finishing = True
+            self.finished_at = time.time()
+        timestamps = self.timestamps[:self.accepted]
+        if self._stack is not None:
+            self._stack.meta.update(frames=self.accepted, timestamps=timestamps)
+            self._stack.close(self.accepted)
+        if self._slots is not None or self.accepted:
+            with open(os.path.join(self.out_dir, STATS_FILE), 'w') as f:
+                json.dump(dict(self.stats(), format=self.fmt, interval=self.interval,
+                               timestamps=timestamps, meta=self.meta), f, indent=2, default=str)
+        self._slots = None  # free the buffers
+        self.finished.set()
+        self._pool.shutdown(wait=False)
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    # -- Statistics ------------------------------------------------------------
+    def stats(self):
+        with self._lock:
+            queued = self.slot_count - len(self._free)
+            times = list(self._write_times)
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                'requested': self.count,
+                'disk_limited': self.disk_limited,
+                'offered': self.offered,
+                'recorded': self.accepted,
+                'written': self.written,
+                'dropped': self.dropped,
+                'skipped': self.skipped,
+                'errors': len(self.errors),
+                'queued': queued,
+                'slots': self.slot_count,
+                'peak_queue': self.peak_queue,
+                'record_fps': self.accepted / elapsed if elapsed > 0 else 0.0,
+                'write_fps': (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0,
+                'elapsed_s': round(elapsed, 3),
+            }
@@ -0,0 +1,937 @@
+"""Camera acquisition and live preview.
+
+A CameraWorker thread owns the cv2.VideoCapture and grabs frames as fast as
+the sensor delivers them into a small FrameRing. The GUI never waits on the
+camera: the preview only ever renders the newest frame in the ring, so
+frames the display could not keep up with are dropped (and counted) rather
+than queued. In live reconstruction mode a LiveReconstructor sits between
+the ring and the preview, so grabbing, FFTs and display all overlap.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from PyQt5.QtCore import QObject, Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import (
+    QCheckBox, QComboBox, QDialog, QDoubleSpinBox, QGridLayout, QHBoxLayout, QLabel, QPushButton, QSpinBox,
+    QVBoxLayout
+)
+
+import burst
+import images
+import multicam
+import preprocess
+import reconstruction as recon
+
+
+class RateMeter:
+    """Rolling events-per-second estimate over the last ``window`` events."""
+
+    def __init__(self, window=60):
+        self._stamps = deque(maxlen=window)
+
+    def tick(self, now=None):
+        self._stamps.append(time.perf_counter() if now is None else now)
+
+    def rate(self):
+        if len(self._stamps) < 2:
+            return 0.0
+        span = self._stamps[-1] - self._stamps[0]
+        return (len(self._stamps) - 1) / span if span > 0 else 0.0
+
+
+class FrameRing:
+    """Bounded ring of the most recent frames, safe for one writer and many readers.
+
+    Every frame gets a sequence number. Old frames are overwritten when the
+    ring is full; a reader that asks for the newest frame can tell from the
+    sequence numbers how many it skipped.
+    """
+
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def put(self, frame, timestamp=None):
+        with self._cond:
+            self._seq += 1
+            stamp = time.time() if timestamp is None else timestamp
+            self._slots[self._seq % self.capacity] = (self._seq, stamp, frame)
+            self._cond.notify_all()
+            return self._seq
+
+    def latest(self):
+        """Return (seq, timestamp, frame) for the newest frame, or None."""
+        with self._cond:
+            if self._seq == 0:
+                return None
+            return self._slots[self._seq % self.capacity]
+
+    def nearest(self, timestamp):
+        """Return the frame still in the ring grabbed closest to ``timestamp``, or None."""
+        with self._cond:
+            items = [item for item in self._slots if item is not None]
+        return min(items, key=lambda item: abs(item[1] - timestamp), default=None)
+
+    def wait_newer(self, seq, timeout=None):
+        """Block until a frame newer than ``seq`` arrives; return it or None."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > seq, timeout):
+                return None
+            return self._slots[self._seq % self.capacity]
+
+
+class DeviceClock:
+    """Maps driver frame timestamps onto wall-clock time.
+
+    Many backends (V4L2, MSMF, most industrial SDKs) report when the sensor
+    delivered a buffer in CAP_PROP_POS_MSEC. Those stamps do not include
+    the delay until ``grab`` returns, so frames from several devices line
+    up more tightly than with ``time.time()`` at read time. The offset to
+    wall-clock time is the smallest one seen (least delivery delay); it is
+    re-established if the device clock jumps. Without driver stamps the
+    grab time is used.
+    """
+
+    def __init__(self, max_jump=1.0):
+        self.max_jump = max_jump
+        self.offset = None
+        self.hardware = False
+
+    def stamp(self, cap):
+        now = time.time()
+        msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if not msec or msec <= 0:
+            self.hardware = False
+            return now
+        device = msec / 1000.0
+        offset = now - device
+        if self.offset is None or offset < self.offset or offset - self.offset > self.max_jump:
+            self.offset = offset
+        self.hardware = True
+        return device + self.offset
+
+
+# -- Device discovery ------------------------------------------------------------
+def probe_camera(index):
+    """Open one camera index and report its capabilities, or None if absent."""
+    cap = cv2.VideoCapture(index)
+    try:
+        if not cap.isOpened():
+            return None
+        ret, frame = cap.read()
+        if not ret or frame is None:
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        return {
+            'index': index,
+            'width': frame.shape[1],
+            'height': frame.shape[0],
+            'fps': round(fps, 2) if fps and fps > 0 else None,
+            'backend': cap.getBackendName(),
+        }
+    finally:
+        cap.release()
+
+
+def describe_camera(info):
+    text = f"Camera {info['index']} ({info['width']}x{info['height']}"
+    if info.get('fps'):
+        text += f" @ {info['fps']:g} fps"
+    return text + ")"
+
+
+class CameraRegistry(QObject):
+    """Cached inventory of attached cameras.
+
+    Indices are probed in parallel, each with its own timeout, so absent
+    devices cost at most ``timeout`` seconds in total rather than several
+    seconds each. The inventory is kept in memory and in ``cache_file`` so
+    the camera list is available instantly on the next start, and can be
+    refreshed in the background with ``refresh_async``. Probes never
+    overlap: one refresh runs at a time, and asynchronous requests made
+    while one is running wait for its result instead of starting another.
+    """
+
+    updated = pyqtSignal()
+
+    def __init__(self, cache_file=None, max_index=5, timeout=3.0, parent=None):
+        super().__init__(parent)
+        self.cache_file = cache_file
+        self.max_index = max_index
+        self.timeout = timeout
+        self.refreshed_at = None
+        self._devices = []
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._running = False  # a background refresh is queued or probing
+        self._callbacks = []
+        # Queued to the registry's (GUI) thread when emitted from a probe thread
+        self.updated.connect(self._run_callbacks)
+        self._load()
+
+    def devices(self):
+        with self._lock:
+            return list(self._devices)
+
+    def refresh(self):
+        """Probe all indices now (in parallel) and return the new inventory."""
+        with self._refreshing:
+            results = {}
+
+            def run(index):
+                info = probe_camera(index)
+                if info is not None:
+                    results[index] = info
+
+            # Daemon threads: a wedged driver cannot hold up the app or exit
+            threads = [threading.Thread(target=run, args=(i,), daemon=True)
+                       for i in range(self.max_index)]
+            for t in threads:
+                t.start()
+            deadline = time.monotonic() + self.timeout
+            for t in threads:
+                t.join(max(0.0, deadline - time.monotonic()))
+
+            devices = [results[i] for i in sorted(results)]
+            with self._lock:
+                self._devices = devices
+                self.refreshed_at = time.time()
+                # Requests from now on need a new probe to see later changes
+                self._running = False
+            self._save()
+        self.updated.emit()
+        return devices
+
+    def refresh_async(self, callback=None):
+        """Probe in the background; ``callback(devices)`` runs on this object's thread.
+
+        If a refresh is already running, the callback gets its result.
+        """
+        with self._lock:
+            if callback is not None:
+                self._callbacks.append(callback)
+            if self._running:
+                return
+            self._running = True
+        threading.Thread(target=self._refresh_background, daemon=True).start()
+
+    def _refresh_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Error probing cameras: {e}")
+            with self._lock:
+                self._running = False
+            self.updated.emit()  # waiting callbacks get the cached inventory
+
+    def _run_callbacks(self):
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        devices = self.devices()
+        for callback in callbacks:
+            callback(devices)
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                data = json.load(f)
+            self._devices = data.get('devices', [])
+            self.refreshed_at = data.get('refreshed_at')
+        except Exception as e:
+            print(f"Error loading camera cache: {e}")
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+            with open(self.cache_file, 'w') as f:
+                json.dump({'devices': self.devices(), 'refreshed_at': self.refreshed_at}, f)
+        except Exception as e:
+            print(f"Error saving camera cache: {e}")
+
+
+class CameraWorker(QThread):
+    """Grabs frames from one camera on its own thread.
+
+    ``frameAvailable`` is emitted only when the previous notification has
+    been consumed (see ``acknowledge``), so a slow GUI never builds up a
+    backlog of queued signals.
+    """
+
+    frameAvailable = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, index, ring=None, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.ring = ring or FrameRing()
+        self.meter = RateMeter()
+        self.frames = 0
+        # Called as sink(frame, timestamp, seq) on the grab thread for every
+        # frame; must return quickly (see burst.BurstRecorder.offer)
+        self.sinks = []
+        self.settings = {}  # resolution/exposure/gain, known once the camera is open
+        self.clock = DeviceClock()
+        self._running = False
+        self._pending = threading.Event()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.index)
+        if not cap.isOpened():
+            self.failed.emit(f"Cannot open camera {self.index}")
+            return
+        self.settings = {
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'exposure': cap.get(cv2.CAP_PROP_EXPOSURE),
+            'gain': cap.get(cv2.CAP_PROP_GAIN),
+        }
+        self._running = True
+        try:
+            while self._running:
+                # grab() latches the frame; decoding it can wait until it is stamped
+                ret = cap.grab()
+                stamp = self.clock.stamp(cap) if ret else None
+                if ret:
+                    ret, frame = cap.retrieve()
+                if not ret:
+                    self.failed.emit(f"Failed to read from camera {self.index}")
+                    break
+                seq = self.ring.put(frame, stamp)
+                for sink in list(self.sinks):
+                    sink(frame, stamp, seq)
+                self.frames += 1
+                self.meter.tick()
+                if not self._pending.is_set():
+                    self._pending.set()
+                    self.frameAvailable.emit()
+        finally:
+            cap.release()
+
+    def acknowledge(self):
+        self._pending.clear()
+
+    def stop(self):
+        self._running = False
+        self.wait()
+
+
+class LiveReconstructor(QObject):
+    """Reconstructs the newest camera frames on a small worker pool.
+
+    A dispatcher thread hands a frame to a worker only when one is free,
+    always taking the newest frame in the ring, so no stale work piles up.
+    Results carry the camera sequence number and grab timestamp; ``latest``
+    only ever moves forward, so the display always shows the newest
+    completed reconstruction even when workers finish out of order.
+    """
+
+    resultAvailable = pyqtSignal()
+
+    def __init__(self, ring, wavelength=recon.DEFAULT_WAVELENGTH, pixel_pitch=recon.DEFAULT_PIXEL_PITCH,
+                 z=recon.DEFAULT_DISTANCE, method="angular_spectrum", scale=0.5, workers=2, parent=None):
+        super().__init__(parent)
+        self.ring = ring
+        self.wavelength = wavelength
+        self.pixel_pitch = pixel_pitch
+        self.z = z
+        self.method = method
+        self.scale = scale
+        self.workers = workers
+        self.normalizer = None  # preprocess.Normalizer applied before reconstructing
+        self.meter = RateMeter()
+        self._result = None
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._slots = threading.Semaphore(workers)
+        self._running = False
+        self._pool = None
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    def latest(self):
+        """Return (seq, grab timestamp, uint8 image) of the newest result, or None."""
+        with self._lock:
+            return self._result
+
+    def acknowledge(self):
+        self._pending.clear()
+
+    def _dispatch(self):
+        last_seq = 0
+        while self._running:
+            if not self._slots.acquire(timeout=0.1):
+                continue
+            item = self.ring.wait_newer(last_seq, timeout=0.1)
+            if item is None:
+                self._slots.release()
+                continue
+            last_seq = item[0]
+            self._pool.submit(self._process, item)
+
+    def _process(self, item):
+        try:
+            seq, stamp, frame = item
+            gray = recon.to_gray(frame)
+            normalizer = self.normalizer
+            if normalizer is not None and normalizer.active:
+                if gray is frame:
+                    gray = gray.copy()  # never modify the ring's frame
+                normalizer.apply(gray, out=gray)
+            scale = self.scale
+            if scale < 1.0:
+                h, w = gray.shape
+                gray = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))),
+                                  interpolation=cv2.INTER_AREA)
+            else:
+                scale = 1.0
+            # Downscaling makes each preview pixel 1/scale sensor pixels wide
+            field = recon.reconstruct(gray, self.z, self.wavelength, self.pixel_pitch / scale, self.method)
+            image = recon.to_uint8(recon.amplitude(field))
+            with self._lock:
+                if self._result is not None and self._result[0] >= seq:
+                    return
+                self._result = (seq, stamp, image)
+            self.meter.tick()
+            if not self._pending.is_set():
+                self._pending.set()
+                self.resultAvailable.emit()
+        except Exception as e:
+            print(f"Live reconstruction failed: {e}")
+        finally:
+            self._slots.release()
+
+
+def frame_to_pixmap(frame, size=None):
+    """Convert a BGR or gray frame to a QPixmap, shrinking it to ``size`` first."""
+    if size is not None:
+        h, w = frame.shape[:2]
+        scale = min(size.width() / w, size.height() / h, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+    if frame.ndim == 2:
+        h, w = frame.shape
+        image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_Grayscale8)
+    else:
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w = rgb.shape[:2]
+        image = QImage(rgb.data, w, h, rgb.strides[0], QImage.Format_RGB888)
+    # QImage does not own the buffer; copy before the array goes away
+    return QPixmap.fromImage(image.copy())
+
+
+class PreviewWidget(QLabel):
+    """Shows the newest item of a FrameRing or LiveReconstructor.
+
+    Counts skipped frames and measures grab-to-screen latency.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setMinimumSize(320, 240)
+        self.setStyleSheet("background-color: black;")
+        self.meter = RateMeter()
+        self.latencies = deque(maxlen=60)
+        self.dropped = 0
+        self._last_seq = 0
+
+    def show_latest(self, source):
+        item = source.latest()
+        if item is None:
+            return None
+        seq, stamp, frame = item
+        if seq <= self._last_seq:
+            return None
+        if self._last_seq:
+            self.dropped += seq - self._last_seq - 1
+        self._last_seq = seq
+        self.setPixmap(frame_to_pixmap(frame, self.size()))
+        self.meter.tick()
+        self.latencies.append(time.time() - stamp)
+        return item
+
+    def latency(self):
+        """Mean grab-to-screen latency in seconds over recent frames."""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def reset_stats(self):
+        self.meter = RateMeter()
+        self.latencies.clear()
+        self.dropped = 0
+
+
+class CaptureDialog(QDialog):
+    """Live camera preview; captures are saved in the background."""
+
+    captured = pyqtSignal(object, str)
+    burstFinished = pyqtSignal(str, object)  # output directory, stats dict
+
+    def __init__(self, index, parent=None, optics=None, store=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Live Camera {index}")
+        self.resize(900, 700)
+
+        self.worker = CameraWorker(index, parent=self)
+        self.preview = PreviewWidget(self)
+        self.status = QLabel()
+        self._saver = ThreadPoolExecutor(max_workers=1)
+        # store(handle) -> path; by default captures are written to the CWD
+        self.store = store
+
+        # optics: dict with wavelength, pixel_pitch, z and method
+        self.live = LiveReconstructor(self.worker.ring, parent=self, **(optics or {}))
+        self.live.resultAvailable.connect(self.on_result)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.preview, 1)
+        layout.addWidget(self.status)
+
+        live_layout = QHBoxLayout()
+        self.live_check = QCheckBox("Live reconstruction")
+        self.live_check.toggled.connect(self.set_live)
+        self.z_spin = QDoubleSpinBox()
+        self.z_spin.setSuffix(" mm")
+        self.z_spin.setDecimals(3)
+        self.z_spin.setRange(0.001, 100.0)
+        self.z_spin.setSingleStep(0.05)
+        self.z_spin.setValue(self.live.z * 1e3)
+        self.z_spin.valueChanged.connect(lambda v: setattr(self.live, 'z', v * 1e-3))
+        live_layout.addWidget(self.live_check)
+        live_layout.addWidget(QLabel("Distance:"))
+        live_layout.addWidget(self.z_spin)
+        live_layout.addStretch(1)
+        layout.addLayout(live_layout)
+
+        burst_layout = QHBoxLayout()
+        self.burst_mode = QComboBox()
+        self.burst_mode.addItems(["Burst", "Time-lapse"])
+        self.burst_frames = QSpinBox()
+        self.burst_frames.setRange(2, 1000000)
+        self.burst_frames.setValue(300)
+        self.burst_frames.setSuffix(" frames")
+        self.burst_interval = QDoubleSpinBox()
+        self.burst_interval.setRange(0.01, 86400.0)
+        self.burst_interval.setValue(1.0)
+        self.burst_interval.setPrefix("every ")
+        self.burst_interval.setSuffix(" s")
+        self.burst_duration = QDoubleSpinBox()
+        self.burst_duration.setRange(0.1, 7 * 86400.0)
+        self.burst_duration.setValue(60.0)
+        self.burst_duration.setPrefix("for ")
+        self.burst_duration.setSuffix(" s")
+        self.burst_btn = QPushButton("Start")
+        self.burst_btn.clicked.connect(self.toggle_burst)
+        self.burst_mode.currentIndexChanged.connect(self._update_burst_inputs)
+        for widget in (self.burst_mode, self.burst_frames, self.burst_interval,
+                       self.burst_duration, self.burst_btn):
+            burst_layout.addWidget(widget)
+        burst_layout.addStretch(1)
+        layout.addLayout(burst_layout)
+        self.recorder = None
+        self._update_burst_inputs()
+
+        # Averaging and dark/background references
+        prep_layout = QHBoxLayout()
+        self.average_spin = QSpinBox()
+        self.average_spin.setRange(1, 1000)
+        self.average_spin.setPrefix("Average ")
+        self.average_spin.setSuffix(" frames")
+        self.median_check = QCheckBox("Median")
+        self.normalize_check = QCheckBox("Normalize")
+        self.normalize_check.setToolTip("Subtract the dark frame and divide by the background")
+        self.normalize_check.toggled.connect(self.load_references)
+        self.dark_btn = QPushButton("Record Dark")
+        self.dark_btn.clicked.connect(lambda: self.record_reference("dark"))
+        self.background_btn = QPushButton("Record Background")
+        self.background_btn.clicked.connect(lambda: self.record_reference("background"))
+        self.reference_label = QLabel()
+        for widget in (self.average_spin, self.median_check, self.normalize_check,
+                       self.dark_btn, self.background_btn, self.reference_label):
+            prep_layout.addWidget(widget)
+        prep_layout.addStretch(1)
+        layout.addLayout(prep_layout)
+        self.references = preprocess.ReferenceLibrary()
+        self.normalizer = None
+
+        btn_layout = QHBoxLayout()
+        self.raw_check = QCheckBox("Save raw (.npy)")
+        self.raw_check.setToolTip("Store the unencoded sensor frame with its optics metadata")
+        btn_layout.addWidget(self.raw_check)
+        self.capture_btn = QPushButton("Capture")
+        self.close_btn = QPushButton("Close")
+        self.capture_btn.clicked.connect(self.capture)
+        self.close_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(self.capture_btn)
+        btn_layout.addWidget(self.close_btn)
+        layout.addLayout(btn_layout)
+
+        self.worker.frameAvailable.connect(self.on_frame)
+        self.worker.failed.connect(self.on_failed)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(500)
+        self.worker.start()
+
+    def set_live(self, enabled):
+        self.preview.reset_stats()
+        if enabled:
+            self.live.start()
+        else:
+            self.live.stop()
+
+    def on_frame(self):
+        self.worker.acknowledge()
+        if not self.live_check.isChecked():
+            self.preview.show_latest(self.worker.ring)
+
+    def on_result(self):
+        self.live.acknowledge()
+        if self.live_check.isChecked():
+            self.preview.show_latest(self.live)
+
+    def on_failed(self, message):
+        self.status.setText(message)
+        self.capture_btn.setEnabled(False)
+
+    def update_stats(self):
+        text = (f"Camera {self.worker.meter.rate():.1f} fps  |  "
+                f"Display {self.preview.meter.rate():.1f} fps  |  "
+                f"Dropped {self.preview.dropped}")
+        if self.live_check.isChecked():
+            text += (f"  |  Reconstructed {self.live.meter.rate():.1f} fps  |  "
+                     f"Latency {self.preview.latency() * 1e3:.0f} ms")
+        if self.recorder is not None:
+            stats = self.recorder.stats()
+            text += (f"\nRecording {stats['recorded']}/{stats['requested']}  |  "
+                     f"Written {stats['written']} ({stats['write_fps']:.1f} fps)  |  "
+                     f"Queue {stats['queued']}/{stats['slots']}  |  "
+                     f"Dropped (writer busy) {stats['dropped']}")
+            if self.recorder.finished.is_set():
+                self._burst_done()
+        self.status.setText(text)
+
+    def _update_burst_inputs(self):
+        timelapse = self.burst_mode.currentIndex() == 1
+        self.burst_frames.setVisible(not timelapse)
+        self.burst_interval.setVisible(timelapse)
+        self.burst_duration.setVisible(timelapse)
+
+    def toggle_burst(self):
+        if self.recorder is not None:
+            self.recorder.stop()
+            return
+        if self.burst_mode.currentIndex() == 1:
+            interval = self.burst_interval.value()
+            count = int(self.burst_duration.value() // interval) + 1
+        else:
+            interval, count = 0.0, self.burst_frames.value()
+        fmt = "raw" if self.raw_check.isChecked() else "png"
+        out_dir = images.stamped_name("burst", ext="")
+        self.recorder = burst.BurstRecorder(out_dir, count, interval, fmt, camera=self.worker.index,
+                                            wavelength=self.live.wavelength, pixel_pitch=self.live.pixel_pitch)
+        self.worker.sinks.append(self.recorder.offer)
+        self.burst_btn.setText("Stop")
+
+    def _burst_done(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder.offer in self.worker.sinks:
+            self.worker.sinks.remove(recorder.offer)
+        self.burst_btn.setText("Start")
+        self.burstFinished.emit(recorder.out_dir, recorder.stats())
+
+    def reference_settings(self):
+        return dict(self.worker.settings, wavelength=self.live.wavelength)
+
+    def load_references(self):
+        if not self.normalize_check.isChecked():
+            self.normalizer = self.live.normalizer = None
+            self.reference_label.setText("")
+            return
+        settings = self.reference_settings()
+        self.normalizer = self.references.normalizer(self.worker.index, settings)
+        self.live.normalizer = self.normalizer
+        found = [kind for kind in preprocess.REFERENCE_KINDS
+                 if os.path.exists(self.references.path(kind, self.worker.index, settings))]
+        self.reference_label.setText(f"Using: {', '.join(found)}" if found else "No references recorded")
+
+    def _averaging_sink(self, on_done):
+        """Feed the next frames into an averager; on_done(mean) runs on the grab thread."""
+        def finished(mean):
+            self.worker.sinks.remove(sink)
+            on_done(mean)
+
+        sink = preprocess.AveragingSink(self.average_spin.value(), finished, self.median_check.isChecked())
+        self.worker.sinks.append(sink)
+
+    def record_reference(self, kind):
+        count = self.average_spin.value()
+        settings = self.reference_settings()
+
+        def save(mean):
+            self.references.save(kind, self.worker.index, mean, settings, frames=count)
+            QTimer.singleShot(0, self.load_references)
+
+        self.reference_label.setText(f"Recording {kind} ({count} frames)...")
+        self._averaging_sink(lambda mean: self._saver.submit(save, mean))
+
+    def capture(self):
+        if self.average_spin.value() > 1 or self.normalize_check.isChecked():
+            # Averaged/normalized frames are float32, so they are kept raw
+            self._averaging_sink(lambda mean: self._saver.submit(self._save_processed, mean))
+            return
+        item = self.worker.ring.latest()
+        if item is None:
+            return
+        frame = item[2]
+        ext = images.RAW_EXT if self.raw_check.isChecked() else ".png"
+        fname = images.stamped_name("capture", ext=ext, precise=True)
+        # Encoding happens on the saver thread; acquisition keeps running
+        self._saver.submit(self._save, frame, fname, ext)
+
+    def _save(self, frame, fname, ext=".png"):
+        optics = {'wavelength': self.live.wavelength, 'pixel_pitch': self.live.pixel_pitch}
+        handle = images.ImageHandle.from_array(frame, ext, camera=self.worker.index, **optics)
+        try:
+            fname = self.store(handle) if self.store else handle.save(fname)
+        except Exception as e:
+            print(f"Failed to save capture: {e}")
+            return
+        self.captured.emit(handle, fname)
+
+    def _save_processed(self, mean):
+        normalizer = self.normalizer
+        if normalizer is not None and normalizer.active:
+            try:
+                normalizer.apply(mean, out=mean)
+            except ValueError as e:
+                print(f"Normalization skipped: {e}")
+                normalizer = None
+        fname = images.stamped_name("capture", ext=images.RAW_EXT, precise=True)
+        handle = images.ImageHandle.from_array(
+            mean, images.RAW_EXT, camera=self.worker.index, wavelength=self.live.wavelength,
+            pixel_pitch=self.live.pixel_pitch, averaged=self.average_spin.value(),
+            normalized=normalizer is not None and normalizer.active)
+        try:
+            fname = self.store(handle) if self.store else handle.save(fname)
+        except Exception as e:
+            print(f"Failed to save capture: {e}")
+            return
+        self.captured.emit(handle, fname)
+
+    def done(self, result):
+        self.stats_timer.stop()
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.worker.sinks.clear()
+            self.recorder.wait(30)
+            self._burst_done()
+        self.live.stop()
+        self.worker.stop()
+        self._saver.shutdown(wait=True)
+        super().done(result)
+
+    def keyPressEvent(self, event):
+        # Keep the old preview shortcuts: 'c' captures, 'q' closes
+        if event.key() == Qt.Key_C:
+            self.capture()
+        elif event.key() == Qt.Key_Q:
+            self.reject()
+        else:
+            super().keyPressEvent(event)
+
+
+class MultiCaptureDialog(QDialog):
+    """Live previews of several cameras with synchronized capture.
+
+    Every camera grabs on its own CameraWorker thread. The previews are
+    repainted from a single display timer instead of per-frame signals, so
+    GUI work stays bounded however many cameras (and frames) there are.
+    Synchronized captures and bursts are written off the GUI thread.
+    """
+
+    recorded = pyqtSignal(object)  # record dict (see multicam.write_record)
+    recordFailed = pyqtSignal(str)
+    burstFinished = pyqtSignal(str, object)  # output directory, per-camera stats
+
+    def __init__(self, indices, parent=None, optics=None, store=None, display_fps=30):
+        super().__init__(parent)
+        self.setWindowTitle(f"Cameras {', '.join(map(str, indices))}")
+        self.resize(1200, 800)
+        self.optics = optics or {}
+        self.store = store
+        self.workers = [CameraWorker(index, FrameRing(8), parent=self) for index in indices]
+        self.previews = [PreviewWidget(self) for _ in indices]
+        self._saver = ThreadPoolExecutor(max_workers=1)
+        self.last_skew = None
+        self.recorders = []
+        self.burst_dir = None
+
+        layout = QVBoxLayout(self)
+        grid = QGridLayout()
+        columns = max(1, math.ceil(math.sqrt(len(indices))))
+        for i, (index, preview) in enumerate(zip(indices, self.previews)):
+            cell = QVBoxLayout()
+            cell.addWidget(QLabel(f"Camera {index}"))
+            cell.addWidget(preview, 1)
+            grid.addLayout(cell, i // columns, i % columns)
+        layout.addLayout(grid, 1)
+        self.status = QLabel()
+        layout.addWidget(self.status)
+
+        btn_layout = QHBoxLayout()
+        self.raw_check = QCheckBox("Save raw (.npy)")
+        self.burst_frames = QSpinBox()
+        self.burst_frames.setRange(2, 1000000)
+        self.burst_frames.setValue(300)
+        self.burst_frames.setSuffix(" frames")
+        self.burst_btn = QPushButton("Record Burst")
+        self.burst_btn.clicked.connect(self.toggle_burst)
+        self.capture_btn = QPushButton("Capture Synchronized")
+        self.capture_btn.clicked.connect(self.capture)
+        self.close_btn = QPushButton("Close")
+        self.close_btn.clicked.connect(self.reject)
+        for widget in (self.raw_check, self.burst_frames, self.burst_btn):
+            btn_layout.addWidget(widget)
+        btn_layout.addStretch(1)
+        btn_layout.addWidget(self.capture_btn)
+        btn_layout.addWidget(self.close_btn)
+        layout.addLayout(btn_layout)
+
+        self.recorded.connect(self.on_recorded)
+        self.recordFailed.connect(self.on_record_failed)
+        for worker in self.workers:
+            worker.failed.connect(self.on_failed)
+        self.display_timer = QTimer(self)
+        self.display_timer.timeout.connect(self.refresh)
+        self.display_timer.start(max(1, int(1000 / display_fps)))
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(500)
+        for worker in self.workers:
+            worker.start()
+
+    @property
+    def indices(self):
+        return [worker.index for worker in self.workers]
+
+    def refresh(self):
+        for worker, preview in zip(self.workers, self.previews):
+            preview.show_latest(worker.ring)
+
+    def on_failed(self, message):
+        self.status.setText(message)
+
+    def update_stats(self):
+        parts = []
+        for worker in self.workers:
+            clock = "hw" if worker.clock.hardware else "sw"
+            parts.append(f"Cam {worker.index}: {worker.meter.rate():.1f} fps ({clock})")
+        total = sum(worker.meter.rate() for worker in self.workers)
+        text = "  |  ".join(parts) + f"  |  Total {total:.1f} fps"
+        if self.last_skew is not None:
+            text += f"  |  Last skew {self.last_skew * 1e3:.1f} ms"
+        if self.recorders:
+            stats = [recorder.stats() for recorder in self.recorders]
+            text += (f"\nRecording {min(s['recorded'] for s in stats)}/{stats[0]['requested']} per camera  |  "
+                     f"Dropped (writer busy) {sum(s['dropped'] for s in stats)}")
+            if all(recorder.finished.is_set() for recorder in self.recorders):
+                self._burst_done()
+        self.status.setText(text)
+
+    def capture(self):
+        ext = images.RAW_EXT if self.raw_check.isChecked() else ".png"
+        after = time.time()
+        self.capture_btn.setEnabled(False)
+        # Waiting for the cameras and encoding both happen off the GUI thread
+        self._saver.submit(self._capture, after, ext)
+
+    def _capture(self, after, ext):
+        try:
+            synced = multicam.synchronize([worker.ring for worker in self.workers], self.indices, after)
+            out_dir = images.stamped_name("acquisition", ext="", precise=True)
+            self.recorded.emit(multicam.write_record(out_dir, synced, ext, self.store,
+                                                     wavelength=self.optics.get('wavelength'),
+                                                     pixel_pitch=self.optics.get('pixel_pitch')))
+        except Exception as e:
+            self.recordFailed.emit(f"Synchronized capture failed: {e}")
+
+    def on_recorded(self, record):
+        self.last_skew = record['skew_s']
+        self.capture_btn.setEnabled(True)
+
+    def on_record_failed(self, message):
+        self.status.setText(message)
+        self.capture_btn.setEnabled(True)
+
+    def toggle_burst(self):
+        if self.recorders:
+            for recorder in self.recorders:
+                recorder.stop()
+            return
+        fmt = "raw" if self.raw_check.isChecked() else "png"
+        self.burst_dir = images.stamped_name("burst", ext="")
+        for worker in self.workers:
+            recorder = burst.BurstRecorder(os.path.join(self.burst_dir, f"cam{worker.index}"),
+                                           self.burst_frames.value(), 0.0, fmt, disk_share=1.0 / len(self.workers),
+                                           camera=worker.index,
+                                           wavelength=self.optics.get('wavelength'),
+                                           pixel_pitch=self.optics.get('pixel_pitch'))
+            worker.sinks.append(recorder.offer)
+            self.recorders.append(recorder)
+        self.burst_btn.setText("Stop")
+
+    def _burst_done(self):
+        recorders, self.recorders = self.recorders, []
+        for worker, recorder in zip(self.workers, recorders):
+            if recorder.offer in worker.sinks:
+                worker.sinks.remove(recorder.offer)
+        self.burst_btn.setText("Record Burst")
+        self.burstFinished.emit(self.burst_dir, {worker.index: recorder.stats()
+                                                 for worker, recorder in zip(self.workers, recorders)})
+
+    def done(self, result):
+        self.display_timer.stop()
+        self.stats_timer.stop()
+        if self.recorders:
+            for worker, recorder in zip(self.workers, self.recorders):
+                recorder.stop()
+                worker.sinks.clear()
+            for recorder in self.recorders:
+                recorder.wait(30)
+            self._burst_done()
+        self._saver.shutdown(wait=True)
+        for worker in self.workers:
+            worker.stop()
+        super().done(result)
@@ -0,0 +1,325 @@
+"""Acquisition catalog: an SQLite index over captured and uploaded images.
+
+Image files live in a content-addressed, sharded tree under the catalog
+root, ``objects/<h[:2]>/<h[2:4]>/<sha1>/<name>``, so no directory grows
+without bound and the original file name is kept. Every acquisition is a
+row in ``catalog.sqlite`` with indexed columns for the fields we search by
+(time, operator, sample, batch, AR and equipment numbers, focus distance,
+file hash). Results are returned newest first and paged with a keyset
+cursor, so listing stays fast however large the catalog gets.
+
+Nothing in here imports Qt. The command line lists or imports files:
+
+    python catalog.py list --batch-no B123
+    python catalog.py import old_captures/
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+import images
+import rawstore
+
+CATALOG_DIR = "acquisitions"
+DB_NAME = "catalog.sqlite"
+OBJECTS_DIR = "objects"
+
+# Searchable columns besides the time range; each one has an index
+FILTER_FIELDS = ("kind", "operator", "sample_name", "batch_no", "ar_no", "equipment_no", "sha1")
+
+# Report fields copied into the catalog when a report is generated
+REPORT_FIELDS = ("sample_name", "batch_no", "ar_no", "equipment_no")
+
+PAGE_SIZE = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS acquisitions (
+    id INTEGER PRIMARY KEY,
+    sha1 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    captured_at TEXT NOT NULL,
+    added_at TEXT NOT NULL,
+    operator TEXT,
+    sample_name TEXT,
+    batch_no TEXT,
+    ar_no TEXT,
+    equipment_no TEXT,
+    focus_z REAL,
+    width INTEGER,
+    height INTEGER,
+    camera TEXT,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_acq_time ON acquisitions (captured_at, id);
+CREATE INDEX IF NOT EXISTS ix_acq_kind ON acquisitions (kind, captured_at);
+CREATE INDEX IF NOT EXISTS ix_acq_operator ON acquisitions (operator, captured_at);
+CREATE INDEX IF NOT EXISTS ix_acq_sample ON acquisitions (sample_name, captured_at);
+CREATE INDEX IF NOT EXISTS ix_acq_batch ON acquisitions (batch_no, captured_at);
+CREATE INDEX IF NOT EXISTS ix_acq_ar ON acquisitions (ar_no, captured_at);
+CREATE INDEX IF NOT EXISTS ix_acq_equipment ON acquisitions (equipment_no, captured_at);
+CREATE INDEX IF NOT EXISTS ix_acq_focus ON acquisitions (focus_z);
+CREATE INDEX IF NOT EXISTS ix_acq_sha1 ON acquisitions (sha1);
+"""
+
+_UPDATABLE = ("operator", "sample_name", "batch_no", "ar_no", "equipment_no", "focus_z", "camera")
+
+
+def shard_path(sha1, name):
+    """Relative location of a file with content hash ``sha1``."""
+    return os.path.join(OBJECTS_DIR, sha1[:2], sha1[2:4], sha1, name)
+
+
+def _raw_file(handle):
+    """The raw file ``handle`` was opened from, if its pixels are still only on disk."""
+    if handle.ext == images.RAW_EXT and handle.data is None and handle.path and os.path.isfile(handle.path):
+        return handle.path
+    return None
+
+
+def _link_or_copy(source, target):
+    # Captures are never rewritten in place, so sharing the inode is safe
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class Catalog:
+    """The SQLite index plus the sharded file store below ``root``.
+
+    One connection is shared by all threads (the capture dialog adds
+    records from its saver thread), serialized by a lock.
+    """
+
+    def __init__(self, root=CATALOG_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, DB_NAME), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # -- Adding ----------------------------------------------------------------
+    def add(self, handle, kind, name=None, **fields):
+        """Store an images.ImageHandle and index it; returns the record dict.
+
+        ``name`` defaults to a stamped ``<kind>_<time>`` file name. Content
+        already in the store is not written again. ``fields`` fills the
+        indexed columns (operator, sample_name, batch_no, ...). Raw frames
+        that are already on disk are linked (or copied) with their JSON
+        header rather than read into memory.
+        """
+        source = _raw_file(handle)
+        if source is not None:
+            sha1 = images.file_hash(source)
+        else:
+            sha1 = hashlib.sha1(handle.encoded()).hexdigest()
+        name = name or os.path.basename(images.stamped_name(kind, ext=handle.ext, precise=True))
+        rel_path = self._existing_path(sha1) or shard_path(sha1, name)
+        full_path = os.path.join(self.root, rel_path)
+        if not os.path.exists(full_path):
+            if source is not None:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if os.path.exists(rawstore.meta_path(source)):
+                    _link_or_copy(rawstore.meta_path(source), rawstore.meta_path(full_path))
+                _link_or_copy(source, full_path)
+            else:
+                handle.save(full_path)
+        handle.path = handle.metadata['path'] = full_path
+        handle.metadata['sha1'] = sha1
+
+        meta = handle.metadata
+        record = {
+            'sha1': sha1,
+            'path': rel_path,
+            'name': os.path.basename(rel_path),
+            'kind': kind,
+            'captured_at': meta.get('captured_at') or meta.get('modified') or datetime.now().isoformat(),
+            'added_at': datetime.now().isoformat(),
+            'width': meta.get('width'),
+            'height': meta.get('height'),
+            'camera': None if meta.get('camera') is None else str(meta['camera']),
+            'metadata': json.dumps({k: v for k, v in meta.items() if k not in ('path', 'sha1')}, default=str),
+        }
+        record.update((k, v) for k, v in fields.items() if k in _UPDATABLE)
+        columns = ", ".join(record)
+        marks = ", ".join("?" * len(record))
+        with self._lock, self._db:
+            cursor = self._db.execute(f"INSERT INTO acquisitions ({columns}) VALUES ({marks})",
+                                      list(record.values()))
+        record['id'] = cursor.lastrowid
+        record['metadata'] = json.loads(record['metadata'])
+        record['full_path'] = full_path
+        handle.metadata['catalog_id'] = record['id']
+        return record
+
+    def add_file(self, path, kind="upload", **fields):
+        """Copy an image file into the store as-is and index it."""
+        handle = images.ImageHandle.from_file(path)
+        if handle is None:
+            raise IOError(f"Failed to load {path}")
+        return self.add(handle, kind, name=os.path.basename(path), **fields)
+
+    def _existing_path(self, sha1):
+        with self._lock:
+            row = self._db.execute("SELECT path FROM acquisitions WHERE sha1 = ? LIMIT 1", (sha1,)).fetchone()
+        if row is not None and os.path.exists(os.path.join(self.root, row['path'])):
+            return row['path']
+        return None
+
+    def update(self, record_id, **fields):
+        """Set indexed fields (e.g. focus_z after autofocus) on one record."""
+        fields = {k: v for k, v in fields.items() if k in _UPDATABLE}
+        if not fields:
+            return
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._db:
+            self._db.execute(f"UPDATE acquisitions SET {assignments} WHERE id = ?",
+                             list(fields.values()) + [record_id])
+
+    # -- Queries ---------------------------------------------------------------
+    def get(self, record_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM acquisitions WHERE id = ?", (record_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def _where(self, filters):
+        clauses, params = [], []
+        for key, value in filters.items():
+            if value in (None, ""):
+                continue
+            if key in FILTER_FIELDS:
+                clauses.append(f"{key} = ?")
+            elif key == 'since':
+                clauses.append("captured_at >= ?")
+            elif key == 'until':
+                clauses.append("captured_at < ?")
+            elif key == 'min_z':
+                clauses.append("focus_z >= ?")
+            elif key == 'max_z':
+                clauses.append("focus_z <= ?")
+            else:
+                raise ValueError(f"Unknown catalog filter: {key}")
+            params.append(value.isoformat() if isinstance(value, datetime) else value)
+        return clauses, params
+
+    def count(self, **filters):
+        clauses, params = self._where(filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM acquisitions {where}", params).fetchone()[0]
+
+    def page(self, cursor=None, limit=PAGE_SIZE, **filters):
+        """One page of records, newest first; returns ``(records, next_cursor)``.
+
+        Pass ``next_cursor`` back in to get the following page; it is None
+        after the last one. Filters are the FILTER_FIELDS columns (exact
+        match) plus ``since``/``until`` (ISO strings or datetimes) and
+        ``min_z``/``max_z``.
+        """
+        clauses, params = self._where(filters)
+        if cursor is not None:
+            clauses.append("(captured_at, id) < (?, ?)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM acquisitions {where} ORDER BY captured_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, params + [limit]).fetchall()
+        records = [self._record(row) for row in rows]
+        next_cursor = (records[-1]['captured_at'], records[-1]['id']) if len(records) == limit else None
+        return records, next_cursor
+
+    def query(self, **filters):
+        """Iterate over every matching record, newest first, a page at a time."""
+        cursor = None
+        while True:
+            records, cursor = self.page(cursor, **filters)
+            yield from records
+            if cursor is None:
+                return
+
+    def _record(self, row):
+        record = dict(row)
+        record['metadata'] = json.loads(record['metadata'] or "{}")
+        record['full_path'] = os.path.join(self.root, record['path'])
+        return record
+
+    def open(self, record):
+        """ImageHandle for a record, tagged with its catalog id."""
+        handle = images.ImageHandle.from_file(record['full_path'])
+        if handle is not None:
+            handle.metadata['catalog_id'] = record['id']
+            handle.metadata['sha1'] = record['sha1']
+        return handle
+
+    # -- Migration -------------------------------------------------------------
+    def import_files(self, paths, kind=None, move=False, log=print):
+        """Index loose capture_/upload_ files; returns the number imported.
+
+        The kind is taken from the file name prefix unless given. With
+        ``move`` the originals are deleted once stored.
+        """
+        imported = 0
+        for path in paths:
+            file_kind = kind or os.path.basename(path).split("_", 1)[0]
+            try:
+                self.add_file(path, file_kind)
+            except IOError as e:
+                log(f"Skipped {path}: {e}")
+                continue
+            if move:
+                os.remove(path)
+            imported += 1
+        return imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or fill the acquisition catalog.")
+    parser.add_argument("--root", default=CATALOG_DIR, help="catalog directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = sub.add_parser("list", help="list acquisitions, newest first")
+    for field in FILTER_FIELDS:
+        list_cmd.add_argument(f"--{field.replace('_', '-')}", dest=field)
+    list_cmd.add_argument("--since", help="ISO date/time")
+    list_cmd.add_argument("--until", help="ISO date/time")
+    list_cmd.add_argument("--paths", action="store_true", help="print only file paths")
+
+    import_cmd = sub.add_parser("import", help="add loose image files to the catalog")
+    import_cmd.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    import_cmd.add_argument("--kind", help="kind for every file (default: from the file name)")
+    import_cmd.add_argument("--move", action="store_true", help="delete the originals once stored")
+    args = parser.parse_args(argv)
+
+    catalog = Catalog(args.root)
+    if args.command == "import":
+        count = catalog.import_files(images.find_images(args.inputs), args.kind, args.move)
+        print(f"Imported {count} file(s) into {args.root}")
+        return 0
+
+    filters = {k: getattr(args, k) for k in FILTER_FIELDS + ("since", "until")}
+    for record in catalog.query(**filters):
+        if args.paths:
+            print(record['full_path'])
+        else:
+            print(f"{record['captured_at']}  {record['kind']:<8} {record['operator'] or '-':<12} "
+                  f"{record['sample_name'] or '-':<16} {record['batch_no'] or '-':<10} {record['full_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""Browse view over the acquisition catalog, and thumbnail loading for Qt.
+
+The table model fetches one catalog page at a time as the view scrolls
+(Qt's canFetchMore/fetchMore), so opening the browser costs the same for a
+day of acquisitions as for a year. Thumbnails come from the shared
+thumbnails.ThumbnailCache and are only requested for rows on screen.
+"""
+from collections import defaultdict
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QObject, QSize, Qt, pyqtSignal
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QDialog, QFormLayout, QHBoxLayout, QHeaderView, QLabel, QLineEdit,
+    QPushButton, QTableView, QVBoxLayout
+)
+
+import thumbnails
+from camera import frame_to_pixmap
+
+THUMB_SIZE = 64
+
+COLUMNS = [
+    ("captured_at", "Captured"),
+    ("kind", "Kind"),
+    ("operator", "Operator"),
+    ("sample_name", "Sample"),
+    ("batch_no", "Batch"),
+    ("ar_no", "AR No."),
+    ("equipment_no", "Equipment"),
+    ("focus_z", "Focus (mm)"),
+    ("name", "File"),
+]
+
+
+class ThumbnailLoader(QObject):
+    """Hands thumbnails from a ThumbnailCache to the GUI thread.
+
+    ``request`` returns a cached thumbnail at once; otherwise it returns
+    None and ``ready(sha1, thumb)`` is emitted once one has been made.
+    After ``close`` nothing more is emitted and the loads it was still
+    waiting for are cancelled.
+    """
+
+    ready = pyqtSignal(str, object)
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or thumbnails.default_cache()
+        self._waiting = set()  # sha1s requested and not delivered yet
+        self._closed = False
+
+    def key(self, source):
+        return self.cache.key(source)
+
+    def request(self, source, size):
+        if self._closed:
+            return None
+        thumb = self.cache.request(source, size, self._deliver)
+        if thumb is None:
+            try:
+                self._waiting.add(self.key(source))
+            except OSError:
+                pass  # unreadable: nothing was queued
+        return thumb
+
+    def _deliver(self, sha1, thumb):
+        # Worker thread; the owner may already be gone
+        self._waiting.discard(sha1)
+        if not self._closed:
+            try:
+                self.ready.emit(sha1, thumb)
+            except RuntimeError:
+                pass
+
+    def close(self):
+        self._closed = True
+        try:
+            self.ready.disconnect()
+        except TypeError:
+            pass  # nothing connected
+        for sha1 in list(self._waiting):
+            self.cache.cancel(sha1)
+        self._waiting.clear()
+
+
+class CatalogModel(QAbstractTableModel):
+    def __init__(self, catalog, filters=None, parent=None, loader=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.filters = dict(filters or {})
+        self.loader = loader or ThumbnailLoader(parent=self)
+        self.loader.ready.connect(self.on_thumbnail)
+        self._thumbs = {}  # sha1 -> QPixmap, or None while being made
+        self._rows = defaultdict(list)  # sha1 -> rows showing it
+        self.records = []
+        self._cursor = None
+        self._exhausted = False
+
+    def set_filters(self, filters):
+        self.beginResetModel()
+        self.filters = dict(filters)
+        self.records = []
+        self._rows.clear()
+        self._cursor = None
+        self._exhausted = False
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][1]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DecorationRole and index.column() == 0:
+            return self.thumbnail(self.records[index.row()])
+        if role != Qt.DisplayRole:
+            return None
+        key = COLUMNS[index.column()][0]
+        value = self.records[index.row()][key]
+        if value is None:
+            return ""
+        if key == "focus_z":
+            return f"{value * 1e3:.3f}"
+        if key == "captured_at":
+            return value.replace("T", " ")[:19]
+        return str(value)
+
+    def thumbnail(self, record):
+        sha1 = record['sha1']
+        if sha1 in self._thumbs:
+            return self._thumbs[sha1]
+        self._thumbs[sha1] = None
+        thumb = self.loader.request(record, THUMB_SIZE)
+        if thumb is not None:
+            self._thumbs[sha1] = frame_to_pixmap(thumb)
+        return self._thumbs[sha1]
+
+    def on_thumbnail(self, sha1, thumb):
+        if sha1 not in self._thumbs or thumb is None:
+            return
+        self._thumbs[sha1] = frame_to_pixmap(thumb)
+        for row in self._rows.get(sha1, ()):
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        records, self._cursor = self.catalog.page(self._cursor, **self.filters)
+        self._exhausted = self._cursor is None
+        if records:
+            first = len(self.records)
+            self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+            self.records.extend(records)
+            for row, record in enumerate(records, first):
+                self._rows[record['sha1']].append(row)
+            self.endInsertRows()
+
+    def record(self, row):
+        return self.records[row]
+
+
+class CatalogBrowser(QDialog):
+    """Filterable, lazily paged list of acquisitions; double-click opens one."""
+
+    opened = pyqtSignal(object)  # catalog record dict
+
+    FILTERS = [
+        ("operator", "Operator"),
+        ("sample_name", "Sample name"),
+        ("batch_no", "Batch number"),
+        ("ar_no", "AR number"),
+        ("equipment_no", "Equipment number"),
+        ("since", "Since (YYYY-MM-DD)"),
+        ("until", "Until (YYYY-MM-DD)"),
+    ]
+
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Acquisitions")
+        self.resize(1000, 600)
+        self.catalog = catalog
+
+        form = QFormLayout()
+        self.inputs = {}
+        for key, label in self.FILTERS:
+            edit = QLineEdit()
+            edit.returnPressed.connect(self.search)
+            form.addRow(label, edit)
+            self.inputs[key] = edit
+
+        self.model = CatalogModel(catalog, parent=self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setDefaultSectionSize(THUMB_SIZE + 4)
+        self.table.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.table.doubleClicked.connect(self.open_row)
+
+        self.count_label = QLabel()
+        search_btn = QPushButton("Search")
+        search_btn.clicked.connect(self.search)
+        open_btn = QPushButton("Open")
+        open_btn.clicked.connect(lambda: self.open_row(self.table.currentIndex()))
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.count_label, 1)
+        buttons.addWidget(search_btn)
+        buttons.addWidget(open_btn)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(form)
+        layout.addWidget(self.table, 1)
+        layout.addLayout(buttons)
+        self.search()
+
+    def filters(self):
+        return {key: edit.text().strip() for key, edit in self.inputs.items() if edit.text().strip()}
+
+    def search(self):
+        filters = self.filters()
+        self.model.set_filters(filters)
+        self.model.fetchMore()  # first page now; the view pulls more on scrolling
+        self.count_label.setText(f"{self.catalog.count(**filters)} acquisition(s)")
+
+    def open_row(self, index):
+        if index.isValid():
+            self.opened.emit(self.model.record(index.row()))
+            self.accept()
+
+    def done(self, result):
+        # Accept, reject and closing the window all end here
+        self.model.loader.close()
+        super().done(result)
@@ -0,0 +1,212 @@
+"""OpenCV DNN colorization model (Zhang et al. Caffe release).
+
+The caffemodel is ~125 MB, so nothing is loaded at import time. Use
+LazyColorNet to load it on first use or in the background, and Colorizer
+to run it.
+"""
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+MODEL_DIR = "model"
+PROTOTXT = "colorization_deploy_v2.prototxt"
+WEIGHTS = "colorization_release_v2.caffemodel"
+HULL_POINTS = "pts_in_hull.npy"
+
+NET_SIZE = 224          # the net's fixed input size
+L_MEAN = 50.0           # subtracted from the L channel before inference
+
+# Backend/target pairs; "auto" picks OpenVINO when OpenCV was built with it
+BACKENDS = {
+    'cpu': (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+    'openvino': (getattr(cv2.dnn, 'DNN_BACKEND_INFERENCE_ENGINE', None), cv2.dnn.DNN_TARGET_CPU),
+    'opencl': (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL),
+}
+
+
+def load_color_net(model_dir=MODEL_DIR):
+    """Read the Caffe colorization net and install the cluster-centre blobs."""
+    proto = os.path.join(model_dir, PROTOTXT)
+    weights = os.path.join(model_dir, WEIGHTS)
+    pts = os.path.join(model_dir, HULL_POINTS)
+    net = cv2.dnn.readNetFromCaffe(proto, weights)
+    pts_in_hull = np.load(pts)
+    class8 = net.getLayerId("class8_ab")
+    conv8 = net.getLayerId("conv8_313_rh")
+    pts_in_hull = pts_in_hull.transpose().reshape(2, 313, 1, 1)
+    net.getLayer(class8).blobs = [pts_in_hull.astype(np.float32)]
+    net.getLayer(conv8).blobs = [np.full((1, 313), 2.606, dtype="float32")]
+    return net
+
+
+class LazyColorNet:
+    """Loads the colorization net once, on first ``get`` or via ``start``.
+
+    ``start`` loads on a daemon thread; callbacks registered with
+    ``on_ready`` run on that thread once loading finished (successfully or
+    not), so GUI code should hop back to its own thread, e.g. via a signal.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self.error = None
+        self._net = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._callbacks = []
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def on_ready(self, callback):
+        with self._lock:
+            if not self._ready.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def start(self):
+        """Begin loading in the background (no-op if already loaded or loading)."""
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def get(self, timeout=None):
+        """Return the net, loading it now if nobody has started to."""
+        if not self._ready.is_set():
+            self._load()
+        self._ready.wait(timeout)
+        if self.error is not None:
+            raise RuntimeError(f"Colorization model unavailable: {self.error}")
+        return self._net
+
+    def _load(self):
+        with self._lock:
+            if self._ready.is_set():
+                return
+            try:
+                self._net = load_color_net(self.model_dir)
+            except Exception as e:
+                self.error = e
+            self._ready.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+
+def available_backends():
+    """Names from BACKENDS that this OpenCV build can actually run."""
+    names = ['cpu']
+    try:
+        pairs = set(cv2.dnn.getAvailableBackends())
+    except Exception:
+        return names
+    for name, pair in BACKENDS.items():
+        if name != 'cpu' and pair in pairs:
+            names.append(name)
+    return names
+
+
+def configure_backend(net, backend="auto"):
+    """Select the DNN backend/target on ``net``; returns the name used."""
+    if backend == "auto":
+        backend = 'openvino' if 'openvino' in available_backends() else 'cpu'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown DNN backend: {backend}")
+    preferable_backend, target = BACKENDS[backend]
+    net.setPreferableBackend(preferable_backend)
+    net.setPreferableTarget(target)
+    return backend
+
+
+def _tile_starts(length, tile, overlap):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, tile - overlap))
+    starts.append(length - tile)
+    return starts
+
+
+def _feather(h, w, overlap):
+    """Blending weights that ramp up over ``overlap`` pixels at tile edges."""
+    if overlap <= 0:
+        return np.ones((h, w), dtype=np.float32)
+    ramp_y = np.minimum(np.arange(h) + 0.5, np.arange(h)[::-1] + 0.5) / overlap
+    ramp_x = np.minimum(np.arange(w) + 0.5, np.arange(w)[::-1] + 0.5) / overlap
+    return (np.minimum(ramp_y, 1)[:, None] * np.minimum(ramp_x, 1)[None, :]).astype(np.float32)
+
+
+class Colorizer:
+    """Runs the colorization net on batches of frames, tile by tile.
+
+    Each frame is cut into ``tile`` x ``tile`` pixel tiles overlapping by
+    ``overlap``; every tile is shrunk to the 224 x 224 net input, and the
+    predicted chroma is scaled back to tile size and feather-blended into a
+    full-resolution chroma plane. Only the original luminance is used in
+    the output, so fine detail is kept. Tiles from all frames share
+    ``blobFromImages`` batches of ``batch_size``, which bounds memory.
+    ``tile=None`` runs the whole frame as one tile.
+    """
+
+    def __init__(self, net, backend="auto", tile=448, overlap=64, batch_size=8):
+        self.net = net
+        self.backend = configure_backend(net, backend)
+        self.tile = tile
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.frames = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()  # cv2.dnn.Net is not re-entrant
+
+    @property
+    def fps(self):
+        """Average frames per second over every call so far."""
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+    def colorize(self, frame):
+        return self.colorize_batch([frame])[0]
+
+    def colorize_batch(self, frames):
+        """Colorize a list of gray or BGR frames; returns BGR uint8 images."""
+        started = time.perf_counter()
+        lab_frames, chroma, weights, tiles = [], [], [], []
+        for n, frame in enumerate(frames):
+            if frame.ndim == 2 or frame.shape[2] == 1:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            scaled = frame.astype(np.float32) / (65535.0 if frame.dtype == np.uint16 else 255.0)
+            lab = cv2.cvtColor(scaled, cv2.COLOR_BGR2Lab)
+            h, w = lab.shape[:2]
+            lab_frames.append(lab)
+            chroma.append(np.zeros((h, w, 2), dtype=np.float32))
+            weights.append(np.zeros((h, w), dtype=np.float32))
+            th = min(self.tile or h, h)
+            tw = min(self.tile or w, w)
+            for y in _tile_starts(h, th, self.overlap):
+                for x in _tile_starts(w, tw, self.overlap):
+                    tiles.append((n, y, x, th, tw))
+
+        for start in range(0, len(tiles), self.batch_size):
+            batch = tiles[start:start + self.batch_size]
+            inputs = [cv2.resize(lab_frames[n][y:y + th, x:x + tw, 0], (NET_SIZE, NET_SIZE)) - L_MEAN
+                      for n, y, x, th, tw in batch]
+            blob = cv2.dnn.blobFromImages(inputs)
+            with self._lock:
+                self.net.setInput(blob)
+                output = self.net.forward()
+            for (n, y, x, th, tw), ab in zip(batch, output):
+                ab = cv2.resize(ab.transpose((1, 2, 0)), (tw, th))
+                feather = _feather(th, tw, self.overlap if self.tile else 0)
+                chroma[n][y:y + th, x:x + tw] += ab * feather[:, :, None]
+                weights[n][y:y + th, x:x + tw] += feather
+
+        results = []
+        for lab, ab, weight in zip(lab_frames, chroma, weights):
+            lab[:, :, 1:] = ab / np.maximum(weight, 1e-6)[:, :, None]
+            bgr = cv2.cvtColor(lab, cv2.COLOR_Lab2BGR)
+            results.append((np.clip(bgr, 0, 1) * 255).astype(np.uint8))
+
+        self.frames += len(frames)
+        self.seconds += time.perf_counter() - started
+        return results
@@ -1,28 +1,86 @@
 import sys, os
-import numpy as np
+import time
+_STARTUP_T0 = time.perf_counter()
 from datetime import datetime, timedelta
 import hashlib
 import platform
 import subprocess
-import cv2
 import json
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QAction, QDialog, QVBoxLayout,
     QHBoxLayout, QLabel, QLineEdit, QFormLayout, QPushButton, QMessageBox,
     QTextEdit, QFileDialog, QInputDialog, QListWidget, QDateTimeEdit,QGroupBox,QSpinBox,QDateEdit, QComboBox, QWidget, QDialogButtonBox, QFrame, QToolButton
 )
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-
 from PyQt5.QtGui import QPixmap, QPalette, QBrush, QResizeEvent,QIcon, QFont, QPainter, QColor, QPen
-from PyQt5.QtCore import Qt, QDateTime, QDate, QSize
+from PyQt5.QtCore import Qt, QDateTime, QDate, QSize, QTimer, pyqtSignal
+import importlib
 import os
+import threading
+
+
+class LazyModule:
+    """Stands in for a module and imports it on first attribute access.
+
+    The processing modules pull in numpy and OpenCV (~100 ms), so they are
+    only loaded when a handler first uses them, or by ``preload`` on a
+    background thread once the main window is up.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        return getattr(self.preload(), attr)
+
+    def preload(self):
+        """Import the module now (if not yet) and return it."""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+
+autofocus = LazyModule("autofocus")
+detect = LazyModule("detect")
+images = LazyModule("images")
+localize = LazyModule("localize")
+phase = LazyModule("phase")
+rawstore = LazyModule("rawstore")
+recon = LazyModule("reconstruction")
+superres = LazyModule("superres")
+track = LazyModule("track")
+camera = LazyModule("camera")
+colorize = LazyModule("colorize")
+jobs = LazyModule("jobs")
+catalog = LazyModule("catalog")
+catalog_view = LazyModule("catalog_view")
 
 # Constants for file storage
 USER_FILE = "users.txt"
 HISTORY_FILE = "login_history.txt"
 ORG_FILE = "orgs.txt"
 ACTIVATION_FILE = os.path.join("data", "activation.dat")
+CAMERA_FILE = os.path.join("data", "cameras.json")
+
+# OpenCV DNN backend for colorization: auto, cpu, openvino or opencl
+DNN_BACKEND = os.environ.get("SAGLO_DNN_BACKEND", "auto")
+
+# Pass --startup-timing (or set SAGLO_STARTUP_TIMING=1) to print per-phase startup times
+STARTUP_TIMING = "--startup-timing" in sys.argv or os.environ.get("SAGLO_STARTUP_TIMING") == "1"
+_startup_last = [_STARTUP_T0]
+
+
+def startup_mark(step):
+    """Print the time spent since the previous startup phase."""
+    if not STARTUP_TIMING:
+        return
+    now = time.perf_counter()
+    print(f"[startup] {step:<24} {(now - _startup_last[0]) * 1000:8.1f} ms"
+          f"   (total {(now - _STARTUP_T0) * 1000:8.1f} ms)")
+    _startup_last[0] = now
+
+
+startup_mark("imports")
 
 
 
@@ -684,7 +742,7 @@ class ManageUsersDialog(QDialog):
 
 
 class ReportDialog(QDialog):
-    def __init__(self, image_filename):
+    def __init__(self, image_filename, image=None, thumbnails=None):
         super().__init__()
         self.setWindowTitle("📝 Report Information")
         self.resize(900, 650)
@@ -719,6 +777,9 @@ class ReportDialog(QDialog):
 
         self.data = {}
         self.imgfile = image_filename
+        self.image = image  # images.ImageHandle, previewed without re-reading the file
+        self.thumbnails = catalog_view.ThumbnailLoader(thumbnails, self)
+        self.thumbnails.ready.connect(self.on_thumbnail)
 
         main_layout = QHBoxLayout(self)
         self.software_version = QLineEdit()
@@ -741,6 +802,10 @@ class ReportDialog(QDialog):
         
         self.page_number = QSpinBox(); self.page_number.setMinimum(1)
         self.total_pages = QSpinBox(); self.total_pages.setMinimum(1)
+        # Pagination is worked out when the PDF is laid out
+        for spin in (self.page_number, self.total_pages):
+            spin.setEnabled(False)
+            spin.setToolTip("Computed automatically when the report is generated")
 
         self.sample_name = QLineEdit()
         self.solvent = QLineEdit()
@@ -823,13 +888,25 @@ class ReportDialog(QDialog):
         self.generate_btn.clicked.connect(self.on_generate)
 
     def load_image(self):
-        if self.imgfile and os.path.exists(self.imgfile):
-            pixmap = QPixmap(self.imgfile)
-            self.img_label.setPixmap(
-                pixmap.scaled(
-                    self.img_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
-                )
-            )
+        # Cached thumbnails show at once; anything else is made in the background
+        source = self.image
+        if source is None and self.imgfile and os.path.exists(self.imgfile):
+            source = self.imgfile
+        if source is None:
+            return
+        self.preview_key = self.thumbnails.key(source)
+        thumb = self.thumbnails.request(source, self.img_label.width())
+        if thumb is not None:
+            self.show_thumbnail(thumb)
+        else:
+            self.img_label.setText("Loading preview...")
+
+    def on_thumbnail(self, sha1, thumb):
+        if sha1 == getattr(self, 'preview_key', None) and thumb is not None:
+            self.show_thumbnail(thumb)
+
+    def show_thumbnail(self, thumb):
+        self.img_label.setPixmap(camera.frame_to_pixmap(thumb, self.img_label.size()))
 
     def on_generate(self):
         fields = {
@@ -869,12 +946,32 @@ class ReportDialog(QDialog):
 
 # -- Main Application Window -------------------------------------------------
 class MainWindow(QMainWindow):
-    def __init__(self):
+    colorNetReady = pyqtSignal()
+
+    def __init__(self, operator=None):
         super().__init__()
+        self.operator = operator
         self.setWindowTitle("Saglo-holosoft - Lensless Digital Holographic Microscopy Software")
         self.resize(800, 600)
+        self.last_image = None  # images.ImageHandle of the current capture/upload
         self.last_bw = None
         self.last_bw_path = None
+        self.last_recon = None
+        self.last_recon_path = None
+        self.last_zstack = None
+        self.last_color = None
+        self.last_color_source = None
+        self.last_phase = None  # (preview ImageHandle, phase.PhaseMap) of the latest phase map
+        self.last_phase_source = None
+        self.last_detection = None  # (overlay ImageHandle, detect.Detection)
+        self.last_detection_source = None
+        self.last_particles = None  # (overview ImageHandle, localize.Particles)
+        self.last_particles_source = None
+        self.last_tracks = None  # (trajectory ImageHandle, track.Tracks)
+        self.last_tracks_source = None
+        self.last_burst_dir = None
+        self.last_superres = None  # superres.SuperResolution behind the current image
+        self.last_superres_source = None
 
         # Set background image for the main work area
         self.central_widget = QWidget(self)
@@ -886,18 +983,24 @@ class MainWindow(QMainWindow):
 
         self.update_background()
 
-        # Load OpenCV DNN Colorization Model
-        model_dir = "model/"
-        proto = os.path.join(model_dir, "colorization_deploy_v2.prototxt")
-        weights = os.path.join(model_dir, "colorization_release_v2.caffemodel")
-        pts = os.path.join(model_dir, "pts_in_hull.npy")
-        self.color_net = cv2.dnn.readNetFromCaffe(proto, weights)
-        pts_in_hull = np.load(pts)
-        class8 = self.color_net.getLayerId("class8_ab")
-        conv8 = self.color_net.getLayerId("conv8_313_rh")
-        pts_in_hull = pts_in_hull.transpose().reshape(2, 313, 1, 1)
-        self.color_net.getLayer(class8).blobs = [pts_in_hull.astype(np.float32)]
-        self.color_net.getLayer(conv8).blobs = [np.full((1, 313), 2.606, dtype="float32")]
+        # Thumbnail of the current image, top right of the work area
+        self.preview_key = None
+        self.preview_label = QLabel(self.central_widget)
+        self.preview_label.setFixedSize(256, 256)
+        self.preview_label.setAlignment(Qt.AlignCenter)
+        self.preview_label.setStyleSheet("border: 1px solid #ccc; background-color: rgba(255, 255, 255, 180);")
+        self.preview_label.hide()
+
+        startup_mark("window background")
+
+        # Everything needing numpy/OpenCV starts once the event loop runs
+        self.colorNetReady.connect(self.on_color_net_ready)
+        QTimer.singleShot(0, self.start_backend)
+        self.colorizer = None
+
+        # Reports render on background threads; progress shows in the status bar
+        self.jobs = jobs.JobManager(parent=self)
+        self.statusBar().addPermanentWidget(jobs.JobStatusWidget(self.jobs))
 
         # --- Menus ---
         menubar = self.menuBar()
@@ -906,6 +1009,9 @@ class MainWindow(QMainWindow):
         openAct = QAction("Open", self)
         openAct.triggered.connect(self.open_pdf)
         fileMenu.addAction(openAct)
+        browseAct = QAction("Browse Acquisitions", self)
+        browseAct.triggered.connect(self.browse_acquisitions)
+        fileMenu.addAction(browseAct)
         fileMenu.addSeparator()
         exitAct = QAction("Exit", self)
         exitAct.triggered.connect(QApplication.instance().quit)
@@ -915,14 +1021,59 @@ class MainWindow(QMainWindow):
         capAct = QAction("Capture Image", self)
         capAct.triggered.connect(self.capture_image)
         camMenu.addAction(capAct)
+        multiCapAct = QAction("Capture From All Cameras", self)
+        multiCapAct.triggered.connect(self.capture_all_cameras)
+        camMenu.addAction(multiCapAct)
         uploadAct = QAction("Upload Image", self)
         uploadAct.triggered.connect(self.upload_image)
         camMenu.addAction(uploadAct)
+        camMenu.addSeparator()
+        refreshCamAct = QAction("Refresh Camera List", self)
+        refreshCamAct.triggered.connect(self.refresh_cameras)
+        camMenu.addAction(refreshCamAct)
+
+        procMenu = menubar.addMenu("Processing")
+        reconAct = QAction("Reconstruct Hologram", self)
+        reconAct.triggered.connect(self.reconstruct_image)
+        procMenu.addAction(reconAct)
+        roiAct = QAction("Reconstruct Region", self)
+        roiAct.triggered.connect(self.reconstruct_region)
+        procMenu.addAction(roiAct)
+        zstackAct = QAction("Z-Stack Sweep", self)
+        zstackAct.triggered.connect(self.zstack_sweep)
+        procMenu.addAction(zstackAct)
+        phaseAct = QAction("Phase Map", self)
+        phaseAct.triggered.connect(self.phase_map_image)
+        procMenu.addAction(phaseAct)
+        countAct = QAction("Count Objects", self)
+        countAct.triggered.connect(self.count_objects)
+        procMenu.addAction(countAct)
+        localizeAct = QAction("Localize Particles (3D)", self)
+        localizeAct.triggered.connect(self.localize_particles)
+        procMenu.addAction(localizeAct)
+        trackAct = QAction("Track Objects", self)
+        trackAct.triggered.connect(self.track_objects)
+        procMenu.addAction(trackAct)
+        superresAct = QAction("Pixel Super-Resolution", self)
+        superresAct.triggered.connect(self.super_resolution)
+        procMenu.addAction(superresAct)
+        focusAct = QAction("Autofocus", self)
+        focusAct.triggered.connect(self.autofocus_image)
+        procMenu.addAction(focusAct)
+        colorAct = QAction("Colorize", self)
+        colorAct.triggered.connect(self.colorize_image)
+        procMenu.addAction(colorAct)
+        opticsAct = QAction("Optics Settings", self)
+        opticsAct.triggered.connect(self.optics_settings)
+        procMenu.addAction(opticsAct)
 
         rptMenu = menubar.addMenu("Reports")
         genAct = QAction("Generate Report", self)
         genAct.triggered.connect(self.generate_report)
         rptMenu.addAction(genAct)
+        batchRptAct = QAction("Batch Report...", self)
+        batchRptAct.triggered.connect(self.generate_batch_report)
+        rptMenu.addAction(batchRptAct)
 
         setMenu = menubar.addMenu("Settings")
         addUserAct = QAction("Add User", self)
@@ -949,6 +1100,48 @@ class MainWindow(QMainWindow):
 
         # Add bottom-left graphical buttons for Settings
         self.init_settings_toolbar()
+        startup_mark("main window")
+
+    def start_backend(self):
+        """Set up the parts that import numpy/OpenCV, after the window is shown."""
+        # Optics used for hologram reconstruction (SI units)
+        self.wavelength = recon.DEFAULT_WAVELENGTH
+        self.pixel_pitch = recon.DEFAULT_PIXEL_PITCH
+        self.sensor_pitch = None  # set while a super-resolved image (finer pitch) is current
+        self.z_distance = recon.DEFAULT_DISTANCE
+        self.recon_method = "angular_spectrum"
+
+        # Captures and uploads are stored and indexed in the acquisition catalog
+        self.catalog = catalog.Catalog()
+
+        # Camera inventory: cached list is usable at once, refreshed in background
+        self.camera_registry = camera.CameraRegistry(CAMERA_FILE)
+        self.camera_registry.refresh_async()
+
+        self.thumbnail_loader = catalog_view.ThumbnailLoader(parent=self)
+        self.thumbnail_loader.ready.connect(self.on_thumbnail)
+
+        # The ~125 MB colorization model loads in the background; anything
+        # needing it just uses self.color_net
+        self.color_model = colorize.LazyColorNet()
+        self.color_model.on_ready(lambda _: self.colorNetReady.emit())
+        self.color_model.start()
+
+        # The analysis modules load in the background too, so the first
+        # action does not wait for their imports
+        analysis = (autofocus, detect, images, localize, phase, rawstore, superres, track)
+        threading.Thread(target=lambda: [m.preload() for m in analysis], daemon=True).start()
+        startup_mark("backend")
+
+    @property
+    def color_net(self):
+        """The colorization net; blocks until it has finished loading."""
+        return self.color_model.get()
+
+    def on_color_net_ready(self):
+        startup_mark("colorization model")
+        if self.color_model.error is not None:
+            print(f"Colorization model unavailable: {self.color_model.error}")
 
     def update_background(self):
         pixmap = QPixmap(self.bg_path)
@@ -998,6 +1191,8 @@ class MainWindow(QMainWindow):
         self.update_background()
         if hasattr(self, 'toolbar_widget'):
             self.toolbar_widget.setGeometry(10, self.height() - 80, 350, 50)
+        if hasattr(self, 'preview_label'):
+            self.preview_label.move(self.central_widget.width() - self.preview_label.width() - 10, 10)
 
 
 
@@ -1035,109 +1230,579 @@ class MainWindow(QMainWindow):
             msg.setText("App v1.0")
         msg.exec_()
 
-    def capture_image(self):
-        # List available cameras
-        available_cameras = []
-        for i in range(5):
-            cap = cv2.VideoCapture(i)
-            if cap is not None and cap.read()[0]:
-                available_cameras.append(i)
-                cap.release()
-
-        if not available_cameras:
-            QMessageBox.critical(self, "Error", "No cameras found.")
+    def refresh_cameras(self):
+        self.statusBar().showMessage("Looking for cameras...")
+        self.camera_registry.refresh_async(lambda devices: self.notify(f"Found {len(devices)} camera(s)"))
+
+    def with_cameras(self, action):
+        """Call ``action(cameras)`` with the cached inventory, probing first only if it is empty."""
+        cameras = self.camera_registry.devices()
+        if cameras:
+            action(cameras)
             return
 
+        def probed(cameras):
+            self.statusBar().clearMessage()
+            if cameras:
+                action(cameras)
+            else:
+                QMessageBox.critical(self, "Error", "No cameras found.")
+
+        self.statusBar().showMessage("Looking for cameras...")
+        self.camera_registry.refresh_async(probed)
+
+    def capture_image(self):
+        self.with_cameras(self.open_capture)
+
+    def open_capture(self, cameras):
         # Ask user to select camera
-        cam_strs = [f"Camera {i}" for i in available_cameras]
+        cam_strs = [camera.describe_camera(info) for info in cameras]
         cam_idx, ok = QInputDialog.getItem(self, "Select Camera", "Choose a camera:", cam_strs, 0, False)
         if not ok:
             return
 
-        selected_cam_index = available_cameras[cam_strs.index(cam_idx)]
-        cap = cv2.VideoCapture(selected_cam_index)
-
-        if not cap.isOpened():
-            QMessageBox.critical(self, "Error", f"Cannot open camera {selected_cam_index}")
-            return
-
-        QMessageBox.information(self, "Info", "Press 'c' to capture image, 'q' to quit preview")
+        selected_cam_index = cameras[cam_strs.index(cam_idx)]['index']
 
-        # Show live preview
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                QMessageBox.critical(self, "Error", "Failed to read from camera")
-                break
-
-            cv2.imshow('Live Camera - Press c to Capture', frame)
-            key = cv2.waitKey(1) & 0xFF
+        # Frames are grabbed on a worker thread; the preview only shows the newest
+        optics = {'wavelength': self.wavelength, 'pixel_pitch': self.pixel_pitch,
+                  'z': self.z_distance, 'method': self.recon_method}
+        store = lambda handle: self.catalog.add(handle, "capture", operator=self.operator)['full_path']
+        dlg = camera.CaptureDialog(selected_cam_index, self, optics, store)
+        dlg.captured.connect(self.on_captured)
+        dlg.burstFinished.connect(self.on_burst_finished)
+        dlg.exec_()
 
-            if key == ord('c'):
-                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                fname = f"capture_{ts}.png"
-                cv2.imwrite(fname, frame)  # Save original color image
-                self.last_bw = frame
-                self.last_bw_path = fname
-                QMessageBox.information(self, "Captured", f"Saved image to {fname}")
-                break
+    def capture_all_cameras(self):
+        self.with_cameras(self.open_multi_capture)
 
-            elif key == ord('q'):
-                break
+    def open_multi_capture(self, cameras):
+        optics = {'wavelength': self.wavelength, 'pixel_pitch': self.pixel_pitch}
+        store = lambda handle: self.catalog.add(handle, "capture", operator=self.operator)['full_path']
+        dlg = camera.MultiCaptureDialog([info['index'] for info in cameras], self, optics, store)
+        dlg.recorded.connect(self.on_synchronized_capture)
+        dlg.burstFinished.connect(self.on_multi_burst_finished)
+        dlg.exec_()
 
-        cap.release()
-        cv2.destroyAllWindows()
+    def on_synchronized_capture(self, record):
+        frames = record['frames']
+        handle = images.ImageHandle.from_file(frames[0]['path'])
+        if handle is not None:
+            self.set_current_image(handle)
+        self.statusBar().showMessage(f"Saved {len(frames)} synchronized frames "
+                                     f"(skew {record['skew_s'] * 1e3:.1f} ms), record {record['id']}", 5000)
+
+    def on_multi_burst_finished(self, out_dir, stats):
+        written = sum(s['written'] for s in stats.values())
+        dropped = sum(s['dropped'] for s in stats.values())
+        message = f"Recorded {written} frames from {len(stats)} cameras to {out_dir}"
+        if dropped:
+            message += f" ({dropped} dropped while the writers were busy)"
+        self.notify(message)
+
+    def on_captured(self, handle, fname):
+        self.set_current_image(handle)
+        self.statusBar().showMessage(f"Saved image to {fname}", 5000)
+
+    def on_burst_finished(self, out_dir, stats):
+        self.last_burst_dir = out_dir
+        message = f"Recorded {stats['written']} frames to {out_dir} ({stats['record_fps']:.1f} fps"
+        if stats['dropped']:
+            message += f", {stats['dropped']} dropped while the writers were busy"
+        if stats.get('disk_limited'):
+            message += f", capped at {stats['requested']} frames by the free disk space"
+        self.notify(message + ")")
+
+    def set_current_image(self, handle):
+        if self.sensor_pitch is not None:
+            self.pixel_pitch, self.sensor_pitch = self.sensor_pitch, None
+        self.last_image = handle
+        self.last_bw = handle.array
+        self.last_bw_path = handle.path
+        # A reconstruction belongs to the image it was made from
+        self.last_recon = None
+        self.last_recon_path = None
+        self.preview_key = self.thumbnail_loader.key(handle)
+        thumb = self.thumbnail_loader.request(handle, self.preview_label.width())
+        if thumb is not None:
+            self.on_thumbnail(self.preview_key, thumb)
+
+    def on_thumbnail(self, sha1, thumb):
+        if sha1 == self.preview_key and thumb is not None:
+            self.preview_label.setPixmap(camera.frame_to_pixmap(thumb, self.preview_label.size()))
+            self.preview_label.show()
 
     def upload_image(self):
-        fname, _ = QFileDialog.getOpenFileName(self, "Select Image", "", "Image Files (*.png *.jpg *.jpeg)")
+        fname, _ = QFileDialog.getOpenFileName(self, "Select Image", "", "Image Files (*.png *.jpg *.jpeg *.tif *.tiff *.npy)")
         if fname:
-            img = cv2.imread(fname, cv2.IMREAD_COLOR)
-            if img is None:
+            handle = images.ImageHandle.from_file(fname)
+            if handle is None:
                 QMessageBox.warning(self, "Error", "Failed to load image.")
                 return
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            save_path = f"upload_{ts}.png"
-            cv2.imwrite(save_path, img)
-            self.last_bw = img
-            self.last_bw_path = save_path
+            # The original bytes are copied as-is; nothing is re-encoded
+            record = self.catalog.add(handle, "upload", operator=self.operator)
+            save_path = record['full_path']
+            self.set_current_image(handle)
             QMessageBox.information(self, "Uploaded", f"Image loaded and saved as {save_path}")
 
-    def generate_report(self):
-        if self.last_bw_path is None:
-            QMessageBox.warning(self, "No Image", "Capture an image first")
+    def browse_acquisitions(self):
+        dlg = catalog_view.CatalogBrowser(self.catalog, self)
+        dlg.opened.connect(self.open_acquisition)
+        dlg.exec_()
+
+    def open_acquisition(self, record):
+        handle = self.catalog.open(record)
+        if handle is None:
+            QMessageBox.warning(self, "Error", f"Failed to load {record['full_path']}")
+            return
+        if record['focus_z'] is not None:
+            self.z_distance = record['focus_z']
+        self.set_current_image(handle)
+        self.statusBar().showMessage(f"Opened {record['name']}", 5000)
+
+    def update_catalog(self, **fields):
+        """Record fields (focus, report details) on the current acquisition."""
+        record_id = self.last_image.metadata.get('catalog_id') if self.last_image is not None else None
+        if record_id is not None:
+            self.catalog.update(record_id, **fields)
+
+    def optics_settings(self):
+        wl, ok = QInputDialog.getDouble(self, "Optics Settings", "Wavelength (nm):",
+                                        self.wavelength * 1e9, 200.0, 2000.0, 1)
+        if not ok:
+            return
+        pitch, ok = QInputDialog.getDouble(self, "Optics Settings", "Pixel pitch (µm):",
+                                           self.pixel_pitch * 1e6, 0.1, 50.0, 3)
+        if not ok:
+            return
+        method, ok = QInputDialog.getItem(self, "Optics Settings", "Propagation method:",
+                                          list(recon.METHODS), list(recon.METHODS).index(self.recon_method), False)
+        if not ok:
+            return
+        self.wavelength = wl * 1e-9
+        self.pixel_pitch = pitch * 1e-6
+        self.sensor_pitch = None
+        self.recon_method = method
+
+    def reconstruct_image(self):
+        if self.last_bw is None:
+            QMessageBox.warning(self, "No Image", "Capture or upload an image first")
+            return
+
+        z_mm, ok = QInputDialog.getDouble(self, "Reconstruct Hologram", "Distance to sample (mm):",
+                                          self.z_distance * 1e3, 0.001, 100.0, 3)
+        if not ok:
             return
+        self.z_distance = z_mm * 1e-3
 
-        image = cv2.imread(self.last_bw_path)
-        if image is None:
-            QMessageBox.critical(self, "Error", f"Failed to load {self.last_bw_path}")
+        frame, source = self.last_bw, self.last_bw_path
+        z, wavelength, pitch, method = self.z_distance, self.wavelength, self.pixel_pitch, self.recon_method
+
+        def compute(job):
+            h, w = frame.shape[:2]
+            if h * w > 8_000_000:
+                # Large sensors go tile by tile: less memory and every core busy
+                field = recon.reconstruct_tiled(frame, z, wavelength, pitch, method,
+                                                progress=lambda f, msg: job.progress(0.9 * f, msg))
+            else:
+                job.progress(0.05, "reconstructing")
+                field = recon.reconstruct(frame, z, wavelength, pitch, method)
+            job.progress(0.9, "saving")
+            fname = images.write_image(images.stamped_name("recon"), recon.to_uint8(recon.amplitude(field)))
+            return field, fname
+
+        job = self.jobs.submit("Reconstruct", compute)
+        job.finished.connect(lambda result: self.recon_done(result, source, f"Reconstruction at {z_mm:.3f} mm"))
+        job.failed.connect(lambda error: self.notify(f"Reconstruction failed: {error}"))
+
+    def recon_done(self, result, source, label):
+        field, fname = result
+        if source != self.last_bw_path:
+            # Another image was opened meanwhile; keep the new one's state
+            self.notify(f"{label} (for a previous image) saved to {fname}")
             return
+        self.last_recon = field
+        self.last_recon_path = fname
+        self.notify(f"{label} saved to {fname}")
 
-        tmpname = f"reportimg_{os.path.basename(self.last_bw_path)}"
-        cv2.imwrite(tmpname, image)
+    def reconstruct_region(self):
+        if self.last_bw is None:
+            QMessageBox.warning(self, "No Image", "Capture or upload an image first")
+            return
+        h, w = self.last_bw.shape[:2]
+        text, ok = QInputDialog.getText(self, "Reconstruct Region", f"Region x, y, width, height (frame {w}x{h}):",
+                                        text=f"{w // 4}, {h // 4}, {w // 2}, {h // 2}")
+        if not ok:
+            return
+        try:
+            roi = tuple(int(v) for v in text.replace(" ", "").split(","))
+            if len(roi) != 4:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Reconstruct Region", "Enter four integers: x, y, width, height")
+            return
+        z_mm, ok = QInputDialog.getDouble(self, "Reconstruct Region", "Distance to sample (mm):",
+                                          self.z_distance * 1e3, 0.001, 100.0, 3)
+        if not ok:
+            return
+        self.z_distance = z_mm * 1e-3
 
-        dlg = ReportDialog(tmpname)
+        frame, source = self.last_bw, self.last_bw_path
+        z, wavelength, pitch, method = self.z_distance, self.wavelength, self.pixel_pitch, self.recon_method
+
+        def compute(job):
+            job.progress(0.05, "reconstructing")
+            field = recon.reconstruct_roi(frame, roi, z, wavelength, pitch, method)
+            job.progress(0.9, "saving")
+            fname = images.write_image(images.stamped_name("recon_roi"), recon.to_uint8(recon.amplitude(field)))
+            return field, fname
+
+        job = self.jobs.submit("Reconstruct region", compute)
+        job.finished.connect(lambda result: self.recon_done(result, source, f"Region {roi} at {z_mm:.3f} mm"))
+        job.failed.connect(lambda error: self.notify(f"Region reconstruction failed: {error}"))
+
+    def phase_map_image(self):
+        if self.last_recon is None:
+            QMessageBox.warning(self, "No Reconstruction", "Reconstruct a hologram first")
+            return
+        method, ok = QInputDialog.getItem(self, "Phase Map", "Unwrapping method:", list(phase.METHODS), 0, False)
+        if not ok:
+            return
+        quality = phase.QUALITIES[0]
+        if method == "quality_guided":
+            quality, ok = QInputDialog.getItem(self, "Phase Map", "Quality map:", list(phase.QUALITIES), 0, False)
+            if not ok:
+                return
+
+        field, wavelength, source = self.last_recon, self.wavelength, self.last_bw_path
+        base = os.path.splitext(self.last_recon_path)[0]
+
+        def compute(job):
+            job.progress(0.05, "unwrapping phase")
+            phase_map = phase.phase_map(field, wavelength, method, quality=quality,
+                                        progress=lambda f, msg: job.progress(0.05 + 0.8 * f, msg))
+            job.progress(0.9, "saving")
+            _, preview = phase.save_phase(phase_map, base)
+            return phase_map, preview
+
+        job = self.jobs.submit("Phase map", compute)
+        job.finished.connect(lambda result: self.phase_done(result, source))
+        job.failed.connect(lambda error: self.notify(f"Phase map failed: {error}"))
+
+    def phase_done(self, result, source):
+        phase_map, preview = result
+        self.last_phase = (images.ImageHandle.from_file(preview), phase_map)
+        self.last_phase_source = source
+        self.notify(f"Saved phase map to {preview}: {phase_map.summary()}")
+
+    def count_objects(self):
+        if self.last_recon is None:
+            QMessageBox.warning(self, "No Reconstruction", "Reconstruct a hologram first")
+            return
+        planes = ["Amplitude"]
+        phase_map = None
+        if self.last_phase is not None and self.last_phase_source == self.last_bw_path:
+            phase_map = self.last_phase[1]
+            planes.append("Phase")
+        name = planes[0]
+        if len(planes) > 1:
+            name, ok = QInputDialog.getItem(self, "Count Objects", "Detect objects on:", planes, 0, False)
+            if not ok:
+                return
+
+        field, pitch, source = self.last_recon, self.pixel_pitch, self.last_bw_path
+        base = os.path.splitext(self.last_recon_path)[0]
+
+        def compute(job):
+            job.progress(0.05, "detecting objects")
+            plane = recon.amplitude(field) if name == "Amplitude" else phase_map.phase
+            result = detect.detect(plane, None if phase_map is None else phase_map.phase, pitch)
+            job.progress(0.8, "saving")
+            csv_path = result.save_csv(base + "_objects.csv")
+            overlay = images.ImageHandle.from_array(result.overlay(plane), source=name)
+            overlay.save(base + "_objects.png")
+            return result, overlay, csv_path
+
+        job = self.jobs.submit("Count objects", compute)
+        job.finished.connect(lambda result: self.count_done(result, source, name))
+        job.failed.connect(lambda error: self.notify(f"Object count failed: {error}"))
+
+    def count_done(self, result, source, name):
+        result, overlay, csv_path = result
+        summary = result.summary()
+        msg = f"{summary['count']} objects on the {name.lower()} plane"
+        if result.count:
+            msg += f", mean diameter {summary['diameter_mean_um']:.2f} µm"
+        msg += f"; saved measurements to {csv_path}"
+        if source != self.last_bw_path:
+            self.notify(msg + " (for a previous image)")
+            return
+        self.last_detection = (overlay, result)
+        self.last_detection_source = source
+        self.notify(msg)
+
+    def localize_particles(self):
+        if self.last_bw is None:
+            QMessageBox.warning(self, "No Image", "Capture or upload an image first")
+            return
+
+        title = "Localize Particles"
+        start, ok = QInputDialog.getDouble(self, title, "Start distance (mm):", 0.5, 0.001, 100.0, 3)
+        if not ok:
+            return
+        stop, ok = QInputDialog.getDouble(self, title, "Stop distance (mm):", 3.0, 0.001, 100.0, 3)
+        if not ok:
+            return
+        count, ok = QInputDialog.getInt(self, title, "Number of planes:", 100, 3, 2000)
+        if not ok:
+            return
+        fmt, ok = QInputDialog.getItem(self, title, "Export format:", list(localize.EXPORT_FORMATS), 0, False)
+        if not ok:
+            return
+
+        frame, source = self.last_bw, self.last_bw_path
+        wavelength, pitch, method = self.wavelength, self.pixel_pitch, self.recon_method
+        out_dir = images.stamped_name("particles", ext="")
+
+        def compute(job):
+            stack = recon.z_stack(frame, start * 1e-3, stop * 1e-3, count, wavelength=wavelength,
+                                  pixel_pitch=pitch, method=method)
+            particles = localize.localize(stack, progress=lambda f, msg: job.progress(0.95 * f, msg))
+            job.progress(0.96, "saving")
+            path = particles.save(os.path.join(out_dir, "particles." + fmt))
+            overview = images.ImageHandle.from_array(particles.overview(), source="particles")
+            overview.save(os.path.join(out_dir, "overview.png"))
+            return particles, overview, path
+
+        job = self.jobs.submit(title, compute)
+        job.finished.connect(lambda result: self.particles_done(result, source))
+        job.failed.connect(lambda error: self.notify(f"Particle localization failed: {error}"))
+
+    def particles_done(self, result, source):
+        particles, overview, path = result
+        self.last_particles = (overview, particles)
+        self.last_particles_source = source
+        self.notify(f"Localized {particles.count} particles, saved to {path}")
+
+    def track_objects(self):
+        title = "Track Objects"
+        source = QFileDialog.getExistingDirectory(self, "Burst Recording or Capture Folder",
+                                                  self.last_burst_dir or os.getcwd())
+        if not source:
+            return
+        radius, ok = QInputDialog.getDouble(self, title, "Largest move between frames (px):", 15.0, 1.0, 500.0, 1)
+        if not ok:
+            return
+        max_gap, ok = QInputDialog.getInt(self, title, "Frames an object may be missed:", 2, 0, 100)
+        if not ok:
+            return
+
+        pitch, image_source = self.pixel_pitch, self.last_bw_path
+        out_dir = images.stamped_name("tracks", ext="")
+
+        def compute(job):
+            tracks = track.track_sequence(source, out_dir, pitch, radius=radius, max_gap=max_gap,
+                                          progress=job.progress)
+            trajectories = images.ImageHandle.from_file(os.path.join(out_dir, track.TRAJECTORIES_FILE))
+            return tracks, trajectories
+
+        job = self.jobs.submit(title, compute)
+        job.finished.connect(lambda result: self.tracks_done(result, image_source, out_dir))
+        job.failed.connect(lambda error: self.notify(f"Tracking failed: {error}"))
+
+    def tracks_done(self, result, source, out_dir):
+        tracks, trajectories = result
+        self.last_tracks = (trajectories, tracks)
+        self.last_tracks_source = source
+        summary = tracks.summary()
+        message = f"{summary['tracks']} tracks over {summary['frames']} frames"
+        if tracks.count:
+            message += f", mean speed {summary['speed_mean_um_s']:.2f} µm/s"
+        self.notify(f"{message}, saved to {out_dir}")
+
+    def super_resolution(self):
+        title = "Pixel Super-Resolution"
+        source = QFileDialog.getExistingDirectory(self, "Burst Recording or Folder of Shifted Captures",
+                                                  self.last_burst_dir or os.getcwd())
+        if not source:
+            return
+        factor, ok = QInputDialog.getInt(self, title, "Upsampling factor:", 2, 2, 4)
+        if not ok:
+            return
+        method, ok = QInputDialog.getItem(self, title, "Method:", list(superres.METHODS), 0, False)
+        if not ok:
+            return
+
+        pitch = self.sensor_pitch or self.pixel_pitch
+        base = images.stamped_name("superres", ext="")
+
+        def compute(job):
+            sr = superres.super_resolve(source, factor, pitch, method,
+                                        progress=lambda f, msg: job.progress(0.95 * f, msg))
+            job.progress(0.96, "saving")
+            _, preview = sr.save(base)
+            return sr, preview
+
+        job = self.jobs.submit(title, compute)
+        job.finished.connect(self.superres_done)
+        job.failed.connect(lambda error: self.notify(f"Super-resolution failed: {error}"))
+
+    def superres_done(self, result):
+        sr, preview = result
+        handle = images.ImageHandle.from_file(preview)
+        if handle is None:
+            # The preview did not write or decode; show the fused image itself
+            handle = images.ImageHandle.from_array(sr.to_uint8(), source=sr.source)
+        sensor_pitch = self.sensor_pitch or self.pixel_pitch
+        self.set_current_image(handle)
+        # Processing uses the full-precision fused image at its finer pitch
+        # until another image is opened
+        self.last_bw = sr.image
+        self.sensor_pitch, self.pixel_pitch = sensor_pitch, sr.pixel_pitch
+        self.last_superres = sr
+        self.last_superres_source = self.last_bw_path
+        self.notify(f"Super-resolved {sr.summary()}; reconstruction now uses {sr.pixel_pitch * 1e6:.3f} µm pixels")
+
+    def zstack_sweep(self):
+        if self.last_bw is None:
+            QMessageBox.warning(self, "No Image", "Capture or upload an image first")
+            return
+
+        start, ok = QInputDialog.getDouble(self, "Z-Stack Sweep", "Start distance (mm):", 0.5, 0.001, 100.0, 3)
+        if not ok:
+            return
+        stop, ok = QInputDialog.getDouble(self, "Z-Stack Sweep", "Stop distance (mm):", 3.0, 0.001, 100.0, 3)
+        if not ok:
+            return
+        count, ok = QInputDialog.getInt(self, "Z-Stack Sweep", "Number of planes:", 50, 2, 1000)
+        if not ok:
+            return
+
+        frame, source = self.last_bw, self.last_bw_path
+        wavelength, pitch, method = self.wavelength, self.pixel_pitch, self.recon_method
+        out_dir = images.stamped_name("zstack", ext="")
+
+        def compute(job):
+            stack = recon.z_stack(frame, start * 1e-3, stop * 1e-3, count, wavelength=wavelength,
+                                  pixel_pitch=pitch, method=method)
+            # Full-precision planes go to one memory-mapped stack, written a
+            # chunk at a time; the PNGs are 8-bit previews read back from it
+            raw_path = rawstore.write_zstack(os.path.join(out_dir, "stack" + rawstore.RAW_EXT), stack,
+                                             progress=lambda f, msg: job.progress(0.7 * f, msg),
+                                             source=source)
+            raw = rawstore.open_raw(raw_path)
+            for i, plane in enumerate(raw.data):
+                job.progress(0.7 + 0.3 * i / count, f"preview {i + 1} of {count}")
+                z_mm = stack.distances[i] * 1e3
+                images.write_image(os.path.join(out_dir, f"plane_{i:03d}_{z_mm:.3f}mm.png"), recon.to_uint8(plane))
+            return raw
+
+        job = self.jobs.submit("Z-Stack Sweep", compute)
+        job.finished.connect(lambda raw: self.zstack_done(raw, out_dir))
+        job.failed.connect(lambda error: self.notify(f"Z-stack sweep failed: {error}"))
+
+    def zstack_done(self, raw, out_dir):
+        self.last_zstack = raw
+        self.notify(f"Saved {len(raw)} planes to {out_dir}")
+
+    def autofocus_image(self):
+        if self.last_bw is None:
+            QMessageBox.warning(self, "No Image", "Capture or upload an image first")
+            return
+
+        start, ok = QInputDialog.getDouble(self, "Autofocus", "Search from (mm):", 0.2, 0.001, 100.0, 3)
+        if not ok:
+            return
+        stop, ok = QInputDialog.getDouble(self, "Autofocus", "Search to (mm):", 5.0, 0.001, 100.0, 3)
+        if not ok:
+            return
+        metrics = list(autofocus.METRICS)
+        metric, ok = QInputDialog.getItem(self, "Autofocus", "Sharpness metric:", metrics,
+                                          metrics.index(autofocus.DEFAULT_METRIC), False)
+        if not ok:
+            return
+
+        # Large sensors get a first pass on a central crop to narrow the bracket
+        frame, source = self.last_bw, self.last_bw_path
+        h, w = frame.shape[:2]
+        downsample = 4 if h * w > 4_000_000 else 2 if h * w > 1_000_000 else 1
+        wavelength, pitch, method = self.wavelength, self.pixel_pitch, self.recon_method
+
+        def compute(job):
+            result = autofocus.autofocus(frame, start * 1e-3, stop * 1e-3, wavelength, pitch, method,
+                                         metric=metric, downsample=downsample, progress=job.progress)
+            saved = autofocus.save_focus(result, source) if source else None
+            return result, saved
+
+        job = self.jobs.submit("Autofocus", compute)
+        job.finished.connect(lambda result: self.autofocus_done(result, source))
+        job.failed.connect(lambda error: self.notify(f"Autofocus failed: {error}"))
+
+    def autofocus_done(self, result, source):
+        result, saved = result
+        msg = (f"Best focus at {result.z * 1e3:.3f} mm "
+               f"({result.evaluations} planes, {result.elapsed:.2f} s)")
+        if saved:
+            msg += f"; saved to {saved}"
+        if source != self.last_bw_path:
+            # Another image was opened while the search ran
+            self.notify(msg + " (for a previous image)")
+            return
+        self.z_distance = result.z
+        self.update_catalog(focus_z=result.z)
+        self.notify(msg)
+
+    def colorize_image(self):
+        sources = {}
+        if self.last_recon is not None:
+            sources["Reconstruction"] = lambda: recon.to_uint8(recon.amplitude(self.last_recon))
+        if self.last_bw is not None:
+            sources["Captured image"] = lambda: self.last_bw
+        if not sources:
+            QMessageBox.warning(self, "No Image", "Capture or upload an image first")
+            return
+        names = list(sources)
+        name = names[0]
+        if len(names) > 1:
+            name, ok = QInputDialog.getItem(self, "Colorize", "Image to colorize:", names, 0, False)
+            if not ok:
+                return
+
+        if self.colorizer is None:
+            if not self.color_model.ready:
+                self.statusBar().showMessage("Loading colorization model...")
+            try:
+                self.colorizer = colorize.Colorizer(self.color_net, DNN_BACKEND)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", str(e))
+                return
+            finally:
+                self.statusBar().clearMessage()
+
+        colored = images.ImageHandle.from_array(self.colorizer.colorize(sources[name]()), source=name)
+        fname = colored.save(images.stamped_name("color"))
+        self.last_color = colored
+        self.last_color_source = self.last_bw_path
+        QMessageBox.information(self, "Colorized",
+                                f"Saved {fname} ({self.colorizer.backend}, {self.colorizer.fps:.2f} frames/s)")
+
+    def generate_report(self):
+        if self.last_image is None:
+            QMessageBox.warning(self, "No Image", "Capture an image first")
+            return
+
+        dlg = ReportDialog(self.last_bw_path, self.last_image, self.thumbnail_loader.cache)
         if not dlg.exec_():
             return
         data = dlg.data
 
-        required_keys = [
-            'college_name', 'department', 'user', 'print_time', 'page_number', 'total_pages',
-            'sample_name', 'solvent', 'analysis', 'method', 'plate_material',
-            'batch_no', 'ar_no', 'equipment_no', 'reviewed_by', 'reviewed_date',
-            'analysed_by', 'analysed_date', 'software_version', 'status',
-            'image_name', 'image_captured_date', 'created_date', 'field_name'
-        ]
-        for key in required_keys:
-            if key not in data or not str(data[key]).strip():
-                QMessageBox.warning(self, "Missing Data", f"Missing required field: {key}")
-                return
+        import report  # reportlab and PIL are only needed once a report is requested
 
-        from PyQt5.QtWidgets import QFileDialog
-        from PIL import Image
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
+        missing = report.missing_fields(data)
+        if missing:
+            QMessageBox.warning(self, "Missing Data", f"Missing required field: {missing[0]}")
+            return
 
-        default_pdf_name = f"Report_{os.path.splitext(os.path.basename(tmpname))[0]}.pdf"
+        default_pdf_name = f"Report_{os.path.splitext(os.path.basename(self.last_bw_path))[0]}.pdf"
         pdf_path, _ = QFileDialog.getSaveFileName(self, "Save Report As", default_pdf_name, "PDF Files (*.pdf)")
 
         if not pdf_path:
@@ -1147,135 +1812,104 @@ class MainWindow(QMainWindow):
         if not pdf_path.lower().endswith(".pdf"):
             pdf_path += ".pdf"
 
-        c = canvas.Canvas(pdf_path, pagesize=A4)
-        w, h = A4
-        margin = 40
-        y = h - margin
-
-        # === Draw Header Logo ===
-        logo_path = "saglo.jpeg"
-        logo_height = 50  # desired height in points
-        logo_drawn = False
-        if os.path.exists(logo_path):
-            try:
-                c.drawImage(logo_path, margin, y - logo_height, height=logo_height, preserveAspectRatio=True, mask='auto')
-                logo_drawn = True
-            except Exception as e:
-                QMessageBox.warning(self, "Logo Error", f"Could not load logo: {e}")
-        if logo_drawn:
-            y -= (logo_height + 10)  # Add spacing below logo
-        else:
-            y -= 20  # fallback spacing
-
-        def draw_label_value(label, value, x, y, label_width=100):
-            c.drawString(x, y, f"{label}:")
-            c.drawString(x + label_width, y, value)
-
-        # Title
-        c.setFont("Helvetica-Bold", 14)
-        c.drawCentredString(w / 2, y, data['college_name'])
-        y -= 20
-        c.setFont("Helvetica", 10)
-        draw_label_value("Department", data['department'], margin, y)
-        draw_label_value("User", data['user'], w / 2, y)
-        y -= 15
-        draw_label_value("Print Time", data['print_time'], margin, y)
-        c.drawRightString(w - margin, y, f"Page {data['page_number']} of 2")
-        y -= 15
-        c.line(margin, y, w - margin, y)
-
-        # Sample info
-        y -= 30
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(margin, y, "Sample Details:")
-        y -= 15
-        c.setFont("Helvetica", 10)
-        draw_label_value("Sample Name", data['sample_name'], margin, y)
-        draw_label_value("Solvent", data['solvent'], w / 2, y)
-        y -= 15
-        draw_label_value("Analysis", data['analysis'], margin, y)
-        draw_label_value("Method", data['method'], w / 2, y)
-        y -= 15
-        draw_label_value("Slide Material", data['plate_material'], margin, y)
-        y -= 15
-        draw_label_value("Batch Number", data['batch_no'], margin, y)
-        draw_label_value("AR Number", data['ar_no'], w / 2, y)
-        y -= 15
-        draw_label_value("Equipment Number", data['equipment_no'], margin, y)
-        y -= 15
-        c.line(margin, y, w - margin, y)
-
-        # Authorization
-        y -= 30
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(margin, y, "Authorization:")
-        y -= 15
-        c.setFont("Helvetica", 10)
-        draw_label_value("Reviewed By", data['reviewed_by'], margin, y)
-        draw_label_value("Date", data['reviewed_date'], w / 2, y)
-        y -= 15
-        draw_label_value("Analysed By", data['analysed_by'], margin, y)
-        draw_label_value("Date", data['analysed_date'], w / 2, y)
-        y -= 15
-        draw_label_value("Software Version", data['software_version'], margin, y)
-        draw_label_value("Status", data['status'], w / 2, y)
-        y -= 15
-        c.line(margin, y, w - margin, y)
-
-        # Image Metadata
-        y -= 30
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(margin, y, "Image Info:")
-        y -= 15
-        c.setFont("Helvetica", 10)
-        draw_label_value("Image Name", data['image_name'], margin, y)
-        y -= 15
-        draw_label_value("Image Captured Date", data['image_captured_date'], margin, y)
-        draw_label_value("Created Date", data['created_date'], w / 2, y)
-        y -= 15
-        draw_label_value("Magnigication", data['field_name'], margin, y)
-        y -= 15
-        c.line(margin, y, w - margin, y)
-
-        c.setFont("Helvetica-Oblique", 9)
-        c.setFillColorRGB(0.4, 0.4, 0.4)  # gray color
-        c.drawCentredString(w / 2, 20, "Report generated by SAGLO-Holosoft Software")
-        
-        # Draw Image with dynamic size and avoid overlap
-        try:
-            img = Image.open(tmpname)
-            img_width, img_height = img.size
-            max_width = w - 2 * margin
-            aspect_ratio = img_height / img_width
-            draw_height = max_width * aspect_ratio
-
-            y -= (draw_height + 20)  # leave 20px spacing
-
-            if y < margin:
-                c.showPage()
-                y = h - margin - draw_height
-            
-            c.drawImage(tmpname, margin, y, width=max_width, height=draw_height, preserveAspectRatio=True, mask='auto')
-        except Exception as e:
-            QMessageBox.warning(self, "Image Error", f"Failed to add image: {e}")
-        y -= 15            
-        c.drawRightString(w - margin, y, f"Page 2 of 2")
-        # Footer Text
-        c.setFont("Helvetica-Oblique", 9)
-        c.setFillColorRGB(0.4, 0.4, 0.4)  # gray color
-        c.drawCentredString(w / 2, 20, "Report generated by SAGLO-Holosoft Software")
+        self.update_catalog(**{key: data[key] for key in catalog.REPORT_FIELDS if data.get(key)})
+
+        focus = autofocus.load_focus(self.last_bw_path)
+        extras = []
+        if self.last_color is not None and self.last_color_source == self.last_bw_path:
+            extras.append(("Colorized", self.last_color))
+        if self.last_phase is not None and self.last_phase_source == self.last_bw_path:
+            handle, phase_map = self.last_phase
+            extras.append((f"Phase map: {phase_map.summary()}", handle))
+        tables = []
+        if self.last_superres is not None and self.last_superres_source == self.last_bw_path:
+            tables = tables + self.last_superres.report_tables()
+        if self.last_detection is not None and self.last_detection_source == self.last_bw_path:
+            overlay, result = self.last_detection
+            extras.append(("Detected objects", overlay))
+            tables = tables + result.report_tables()
+        if self.last_particles is not None and self.last_particles_source == self.last_bw_path:
+            overview, particles = self.last_particles
+            extras.append(("Particle positions (top and side views, colour = depth)", overview))
+            tables = tables + particles.report_tables()
+        if self.last_tracks is not None and self.last_tracks_source == self.last_bw_path:
+            trajectories, tracks = self.last_tracks
+            if trajectories is not None:
+                extras.append(("Trajectories", trajectories))
+            tables = tables + tracks.report_tables()
+        # Pixels go to reportlab straight from memory, no temporary files
+        image = self.last_image
+
+        def render(job):
+            return report.draw_report(pdf_path, data, image, focus, extras, progress=job.progress,
+                                      tables=tables)
+
+        job = self.jobs.submit(os.path.basename(pdf_path), render)
+        job.finished.connect(lambda warnings: self.report_done(f"Saved PDF to {pdf_path}", warnings))
+        job.failed.connect(lambda error: self.notify(f"Report {pdf_path} failed: {error}"))
+        job.cancelled.connect(lambda: self.notify(f"Report {pdf_path} cancelled"))
+
+    def notify(self, message):
+        """Non-blocking completion notice: status bar text plus a taskbar alert."""
+        print(message)
+        self.statusBar().showMessage(message, 15000)
+        QApplication.alert(self)
+
+    def report_done(self, message, warnings):
+        for warning in warnings:
+            print(f"Report warning: {warning}")
+        if warnings:
+            message += f" ({len(warnings)} warning(s), see console)"
+        self.notify(message)
+
+    def closeEvent(self, event):
+        # Let running reports stop at their next checkpoint before exiting
+        self.jobs.shutdown()
+        self.catalog.close()
+        super().closeEvent(event)
+
+    def generate_batch_report(self):
+        samples_path, _ = QFileDialog.getOpenFileName(self, "Select Sample Sheet", "",
+                                                      "Sample Sheets (*.csv *.json)")
+        if not samples_path:
+            return
 
-        c.showPage()
-        c.save()
+        import report
 
         try:
-            os.remove(tmpname)
+            samples = report.load_samples(samples_path)
         except Exception as e:
-            print(f"Warning: Failed to delete temporary file: {e}")
+            QMessageBox.critical(self, "Error", f"Could not read {samples_path}: {e}")
+            return
+
+        modes = ["One consolidated PDF", "One PDF per sample"]
+        mode, ok = QInputDialog.getItem(self, "Batch Report", f"{len(samples)} samples. Output:", modes, 0, False)
+        if not ok:
+            return
+        per_sample = mode == modes[1]
+        if per_sample:
+            output = QFileDialog.getExistingDirectory(self, "Output Folder")
+        else:
+            output, _ = QFileDialog.getSaveFileName(self, "Save Report As", "Batch_Report.pdf", "PDF Files (*.pdf)")
+            if output and not output.lower().endswith(".pdf"):
+                output += ".pdf"
+        if not output:
+            return
 
-        QMessageBox.information(self, "Report", f"Saved PDF to {pdf_path}")
+        def render(job):
+            return report.render_batch(samples, output, per_sample, progress=job.progress)
 
+        def done(summary):
+            msg = f"Batch report: wrote {len(summary['reports'])} PDF(s)"
+            if summary['pages']:
+                msg += f" with {summary['pages']} pages"
+            warnings = [f"{source}: {w}" for source, ws in summary['warnings'].items() for w in ws]
+            self.report_done(msg, warnings)
 
+        job = self.jobs.submit(f"Batch report ({len(samples)} samples)", render)
+        job.finished.connect(done)
+        job.failed.connect(lambda error: self.notify(f"Batch report failed: {error}"))
+        job.cancelled.connect(lambda: self.notify("Batch report cancelled"))
 
     def view_history(self):
         if not os.path.exists(HISTORY_FILE):
@@ -1320,21 +1954,27 @@ class MainWindow(QMainWindow):
 # -- Application Entry Point --------------------------------------------------
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    startup_mark("QApplication")
 
     # Directly continue with normal login flow (no activation checks)
     welcome = WelcomeDialog()
+    startup_mark("welcome dialog")
     if welcome.exec_() == QDialog.Accepted:
         if welcome.role == "admin":
             dialog = AdminLoginDialog()
             if dialog.exec_() == QDialog.Accepted:
-                w = MainWindow()
+                startup_mark("login (interactive)")
+                w = MainWindow(operator=dialog.user.text())
                 w.show()
+                QTimer.singleShot(0, lambda: startup_mark("first event loop turn"))
                 sys.exit(app.exec_())
         else:
             dialog = UserLoginDialog()
             if dialog.exec_() == QDialog.Accepted:
-                w = MainWindow()
+                startup_mark("login (interactive)")
+                w = MainWindow(operator=dialog.user.text())
                 w.show()
+                QTimer.singleShot(0, lambda: startup_mark("first event loop turn"))
                 sys.exit(app.exec_())
 
         if dialog.exec_() == QDialog.Accepted:
@@ -0,0 +1,216 @@
+"""Cell/particle detection and counting on reconstructed planes.
+
+A plane (amplitude, intensity or unwrapped phase) is flattened against its
+slowly varying background, thresholded, cleaned with a small opening and
+split into objects with ``cv2.connectedComponentsWithStats``. Per-object
+measurements (area, equivalent diameter, centroid, bounding box, mean
+intensity and mean phase) come from the component stats and a couple of
+``np.bincount`` passes over the label image, so the cost is a few
+whole-image operations however many objects there are: a 5 MP frame takes
+well under a second.
+
+    result = detect(recon.amplitude(field), phase=phase_map.phase, pixel_pitch=1.4e-6)
+    result.save_csv("capture_objects.csv")
+    tables = result.report_tables()
+
+Nothing in here imports Qt.
+"""
+import csv
+import os
+
+import cv2
+import numpy as np
+
+from reconstruction import DEFAULT_PIXEL_PITCH, to_uint8
+
+THRESHOLDS = ("otsu", "sigma")
+POLARITIES = ("auto", "bright", "dark")
+COLUMNS = ("id", "x_px", "y_px", "area_px", "diameter_um", "bbox_x", "bbox_y", "bbox_w", "bbox_h",
+           "mean_intensity", "mean_phase")
+
+
+def flatten_background(plane, sigma=50):
+    """``plane`` minus a heavily blurred copy of itself (float32).
+
+    The blur runs on a downsampled copy, so it costs the same for any sigma.
+    """
+    plane = np.asarray(plane, np.float32)
+    if not sigma:
+        return plane - np.float32(np.median(plane[::4, ::4]))
+    factor = max(1, int(sigma // 4))
+    h, w = plane.shape
+    small = cv2.resize(plane, (max(1, w // factor), max(1, h // factor)), interpolation=cv2.INTER_AREA)
+    small = cv2.GaussianBlur(small, (0, 0), sigma / factor)
+    return plane - cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+def guess_polarity(flat):
+    """'bright' if the longer tail of the histogram is above the background."""
+    lo, mid, hi = np.percentile(flat[::4, ::4], (0.5, 50, 99.5))
+    return "bright" if hi - mid >= mid - lo else "dark"
+
+
+def threshold(flat, method="otsu", polarity="bright", k=3.0):
+    """Binary uint8 mask (0/255) of object pixels in a background-flattened plane."""
+    signal = flat if polarity == "bright" else -flat
+    if method == "sigma":
+        # Robust noise estimate from the median absolute deviation
+        sample = signal[::4, ::4]
+        median = float(np.median(sample))
+        noise = 1.4826 * float(np.median(np.abs(sample - median)))
+        return ((signal > median + k * noise) * np.uint8(255)).astype(np.uint8)
+    if method == "otsu":
+        lo, hi = np.percentile(signal[::4, ::4], (0.1, 99.9))
+        scaled = np.clip((signal - lo) * (255.0 / max(hi - lo, 1e-12)), 0, 255).astype(np.uint8)
+        _, mask = cv2.threshold(scaled, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        return mask
+    raise ValueError(f"Unknown threshold method: {method}")
+
+
+class Detection:
+    """Objects found in one plane; every per-object attribute is an array."""
+
+    def __init__(self, labels, stats, centroids, intensity, phase, pixel_pitch, settings):
+        self.labels = labels  # int32 label image, 0 is background
+        self.pixel_pitch = pixel_pitch
+        self.settings = settings
+        self.bbox = stats[:, :4]
+        self.area = stats[:, cv2.CC_STAT_AREA]
+        self.centroids = centroids
+        self.mean_intensity = intensity
+        self.mean_phase = phase  # None without a phase plane
+        self.shape = labels.shape
+
+    def __len__(self):
+        return len(self.area)
+
+    @property
+    def count(self):
+        return len(self.area)
+
+    @property
+    def diameter_um(self):
+        """Diameter of the circle with the same area, in micrometres."""
+        return np.sqrt(4.0 * self.area / np.pi) * self.pixel_pitch * 1e6
+
+    @property
+    def field_area_mm2(self):
+        return self.shape[0] * self.shape[1] * (self.pixel_pitch * 1e3) ** 2
+
+    def rows(self):
+        phase = self.mean_phase if self.mean_phase is not None else np.full(self.count, np.nan)
+        for i in range(self.count):
+            x, y, w, h = (int(v) for v in self.bbox[i])
+            yield (i + 1, round(float(self.centroids[i, 0]), 2), round(float(self.centroids[i, 1]), 2),
+                   int(self.area[i]), round(float(self.diameter_um[i]), 3), x, y, w, h,
+                   round(float(self.mean_intensity[i]), 4),
+                   None if np.isnan(phase[i]) else round(float(phase[i]), 4))
+
+    def save_csv(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.rows())
+        return path
+
+    def summary(self):
+        d = self.diameter_um
+        result = {
+            'count': self.count,
+            'density_per_mm2': self.count / self.field_area_mm2 if self.field_area_mm2 else 0.0,
+            'covered_fraction': float(self.area.sum()) / (self.shape[0] * self.shape[1]),
+        }
+        if self.count:
+            result.update(diameter_mean_um=float(d.mean()), diameter_median_um=float(np.median(d)),
+                          diameter_std_um=float(d.std()), diameter_min_um=float(d.min()),
+                          diameter_max_um=float(d.max()), area_mean_px=float(self.area.mean()))
+            if self.mean_phase is not None:
+                result['mean_phase_rad'] = float(self.mean_phase.mean())
+        return result
+
+    def histogram(self, bins=8):
+        """(edges in um, counts) of the equivalent diameters."""
+        if not self.count:
+            return np.zeros(bins + 1), np.zeros(bins, int)
+        counts, edges = np.histogram(self.diameter_um, bins=bins)
+        return edges, counts
+
+    def report_tables(self, bins=8):
+        """Summary and size distribution as report tables: [(caption, rows)] with a header row."""
+        s = self.summary()
+        summary = [("Measurement", "Value"),
+                   ("Objects", f"{s['count']}"),
+                   ("Density", f"{s['density_per_mm2']:.1f} /mm²"),
+                   ("Area covered", f"{s['covered_fraction'] * 100:.2f} %")]
+        if self.count:
+            summary += [("Equivalent diameter (mean ± SD)",
+                         f"{s['diameter_mean_um']:.2f} ± {s['diameter_std_um']:.2f} µm"),
+                        ("Equivalent diameter (median)", f"{s['diameter_median_um']:.2f} µm"),
+                        ("Equivalent diameter (range)",
+                         f"{s['diameter_min_um']:.2f} - {s['diameter_max_um']:.2f} µm")]
+            if 'mean_phase_rad' in s:
+                summary.append(("Mean phase", f"{s['mean_phase_rad']:.3f} rad"))
+        tables = [("Object Statistics", summary)]
+        if self.count:
+            edges, counts = self.histogram(bins)
+            distribution = [("Diameter (µm)", "Objects", "Share")]
+            distribution += [(f"{lo:.2f} - {hi:.2f}", f"{n}", f"{n * 100 / self.count:.1f} %")
+                             for lo, hi, n in zip(edges[:-1], edges[1:], counts)]
+            tables.append(("Size Distribution", distribution))
+        return tables
+
+    def overlay(self, plane):
+        """BGR uint8 preview of ``plane`` with object outlines drawn in red."""
+        base = cv2.cvtColor(to_uint8(plane), cv2.COLOR_GRAY2BGR)
+        mask = (self.labels > 0).astype(np.uint8)
+        edge = mask - cv2.erode(mask, np.ones((3, 3), np.uint8))
+        base[edge.astype(bool)] = (0, 0, 255)
+        return base
+
+
+def detect(plane, phase=None, pixel_pitch=DEFAULT_PIXEL_PITCH, method="otsu", polarity="auto",
+           k=3.0, background_sigma=50, min_area=9, max_area=None, open_size=3):
+    """Detect objects in a reconstructed intensity/amplitude or phase plane.
+
+    ``phase`` (same shape, radians) is averaged per object when given.
+    Objects smaller than ``min_area`` or larger than ``max_area`` pixels
+    are dropped, as are objects touching the frame edge.
+    """
+    plane = np.asarray(plane, np.float32)
+    flat = flatten_background(plane, background_sigma)
+    if polarity == "auto":
+        polarity = guess_polarity(flat)
+    mask = threshold(flat, method, polarity, k)
+    if open_size and open_size > 1:
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (open_size, open_size))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    n, labels, stats, centroids = cv2.connectedComponentsWithStats(mask, connectivity=8, ltype=cv2.CV_32S)
+
+    # Keep/drop decisions per label, applied to the label image in one lookup
+    area = stats[:, cv2.CC_STAT_AREA]
+    x, y, w, h = (stats[:, i] for i in range(4))
+    ny, nx = labels.shape
+    keep = area >= min_area
+    if max_area:
+        keep &= area <= max_area
+    keep &= (x > 0) & (y > 0) & (x + w < nx) & (y + h < ny)
+    keep[0] = False
+    new_ids = np.zeros(n, np.int32)
+    new_ids[keep] = np.arange(1, int(keep.sum()) + 1, dtype=np.int32)
+    labels = new_ids[labels]
+
+    count = int(keep.sum())
+    flat_labels = labels.ravel()
+    sums = np.bincount(flat_labels, weights=plane.ravel(), minlength=count + 1)[1:]
+    mean_intensity = sums / np.maximum(area[keep], 1)
+    mean_phase = None
+    if phase is not None:
+        phase_sums = np.bincount(flat_labels, weights=np.asarray(phase, np.float32).ravel(),
+                                 minlength=count + 1)[1:]
+        mean_phase = phase_sums / np.maximum(area[keep], 1)
+    settings = {'method': method, 'polarity': polarity, 'k': k, 'background_sigma': background_sigma,
+                'min_area': min_area, 'max_area': max_area}
+    return Detection(labels, stats[keep], centroids[keep], mean_intensity, mean_phase, pixel_pitch, settings)
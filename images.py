@@ -0,0 +1,200 @@
+"""Image file I/O shared by the GUI and the batch command line.
+
+Nothing in here imports Qt, so it is safe to use from worker processes.
+ImageHandle keeps a decoded frame together with its encoded bytes and
+metadata, so a frame is decoded and encoded at most once on its way from
+capture to report.
+"""
+import glob
+import hashlib
+import io
+import os
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+import rawstore
+from rawstore import RAW_EXT
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", RAW_EXT)
+
+# Files written by MainWindow.capture_image / upload_image
+CAPTURE_PATTERNS = ("capture_*", "upload_*")
+
+
+def stamped_name(prefix, ext=".png", directory="", precise=False):
+    """File name like ``capture_20250101_120000.png`` (milliseconds if precise)."""
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3] if precise else datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(directory, f"{prefix}_{ts}{ext}")
+
+
+def read_image(path, flags=cv2.IMREAD_COLOR):
+    """Read an image, or return None when it is missing or undecodable.
+
+    Raw ``.npy`` frames come back memory-mapped and unconverted.
+    """
+    if path.lower().endswith(RAW_EXT):
+        try:
+            return rawstore.open_raw(path).data
+        except (OSError, ValueError):
+            return None
+    return cv2.imread(path, flags)
+
+
+def write_image(path, image):
+    """Write an image, creating the parent directory if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if not cv2.imwrite(path, image):
+        raise IOError(f"Failed to write {path}")
+    return path
+
+
+def find_images(inputs, patterns=CAPTURE_PATTERNS):
+    """Expand files, directories and glob patterns into a sorted list of images.
+
+    Directories are searched (non-recursively) for ``patterns``.
+    """
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in patterns:
+                found.update(p for p in glob.glob(os.path.join(item, pattern))
+                             if p.lower().endswith(IMAGE_EXTENSIONS))
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            found.update(p for p in glob.glob(item) if p.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(found)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Hex SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageHandle:
+    """A decoded image plus its encoded bytes and metadata, all in memory.
+
+    ``array`` is the decoded BGR/gray frame. ``data`` holds the encoded file
+    contents (``ext`` says which format) when known: images read from disk
+    keep their original bytes, so saving a copy never re-encodes, and
+    in-memory frames are encoded once, on first ``save``/``encoded`` call.
+    With ``ext`` ".npy" the frame is kept raw (see rawstore): raw files are
+    opened memory-mapped, and saving one writes the pixels unencoded plus
+    a JSON header with the metadata.
+    """
+
+    def __init__(self, array, data=None, ext=".png", metadata=None):
+        self.array = array
+        self.data = data
+        self.ext = ext.lower()
+        self.metadata = dict(metadata or {})
+        self.metadata.setdefault('width', int(array.shape[1]))
+        self.metadata.setdefault('height', int(array.shape[0]))
+        self.path = self.metadata.get('path')
+
+    @classmethod
+    def from_file(cls, path, flags=cv2.IMREAD_COLOR):
+        """Read a file once; returns None when it cannot be decoded."""
+        if path.lower().endswith(RAW_EXT):
+            return cls.from_raw(path)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        array = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+        if array is None:
+            return None
+        metadata = {
+            'path': path,
+            'source': path,
+            'modified': datetime.fromtimestamp(os.path.getmtime(path)).isoformat(),
+        }
+        return cls(array, data, os.path.splitext(path)[1] or ".png", metadata)
+
+    @classmethod
+    def from_raw(cls, path):
+        """Memory-map a raw frame; pixels are only read when used."""
+        try:
+            raw = rawstore.open_raw(path)
+        except (OSError, ValueError):
+            return None
+        metadata = {k: v for k, v in raw.meta.items() if k not in ('format', 'shape', 'dtype')}
+        metadata.update(path=path, source=path)
+        metadata.setdefault('modified', datetime.fromtimestamp(os.path.getmtime(path)).isoformat())
+        return cls(raw.data, None, RAW_EXT, metadata)
+
+    @classmethod
+    def from_array(cls, array, ext=".png", **metadata):
+        metadata.setdefault('captured_at', datetime.now().isoformat())
+        return cls(array, ext=ext, metadata=metadata)
+
+    def content_hash(self):
+        """Hex SHA-1 identifying the pixels (of the encoded bytes when known)."""
+        if 'sha1' not in self.metadata:
+            if self.data is not None:
+                digest = hashlib.sha1(self.data)
+            else:
+                digest = hashlib.sha1(str(self.array.shape).encode())
+                digest.update(np.ascontiguousarray(self.array).data)
+            self.metadata['sha1'] = digest.hexdigest()
+        return self.metadata['sha1']
+
+    @property
+    def size(self):
+        """(width, height) in pixels."""
+        return self.metadata['width'], self.metadata['height']
+
+    def encoded(self, ext=None):
+        """Encoded bytes in ``ext`` format (default: the handle's own)."""
+        ext = (ext or self.ext).lower()
+        if self.data is not None and ext == self.ext:
+            return self.data
+        if ext == RAW_EXT:
+            data = rawstore.encode_raw(self.array)
+        else:
+            ok, buf = cv2.imencode(ext, self.array)
+            if not ok:
+                raise IOError(f"Failed to encode image as {ext}")
+            data = buf.tobytes()
+        if self.data is None:
+            self.data, self.ext = data, ext
+        return data
+
+    def save(self, path):
+        """Write the encoded bytes to ``path``; its extension picks the format."""
+        data = self.encoded(os.path.splitext(path)[1] or self.ext)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        if path.lower().endswith(RAW_EXT):
+            rawstore.write_meta(path, self.array.shape, self.array.dtype,
+                                {k: v for k, v in self.metadata.items() if k not in ('path', 'source')})
+        self.path = self.metadata['path'] = path
+        return path
+
+    def image_reader(self):
+        """A reportlab ImageReader built from the decoded pixels, no temp file."""
+        from PIL import Image
+        from reportlab.lib.utils import ImageReader
+
+        if self.array.ndim == 2:
+            return ImageReader(Image.fromarray(self.array))
+        rgb = cv2.cvtColor(self.array, cv2.COLOR_BGR2RGB)
+        return ImageReader(Image.fromarray(rgb))
+
+    def bytes_reader(self):
+        """A reportlab ImageReader over the encoded bytes."""
+        from reportlab.lib.utils import ImageReader
+
+        return ImageReader(io.BytesIO(self.encoded()))
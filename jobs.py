@@ -0,0 +1,172 @@
+"""Background jobs for long-running work started from the GUI.
+
+A job is a plain function ``fn(job, *args)`` run on a QThreadPool. It
+reports progress through ``job.progress(fraction, message)``, which also
+raises JobCancelled once the user has cancelled the job, so long jobs stop
+at their next progress update. Results, errors and cancellations come back
+to the GUI thread as Qt signals; nothing blocks the event loop.
+"""
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QHBoxLayout, QLabel, QProgressBar, QToolButton, QWidget
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job(QObject):
+    """One unit of background work and its progress/outcome signals."""
+
+    progressChanged = pyqtSignal(int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, title, fn, args=(), kwargs=None):
+        super().__init__()
+        self.title = title
+        self.state = "queued"
+        self.percent = 0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        """Raise JobCancelled if the job has been cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def progress(self, fraction, message=""):
+        """Report progress (0..1) from the worker; also a cancellation point."""
+        self.check()
+        self.percent = max(0, min(100, int(fraction * 100)))
+        self.message = message
+        self.progressChanged.emit(self.percent, message)
+
+    def _run(self):
+        if self._cancel.is_set():
+            self.state = "cancelled"
+            self.cancelled.emit()
+            return
+        self.state = "running"
+        try:
+            self.result = self._fn(self, *self._args, **self._kwargs)
+        except JobCancelled:
+            self.state = "cancelled"
+            self.cancelled.emit()
+        except Exception as e:
+            traceback.print_exc()
+            self.state = "failed"
+            self.error = str(e)
+            self.failed.emit(self.error)
+        else:
+            self.state = "done"
+            self.percent = 100
+            self.finished.emit(self.result)
+
+
+class _Runner(QRunnable):
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def run(self):
+        self.job._run()
+
+
+class JobManager(QObject):
+    """Runs jobs on a thread pool and keeps track of the unfinished ones."""
+
+    jobAdded = pyqtSignal(object)
+    jobEnded = pyqtSignal(object)
+
+    def __init__(self, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self.jobs = []
+
+    def submit(self, title, fn, *args, **kwargs):
+        """Queue ``fn(job, *args, **kwargs)``; returns the Job.
+
+        The job starts on the next event-loop turn, so the caller can
+        connect to its signals first without racing a fast job.
+        """
+        job = Job(title, fn, args, kwargs)
+        for signal in (job.finished, job.failed, job.cancelled):
+            signal.connect(lambda *_, job=job: self._ended(job))
+        self.jobs.append(job)
+        self.jobAdded.emit(job)
+        QTimer.singleShot(0, lambda: self.pool.start(_Runner(job)))
+        return job
+
+    def _ended(self, job):
+        if job in self.jobs:
+            self.jobs.remove(job)
+        self.jobEnded.emit(job)
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            job.cancel()
+
+    def shutdown(self, timeout_ms=10000):
+        self.cancel_all()
+        return self.pool.waitForDone(timeout_ms)
+
+
+class JobStatusWidget(QWidget):
+    """Status-bar widget: running job count, current progress and a cancel button."""
+
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.label = QLabel()
+        self.bar = QProgressBar()
+        self.bar.setMaximumWidth(160)
+        self.bar.setRange(0, 100)
+        self.cancel_btn = QToolButton()
+        self.cancel_btn.setText("Cancel")
+        self.cancel_btn.setToolTip("Cancel all running jobs")
+        self.cancel_btn.clicked.connect(manager.cancel_all)
+        layout.addWidget(self.label)
+        layout.addWidget(self.bar)
+        layout.addWidget(self.cancel_btn)
+
+        manager.jobAdded.connect(self._watch)
+        manager.jobEnded.connect(lambda _: self.refresh())
+        self.refresh()
+
+    def _watch(self, job):
+        job.progressChanged.connect(lambda *_: self.refresh())
+        self.refresh()
+
+    def refresh(self):
+        jobs = self.manager.jobs
+        self.setVisible(bool(jobs))
+        if not jobs:
+            return
+        # Show the least advanced job so the bar does not jump around
+        job = min(jobs, key=lambda j: j.percent)
+        prefix = f"{len(jobs)} jobs: " if len(jobs) > 1 else ""
+        text = f"{prefix}{job.title}"
+        if job.message:
+            text += f" ({job.message})"
+        self.label.setText(text)
+        self.bar.setValue(job.percent)
@@ -0,0 +1,396 @@
+"""3D particle localization from a z-stack.
+
+Every plane of a reconstruction sweep is segmented (see detect) and each
+object gets a local sharpness score, the mean gradient energy in a fixed
+window around it; a coarse map of the same score is kept per plane.
+Detections of the same particle in nearby planes are then linked: a grid
+hash on (x cell, y cell, plane) finds candidate neighbours with sorted
+searches, so linking costs about one lookup per detection and neighbour
+cell instead of comparing every pair. Linked detections form a particle,
+whose z is the peak of the focus profile through all planes at its
+position, refined with a parabola through the neighbouring planes. The
+same grid hash suppresses the halo detections around sharper particles.
+
+    stack = recon.z_stack(frame, 0.2e-3, 5e-3, 200, wavelength=wl, pixel_pitch=pitch)
+    particles = localize(stack, pixel_pitch=pitch)
+    particles.save_csv("particles.csv")
+
+Nothing in here imports Qt.
+"""
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import detect
+from reconstruction import DEFAULT_PIXEL_PITCH
+
+EXPORT_FORMATS = ("csv", "parquet")
+COLUMNS = ("id", "x_px", "y_px", "z_m", "x_um", "y_um", "z_um", "diameter_um", "sharpness", "planes",
+           "first_plane", "last_plane")
+
+
+class Detections:
+    """Objects found on all planes, concatenated into flat arrays.
+
+    ``focus`` holds the coarse focus maps of every plane, (planes, ny //
+    stride, nx // stride), used to refine each particle's depth.
+    """
+
+    def __init__(self, plane, x, y, area, sharpness, focus=None, stride=1, window=21):
+        self.plane = plane
+        self.x = x
+        self.y = y
+        self.area = area
+        self.sharpness = sharpness
+        self.focus = focus
+        self.stride = stride
+        self.window = window
+
+    def __len__(self):
+        return len(self.plane)
+
+    def profiles(self, x, y):
+        """Focus value at each (x, y) through all planes: (planes, len(x))."""
+        _, h, w = self.focus.shape
+        col = np.clip(np.round(np.asarray(x) / self.stride).astype(int), 0, w - 1)
+        row = np.clip(np.round(np.asarray(y) / self.stride).astype(int), 0, h - 1)
+        return self.focus[:, row, col]
+
+
+def _sharpness(amplitude):
+    gx = cv2.Sobel(amplitude, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(amplitude, cv2.CV_32F, 0, 1, ksize=3)
+    mean = float(amplitude.mean()) or 1.0
+    return (gx * gx + gy * gy) / np.float32(mean * mean)
+
+
+def focus_energy(amplitude, window=21):
+    """Normalized gradient energy averaged over a ``window`` x ``window`` box at every pixel."""
+    return cv2.boxFilter(_sharpness(amplitude), -1, (window, window))
+
+
+def detect_plane(amplitude, index, pixel_pitch, window=21, stride=7, **options):
+    """Detections of one plane: (plane, x, y, area, sharpness) arrays and the focus map.
+
+    Sharpness is the gradient energy in a fixed ``window`` around each
+    object, so it compares fairly between planes where the object's
+    blurred outline has a different size. The focus map is the same
+    energy sampled every ``stride`` pixels.
+    """
+    result = detect.detect(amplitude, None, pixel_pitch, **options)
+    x, y = result.centroids[:, 0], result.centroids[:, 1]
+    energy = focus_energy(amplitude, window)
+    ny, nx = energy.shape
+    sharpness = energy[np.clip(np.round(y).astype(int), 0, ny - 1), np.clip(np.round(x).astype(int), 0, nx - 1)]
+    return (np.full(result.count, index, np.int32), x, y, result.area.astype(np.int64),
+            sharpness.astype(np.float64), energy[::stride, ::stride].copy())
+
+
+def detect_stack(stack, pixel_pitch=DEFAULT_PIXEL_PITCH, workers=None, progress=None, window=21, **options):
+    """Segment every plane of a ZStack (or (n, ny, nx) array) into Detections.
+
+    Planes are reconstructed a chunk at a time and segmented in parallel;
+    each chunk is released before the next one is built. Only the
+    detections and a coarse focus map per plane are kept.
+    """
+    n = len(stack)
+    stride = max(1, window // 3)
+    options.setdefault('method', "sigma")
+    options.setdefault('k', 4.0)
+    if options.get('polarity', "auto") == "auto":
+        # One polarity for the whole sweep, from the middle plane
+        middle = np.asarray(stack[n // 2], np.float32)
+        options['polarity'] = detect.guess_polarity(detect.flatten_background(
+            middle, options.get('background_sigma', 50)))
+        if hasattr(stack, 'release'):
+            stack.release()
+    chunk_size = getattr(stack, 'chunk_size', 8)
+    parts = []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for start in range(0, n, chunk_size):
+            chunk = range(start, min(start + chunk_size, n))
+            if hasattr(stack, 'materialize'):
+                stack.materialize(chunk)
+            parts.extend(pool.map(lambda i: detect_plane(np.asarray(stack[i], np.float32), i, pixel_pitch,
+                                                         window, stride, **options), chunk))
+            if hasattr(stack, 'release'):
+                stack.release(chunk)
+            if progress:
+                progress(chunk.stop / n, f"plane {chunk.stop} of {n}")
+    if not parts:
+        return Detections(*(np.empty(0) for _ in range(5)), stride=stride, window=window)
+    *columns, focus = zip(*parts)
+    return Detections(*(np.concatenate(c) for c in columns), focus=np.stack(focus), stride=stride,
+                      window=window)
+
+
+def link(detections, radius, max_gap=1, min_gap=1):
+    """Pairs (i, j) of detections within ``radius`` px and ``min_gap``..``max_gap`` planes apart.
+
+    Detections are bucketed into radius-sized grid cells per plane; for
+    each neighbouring cell and plane offset, a sorted search yields the
+    range of candidates, which are expanded and distance-checked as arrays.
+    """
+    cx = np.floor(detections.x / radius).astype(np.int64)
+    cy = np.floor(detections.y / radius).astype(np.int64)
+    p = detections.plane.astype(np.int64)
+    span = int(max(cx.max(initial=0), cy.max(initial=0))) + 3  # room for the -1..+1 offsets
+
+    def keys(dx, dy, dp):
+        return ((p + dp) * span + (cy + dy + 1)) * span + (cx + dx + 1)
+
+    order = np.argsort(keys(0, 0, 0), kind='stable')
+    sorted_keys = keys(0, 0, 0)[order]
+    pairs_i, pairs_j = [], []
+    for dp in range(min_gap, max_gap + 1):
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                query = keys(dx, dy, dp)
+                lo = np.searchsorted(sorted_keys, query, 'left')
+                hi = np.searchsorted(sorted_keys, query, 'right')
+                counts = hi - lo
+                if not counts.any():
+                    continue
+                i = np.repeat(np.arange(len(p)), counts)
+                # Position of each candidate inside its run of equal keys
+                offsets = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+                j = order[np.repeat(lo, counts) + offsets]
+                close = (detections.x[i] - detections.x[j]) ** 2 + (detections.y[i] - detections.y[j]) ** 2
+                close = close <= radius * radius
+                pairs_i.append(i[close])
+                pairs_j.append(j[close])
+    if not pairs_i:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+
+def components(n, i, j):
+    """Connected-component label (0..k-1) of ``n`` nodes joined by edges (i, j)."""
+    label = np.arange(n)
+    while True:
+        low = np.minimum(label[i], label[j])
+        before = label.copy()
+        np.minimum.at(label, i, low)
+        np.minimum.at(label, j, low)
+        # Pointer jumping: follow labels to their own label
+        while True:
+            jumped = label[label]
+            if np.array_equal(jumped, label):
+                break
+            label = jumped
+        if np.array_equal(label, before):
+            break
+    return np.unique(label, return_inverse=True)[1]
+
+
+class Particles:
+    """Localized particles; each attribute is an array with one entry per particle."""
+
+    def __init__(self, x, y, z, area, sharpness, planes, first_plane, last_plane, distances, pixel_pitch,
+                 shape=None):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.area = area
+        self.sharpness = sharpness
+        self.planes = planes
+        self.first_plane = first_plane
+        self.last_plane = last_plane
+        self.distances = distances
+        self.pixel_pitch = pixel_pitch
+        self.shape = shape
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def count(self):
+        return len(self.x)
+
+    @property
+    def diameter_um(self):
+        return np.sqrt(4.0 * self.area / np.pi) * self.pixel_pitch * 1e6
+
+    def columns(self):
+        """Column name -> array, in COLUMNS order."""
+        um = self.pixel_pitch * 1e6
+        return {
+            'id': np.arange(1, self.count + 1),
+            'x_px': self.x, 'y_px': self.y, 'z_m': self.z,
+            'x_um': self.x * um, 'y_um': self.y * um, 'z_um': self.z * 1e6,
+            'diameter_um': self.diameter_um, 'sharpness': self.sharpness, 'planes': self.planes,
+            'first_plane': self.first_plane, 'last_plane': self.last_plane,
+        }
+
+    def save_csv(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        columns = self.columns()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(zip(*(np.asarray(columns[name]).tolist() for name in COLUMNS)))
+        return path
+
+    def save_parquet(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from e
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        pq.write_table(pa.table({name: np.asarray(values) for name, values in self.columns().items()}), path)
+        return path
+
+    def save(self, path):
+        """Export by extension: .csv or .parquet."""
+        if path.lower().endswith(".parquet"):
+            return self.save_parquet(path)
+        return self.save_csv(path)
+
+    def report_tables(self):
+        rows = [("Measurement", "Value"), ("Particles", f"{self.count}")]
+        if self.count:
+            z_um = self.z * 1e6
+            rows += [("Depth range", f"{z_um.min():.1f} - {z_um.max():.1f} µm"),
+                     ("Depth (median)", f"{np.median(z_um):.1f} µm"),
+                     ("Diameter (mean ± SD)", f"{self.diameter_um.mean():.2f} ± {self.diameter_um.std():.2f} µm"),
+                     ("Planes per particle (median)", f"{int(np.median(self.planes))}")]
+        rows.append(("Planes swept", f"{len(self.distances)} ({self.distances[0] * 1e3:.3f} - "
+                                     f"{self.distances[-1] * 1e3:.3f} mm)" if len(self.distances) else "0"))
+        return [("3D Particle Localization", rows)]
+
+    def overview(self, size=900):
+        """BGR image: top view (x, y) and side view (x, z), coloured by depth."""
+        ny, nx = self.shape or (int(self.y.max(initial=1)) + 1, int(self.x.max(initial=1)) + 1)
+        scale = size / max(nx, ny)
+        top_h = int(ny * scale)
+        side_h = size // 3
+        image = np.full((top_h + side_h + 30, int(nx * scale) + 20, 3), 255, np.uint8)
+        z0, z1 = (float(self.distances[0]), float(self.distances[-1])) if len(self.distances) else (0.0, 1.0)
+        span = (z1 - z0) or 1.0
+        shade = np.clip((self.z - z0) / span * 255, 0, 255).astype(np.uint8)
+        colors = cv2.applyColorMap(shade.reshape(-1, 1), cv2.COLORMAP_VIRIDIS).reshape(-1, 3)
+        radius = np.maximum(2, (np.sqrt(self.area / np.pi) * scale).astype(int))
+        cv2.rectangle(image, (10, 10), (10 + int(nx * scale), 10 + top_h), (0, 0, 0), 1)
+        side_top = top_h + 20
+        cv2.rectangle(image, (10, side_top), (10 + int(nx * scale), side_top + side_h), (0, 0, 0), 1)
+        for x, y, z, r, color in zip(self.x, self.y, self.z, radius, colors.tolist()):
+            cv2.circle(image, (10 + int(x * scale), 10 + int(y * scale)), int(r), color, -1)
+            zy = side_top + int((z - z0) / span * side_h)
+            cv2.circle(image, (10 + int(x * scale), zy), 2, color, -1)
+        cv2.putText(image, f"z {z0 * 1e3:.2f} mm", (14, side_top + 14), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                    (0, 0, 0), 1)
+        cv2.putText(image, f"z {z1 * 1e3:.2f} mm", (14, side_top + side_h - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                    (0, 0, 0), 1)
+        return image
+
+
+def _parabola(s_minus, s0, s_plus):
+    """Sub-plane offset (-0.5..0.5) of the peak of a parabola through three samples."""
+    denom = s_minus - 2 * s0 + s_plus
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = np.where(np.isfinite(denom) & (denom < 0), 0.5 * (s_minus - s_plus) / denom, 0.0)
+    return np.clip(np.nan_to_num(shift), -0.5, 0.5)
+
+
+def merge(detections, distances, pixel_pitch=DEFAULT_PIXEL_PITCH, radius=None, max_gap=1, min_planes=2,
+          min_contrast=20.0, separation=6, shape=None):
+    """Group Detections into Particles (best-focus z per particle).
+
+    ``radius`` (px) defaults to the median detection radius; particles
+    seen in fewer than ``min_planes`` planes are dropped as noise.
+
+    With focus maps, z is the peak of the focus profile through all planes
+    at the particle's position. Particles whose peak is below
+    ``min_contrast`` times the median focus value are dropped, and of
+    particles within one focus window and ``separation`` planes of each
+    other (the halo of a sharper particle) only the sharpest is kept.
+    """
+    distances = np.asarray(distances, np.float64)
+    n = len(detections)
+    empty = np.empty(0)
+    if not n:
+        return Particles(empty, empty, empty, empty, empty, empty, empty, empty, distances, pixel_pitch, shape)
+    if radius is None:
+        radius = max(2.0, float(np.median(np.sqrt(detections.area / np.pi))))
+    i, j = link(detections, radius, max_gap)
+    group = components(n, i, j)
+    groups = int(group.max()) + 1
+    planes = np.bincount(group, minlength=groups)
+
+    # Sharpest detection per group: sort by group, then sharpness descending
+    order = np.lexsort((-detections.sharpness, group))
+    first = np.flatnonzero(np.r_[True, group[order][1:] != group[order][:-1]])
+    best = order[first]
+    x, y = detections.x[best], detections.y[best]
+
+    if detections.focus is not None:
+        profiles = detections.profiles(x, y).astype(np.float64)
+        best_plane = profiles.argmax(axis=0)
+        columns = np.arange(groups)
+        s0 = profiles[best_plane, columns]
+        padded = np.pad(profiles, ((1, 1), (0, 0)), constant_values=np.nan)
+        s_minus, s_plus = padded[best_plane, columns], padded[best_plane + 2, columns]
+    else:
+        best_plane = detections.plane[best]
+        s0 = detections.sharpness[best]
+        # Neighbouring planes' sharpness of the same group, by sorted search
+        key = group.astype(np.int64) * len(distances) + detections.plane
+        key_order = np.argsort(key)
+        sorted_key = key[key_order]
+
+        def sharpness_at(plane):
+            wanted = np.arange(groups, dtype=np.int64) * len(distances) + plane
+            pos = np.clip(np.searchsorted(sorted_key, wanted), 0, max(n - 1, 0))
+            found = sorted_key[pos] == wanted
+            values = detections.sharpness[key_order[pos]]
+            return np.where(found & (plane >= 0) & (plane < len(distances)), values, np.nan)
+
+        s_minus, s_plus = sharpness_at(best_plane - 1), sharpness_at(best_plane + 1)
+    step = float(np.mean(np.diff(distances))) if len(distances) > 1 else 0.0
+    z = distances[best_plane] + _parabola(s_minus, s0, s_plus) * step
+
+    first_plane = np.full(groups, len(distances))
+    last_plane = np.zeros(groups, np.int64)
+    np.minimum.at(first_plane, group, detections.plane)
+    np.maximum.at(last_plane, group, detections.plane)
+
+    keep = planes >= min_planes
+    if detections.focus is not None:
+        keep &= s0 >= min_contrast * float(np.median(detections.focus))
+        # Non-maximum suppression among the survivors
+        kept = np.flatnonzero(keep)
+        peaks = Detections(best_plane[kept], x[kept], y[kept], None, s0[kept])
+        i, j = link(peaks, detections.window, separation, min_gap=0)
+        weaker = (s0[kept[i]] < s0[kept[j]]) | ((s0[kept[i]] == s0[kept[j]]) & (i > j))
+        keep[kept[i[weaker]]] = False
+        keep[kept[j[~weaker & (i != j)]]] = False
+    area = detections.area[best]
+    return Particles(x[keep], y[keep], z[keep], area[keep], s0[keep], planes[keep], first_plane[keep],
+                     last_plane[keep], distances, pixel_pitch, shape)
+
+
+def localize(stack, pixel_pitch=None, distances=None, radius=None, max_gap=1, min_planes=2,
+             min_contrast=20.0, workers=None, progress=None, **options):
+    """Detect and merge particles through a stack; returns Particles.
+
+    ``stack`` is a reconstruction.ZStack, or a rawstore.RawArray of
+    amplitude planes (as written by write_zstack), whose header supplies
+    the distances and pixel pitch.
+    """
+    meta = getattr(stack, 'meta', {})
+    pixel_pitch = pixel_pitch or getattr(stack, 'pixel_pitch', None) or meta.get('pixel_pitch') or DEFAULT_PIXEL_PITCH
+    if distances is None:
+        distances = getattr(stack, 'distances', None)
+        distances = meta['distances'] if distances is None else distances
+    detections = detect_stack(stack, pixel_pitch, workers, progress, **options)
+    shape = tuple(stack.shape)
+    return merge(detections, distances, pixel_pitch, radius=radius, max_gap=max_gap, min_planes=min_planes,
+                 min_contrast=min_contrast, shape=shape[-2:])
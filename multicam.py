@@ -0,0 +1,108 @@
+"""Synchronized acquisition from several cameras at once.
+
+Each camera runs its own camera.CameraWorker grab thread into its own
+FrameRing, so devices never wait on each other and aggregate throughput
+grows with the number of cameras. ``synchronize`` picks one frame per
+camera for a common instant: it waits until every camera has delivered a
+frame grabbed after the request, takes the latest of those stamps as the
+reference time, and then uses the frame nearest to it from each ring.
+Stamps come from the driver where available (see camera.DeviceClock).
+
+An acquisition record is a directory with one frame per camera and
+``record.json`` listing cameras, sequence numbers, timestamps and the skew
+between the earliest and latest frame.
+
+Nothing in here imports Qt.
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import images
+
+RECORD_FILE = "record.json"
+
+
+class SyncedFrames:
+    """One frame per camera for a common instant."""
+
+    def __init__(self, cameras, items, reference):
+        self.cameras = list(cameras)
+        self.items = list(items)  # (seq, timestamp, frame) per camera
+        self.reference = reference
+
+    @property
+    def timestamps(self):
+        return [item[1] for item in self.items]
+
+    @property
+    def skew(self):
+        """Seconds between the earliest and the latest frame."""
+        return max(self.timestamps) - min(self.timestamps)
+
+    def frames(self):
+        return [item[2] for item in self.items]
+
+
+def synchronize(rings, cameras=None, after=None, timeout=2.0):
+    """Wait for a frame from every ring grabbed after ``after`` and match them up.
+
+    Raises TimeoutError naming the cameras that delivered nothing in time.
+    """
+    after = time.time() if after is None else after
+    cameras = list(range(len(rings))) if cameras is None else list(cameras)
+    deadline = time.monotonic() + timeout
+    first = []
+    for camera, ring in zip(cameras, rings):
+        item = ring.latest()
+        while item is None or item[1] < after:
+            remaining = deadline - time.monotonic()
+            item = ring.wait_newer(item[0] if item else 0, remaining) if remaining > 0 else None
+            if item is None:
+                break
+        first.append(item)
+    missing = [camera for camera, item in zip(cameras, first) if item is None]
+    if missing:
+        raise TimeoutError(f"No frame from camera(s) {', '.join(map(str, missing))} within {timeout:g} s")
+    reference = max(item[1] for item in first)
+    # Cameras that answered early may have a newer frame closer to the reference now
+    items = [ring.nearest(reference) or item for ring, item in zip(rings, first)]
+    return SyncedFrames(cameras, items, reference)
+
+
+def write_record(out_dir, synced, ext=".png", store=None, writers=None, **meta):
+    """Save a SyncedFrames set as one acquisition record; returns the record dict.
+
+    Frames are encoded in parallel, one writer per camera. ``store(handle)``
+    returns the path to use instead of writing into ``out_dir`` (e.g. the
+    catalog); the record still goes to ``out_dir``.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    record_id = os.path.basename(os.path.normpath(out_dir))
+
+    def save(camera, item):
+        seq, stamp, frame = item
+        handle = images.ImageHandle.from_array(
+            frame, ext, camera=camera, acquisition=record_id, seq=seq, timestamp=stamp,
+            captured_at=datetime.fromtimestamp(stamp).isoformat(), **meta)
+        if store is not None:
+            return store(handle)
+        return handle.save(os.path.join(out_dir, f"cam{camera}{ext}"))
+
+    with ThreadPoolExecutor(max_workers=writers or len(synced.cameras)) as pool:
+        paths = list(pool.map(save, synced.cameras, synced.items))
+
+    record = {
+        'id': record_id,
+        'reference': synced.reference,
+        'captured_at': datetime.fromtimestamp(synced.reference).isoformat(),
+        'skew_s': synced.skew,
+        'frames': [{'camera': camera, 'seq': item[0], 'timestamp': item[1], 'path': path}
+                   for camera, item, path in zip(synced.cameras, synced.items, paths)],
+        'meta': meta,
+    }
+    with open(os.path.join(out_dir, RECORD_FILE), 'w') as f:
+        json.dump(record, f, indent=2, default=str)
+    return record
@@ -0,0 +1,207 @@
+"""Acquisition-time hologram preprocessing: averaging and flat-field normalization.
+
+FrameAverager keeps float32 running accumulators for the mean of many
+frames (everything since the last reset, or a sliding window) and can give
+the per-pixel median of a bounded window. All buffers are allocated from
+the first frame and reused, so feeding a frame allocates nothing.
+
+Normalizer applies the usual lensless flat-field correction in place:
+
+    normalized = (frame - dark) / (background - dark)
+
+where ``dark`` is an averaged frame with the light off and ``background``
+one with the light on but no sample. ReferenceLibrary keeps these
+reference frames per camera and acquisition settings as raw files.
+
+Nothing in here imports Qt.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import rawstore
+
+REFERENCE_DIR = os.path.join("data", "references")
+REFERENCE_KINDS = ("dark", "background")
+
+
+def _gray_into(frame, out):
+    """Copy ``frame`` as single-channel into the preallocated ``out``."""
+    if frame.ndim == 3:
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY if frame.shape[2] == 3 else cv2.COLOR_BGRA2GRAY, dst=out)
+    else:
+        np.copyto(out, frame)
+    return out
+
+
+class FrameAverager:
+    """Running mean (and optionally median) of gray frames, in float32.
+
+    With ``window`` = None the mean covers every frame since ``reset``.
+    With a window, only the last ``window`` frames count: they are kept in
+    a preallocated ring, and the oldest one is subtracted from the sum as a
+    new one comes in. ``median=True`` also needs the ring (``window`` is
+    required then).
+    """
+
+    def __init__(self, window=None, median=False):
+        if median and not window:
+            raise ValueError("A median needs a bounded window")
+        self.window = window
+        self.median_enabled = median
+        self.count = 0
+        self._sum = None
+        self._gray = None
+        self._ring = None
+        self._next = 0
+        self._mean = None
+        self._lock = threading.Lock()
+
+    def _allocate(self, frame):
+        shape = frame.shape[:2]
+        self._sum = np.zeros(shape, np.float32)
+        self._mean = np.empty(shape, np.float32)
+        self._gray = np.empty(shape, frame.dtype)
+        if self.window:
+            self._ring = np.empty((self.window,) + shape, frame.dtype)
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self._next = 0
+            if self._sum is not None:
+                self._sum.fill(0)
+
+    def add(self, frame):
+        with self._lock:
+            if self._sum is None:
+                self._allocate(frame)
+            if self._ring is not None:
+                slot = self._ring[self._next]
+                if self.count >= self.window:
+                    np.subtract(self._sum, slot, out=self._sum)
+                _gray_into(frame, slot)
+                np.add(self._sum, slot, out=self._sum)
+                self._next = (self._next + 1) % self.window
+                self.count = min(self.count + 1, self.window)
+            else:
+                np.add(self._sum, _gray_into(frame, self._gray), out=self._sum)
+                self.count += 1
+
+    def mean(self, out=None):
+        """Mean of the frames so far as float32 (into ``out`` if given)."""
+        with self._lock:
+            if not self.count:
+                return None
+            out = self._mean if out is None else out
+            np.multiply(self._sum, np.float32(1.0 / self.count), out=out)
+            return out
+
+    def median(self):
+        """Per-pixel median of the frames in the window, as float32."""
+        with self._lock:
+            if self._ring is None or not self.count:
+                return None
+            return np.median(self._ring[:self.count], axis=0).astype(np.float32)
+
+
+class Normalizer:
+    """Dark-frame and background normalization, applied in place."""
+
+    def __init__(self, dark=None, background=None, eps=1e-3):
+        self.dark = None if dark is None else np.asarray(dark, np.float32)
+        self.gain = None
+        if background is not None:
+            flat = np.asarray(background, np.float32)
+            if self.dark is not None:
+                flat = flat - self.dark
+            # Dead pixels in the background must not blow up to infinity
+            flat = np.maximum(flat, eps * max(float(flat.mean()), eps))
+            self.gain = (1.0 / flat).astype(np.float32)
+
+    @property
+    def active(self):
+        return self.dark is not None or self.gain is not None
+
+    def apply(self, frame, out=None):
+        """Normalized float32 frame. Pass ``out=frame`` (a float32 gray frame) to work in place."""
+        if out is None:
+            out = np.empty(frame.shape[:2], np.float32)
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        reference = self.dark if self.dark is not None else self.gain
+        if reference is not None and frame.shape != reference.shape:
+            h, w = reference.shape
+            raise ValueError(f"Reference frames are {w}x{h}, frame is {frame.shape[1]}x{frame.shape[0]}")
+        if self.dark is not None:
+            np.subtract(frame, self.dark, out=out)
+        elif out is not frame:
+            np.copyto(out, frame, casting='unsafe')
+        if self.gain is not None:
+            np.multiply(out, self.gain, out=out)
+        return out
+
+
+def settings_key(camera, settings=None):
+    """File-name-safe key for a camera and the settings that affect references."""
+    settings = settings or {}
+    digest = hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:10]
+    return f"cam{camera}_{digest}"
+
+
+class ReferenceLibrary:
+    """Dark and background frames stored per camera and acquisition settings.
+
+    ``settings`` is any JSON-able dict of what the references depend on
+    (resolution, exposure, gain, wavelength, ...); different settings keep
+    separate references.
+    """
+
+    def __init__(self, root=REFERENCE_DIR):
+        self.root = root
+
+    def path(self, kind, camera, settings=None):
+        if kind not in REFERENCE_KINDS:
+            raise ValueError(f"Unknown reference kind: {kind}")
+        return os.path.join(self.root, f"{settings_key(camera, settings)}_{kind}{rawstore.RAW_EXT}")
+
+    def save(self, kind, camera, frame, settings=None, frames=None):
+        return rawstore.write_raw(self.path(kind, camera, settings), np.asarray(frame, np.float32),
+                                  kind=kind, camera=camera, settings=settings or {}, frames=frames)
+
+    def load(self, kind, camera, settings=None):
+        path = self.path(kind, camera, settings)
+        if not os.path.exists(path):
+            return None
+        return np.array(rawstore.open_raw(path).data)
+
+    def normalizer(self, camera, settings=None):
+        """Normalizer from whatever references exist (inactive if none)."""
+        return Normalizer(self.load("dark", camera, settings), self.load("background", camera, settings))
+
+
+class AveragingSink:
+    """Averages the next ``count`` frames from a CameraWorker sink.
+
+    ``on_done(mean)`` is called on the grab thread with the float32 mean
+    once enough frames arrived; the sink ignores frames after that.
+    """
+
+    def __init__(self, count, on_done, median=False):
+        self.count = count
+        self.on_done = on_done
+        self.averager = FrameAverager(window=count if median else None, median=median)
+        self.done = False
+
+    def __call__(self, frame, timestamp=None, seq=None):
+        if self.done:
+            return
+        self.averager.add(frame)
+        if self.averager.count >= self.count:
+            self.done = True
+            result = self.averager.median() if self.averager.median_enabled else self.averager.mean().copy()
+            self.on_done(result)
@@ -0,0 +1,222 @@
+"""Raw storage for holograms and z-stacks.
+
+Frames are stored uncompressed as standard ``.npy`` files next to a JSON
+header (``<base>.json``) holding the optics and acquisition metadata.
+Writing is a straight copy of the sensor buffer, and reading goes through
+``np.memmap``, so reconstruction, ROI viewing and autofocus only touch the
+bytes they use. A z-stack is one (planes, height, width) array: every
+plane is a contiguous chunk, and stacks larger than RAM are written plane
+by plane and read back the same way.
+
+    write_raw("capture.npy", frame, wavelength=532e-9, pixel_pitch=1.4e-6)
+    raw = open_raw("capture.npy")
+    roi = raw.data[100:612, 200:712]     # reads only these rows
+"""
+import io
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+RAW_EXT = ".npy"
+FORMAT_VERSION = 1
+
+
+def meta_path(path):
+    """The JSON header that goes with a raw file."""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def _json_ready(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_meta(path, shape, dtype, meta):
+    header = {k: _json_ready(v) for k, v in meta.items()}
+    header.update(format=FORMAT_VERSION, shape=list(shape), dtype=np.dtype(dtype).str)
+    with open(meta_path(path), 'w') as f:
+        json.dump(header, f, indent=2, default=str)
+
+
+def read_meta(path):
+    """Header of a raw file; minimal (shape/dtype only) if the JSON is missing."""
+    try:
+        with open(meta_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        data = np.load(path, mmap_mode='r')
+        return {'shape': list(data.shape), 'dtype': data.dtype.str}
+
+
+def encode_raw(array):
+    """The ``.npy`` bytes of ``array`` (header plus a plain copy of the pixels)."""
+    buf = io.BytesIO()
+    np.lib.format.write_array(buf, np.ascontiguousarray(array), allow_pickle=False)
+    return buf.getvalue()
+
+
+def write_raw(path, array, **meta):
+    """Write one frame (or any array) and its JSON header; returns ``path``."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+    write_meta(path, array.shape, array.dtype, meta)
+    return path
+
+
+class RawWriter:
+    """Fills a raw file of known shape piece by piece, e.g. a z-stack per plane.
+
+    The file is created at full size up front and memory-mapped, so
+    ``writer[i] = plane`` only ever holds one plane in RAM.
+    """
+
+    def __init__(self, path, shape, dtype=np.float32, **meta):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.meta = meta
+        self.data = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=tuple(shape))
+
+    def __setitem__(self, index, value):
+        self.data[index] = value
+
+    def close(self):
+        if self.data is not None:
+            self.data.flush()
+            write_meta(self.path, self.data.shape, self.data.dtype, self.meta)
+            self.data = None
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _npy_header(shape, dtype, size=None):
+    """A version 1.0 ``.npy`` header, space-padded to ``size`` bytes (default: next multiple of 64)."""
+    text = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+        np.lib.format.dtype_to_descr(np.dtype(dtype)), tuple(int(n) for n in shape))
+    fixed = len(np.lib.format.MAGIC_PREFIX) + 2 + 2 + 1  # magic, version, length, newline
+    size = size or -(-(fixed + len(text)) // 64) * 64
+    if fixed + len(text) > size:
+        raise ValueError(f"Shape {tuple(shape)} does not fit a {size} byte header")
+    text += " " * (size - fixed - len(text)) + "\n"
+    return np.lib.format.MAGIC_PREFIX + bytes([1, 0]) + struct.pack("<H", len(text)) + text.encode("latin1")
+
+
+class StackWriter:
+    """Writes a raw stack frame by frame when the final frame count is not known.
+
+    Unlike RawWriter nothing is allocated up front: the file grows as
+    frames are written (``writer[i] = frame``, from any thread), and
+    ``close`` trims it to the frames recorded and rewrites the ``.npy``
+    header to match. ``capacity`` only sizes the header.
+    """
+
+    def __init__(self, path, capacity, frame_shape, dtype, **meta):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.meta = meta
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.frames = 0  # one past the highest index written
+        self._header_size = len(_npy_header((int(capacity),) + self.frame_shape, self.dtype))
+        self._lock = threading.Lock()
+        self._file = open(path, 'w+b')
+        self._file.write(_npy_header((0,) + self.frame_shape, self.dtype, self._header_size))
+
+    def __setitem__(self, index, frame):
+        frame = np.ascontiguousarray(frame, self.dtype)
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match the stack's {self.frame_shape}")
+        with self._lock:
+            self._file.seek(self._header_size + index * self.frame_bytes)
+            self._file.write(frame.data)
+            self.frames = max(self.frames, index + 1)
+
+    def close(self, frames=None):
+        """Finish the file with ``frames`` frames (default: as many as were written)."""
+        with self._lock:
+            if self._file is None:
+                return self.path
+            frames = self.frames if frames is None else int(frames)
+            shape = (frames,) + self.frame_shape
+            self._file.truncate(self._header_size + frames * self.frame_bytes)
+            self._file.seek(0)
+            self._file.write(_npy_header(shape, self.dtype, self._header_size))
+            self._file.close()
+            self._file = None
+        write_meta(self.path, shape, self.dtype, self.meta)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RawArray:
+    """A raw file opened for reading: ``data`` is a memmap, ``meta`` its header."""
+
+    def __init__(self, path, mode='r'):
+        self.path = path
+        self.data = np.load(path, mmap_mode=mode)
+        self.meta = read_meta(path)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def roi(self, x, y, w, h, plane=None):
+        """(x, y, w, h) window of a frame, or of one plane of a stack, as an array."""
+        source = self.data if plane is None else self.data[plane]
+        return np.array(source[y:y + h, x:x + w])
+
+
+def open_raw(path, mode='r'):
+    return RawArray(path, mode)
+
+
+def write_zstack(path, stack, progress=None, **meta):
+    """Stream a reconstruction.ZStack to ``path`` a chunk of planes at a time.
+
+    Planes are released from the stack once written, so a stack larger
+    than memory can be saved. Distances and optics go into the header.
+    ``progress(fraction, message)`` is called after every plane.
+    """
+    ny, nx = stack.shape
+    dtype = np.complex64 if stack.output == "field" else np.float32
+    meta = dict(meta, distances=stack.distances, wavelength=stack.wavelength,
+                pixel_pitch=stack.pixel_pitch, method=stack.method, output=stack.output)
+    with RawWriter(path, (len(stack), ny, nx), dtype, **meta) as writer:
+        for start in range(0, len(stack), stack.chunk_size):
+            chunk = range(start, min(start + stack.chunk_size, len(stack)))
+            stack.materialize(chunk)
+            for i in chunk:
+                writer[i] = stack[i]
+                if progress:
+                    progress((i + 1) / len(stack), f"plane {i + 1} of {len(stack)}")
+            stack.release(chunk)
+    return path
@@ -0,0 +1,573 @@
+"""Headless hologram reconstruction for lensless in-line holography.
+
+Everything in here works on plain NumPy arrays so it can be used from the
+GUI (MainWindow works on ``self.last_bw``) as well as from scripts.
+Distances, wavelengths and pixel pitches are in metres.
+"""
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Default optics of our lensless rigs
+DEFAULT_WAVELENGTH = 532e-9     # green laser diode
+DEFAULT_PIXEL_PITCH = 1.4e-6    # 5 MP CMOS sensor
+DEFAULT_DISTANCE = 1e-3         # sample-to-sensor distance
+
+METHODS = ("angular_spectrum", "fresnel")
+
+# Threads per FFT when scipy is available; -1 means one per core. Process
+# pools set this to 1 so workers do not oversubscribe the machine.
+FFT_WORKERS = -1
+
+
+# -- FFT helpers ---------------------------------------------------------------
+_scipy_fft = False  # resolved on first use; importing scipy.fft costs ~150 ms
+
+
+def _scipy():
+    global _scipy_fft
+    if _scipy_fft is False:
+        try:  # scipy's pocketfft can use every core; NumPy's is single threaded
+            import scipy.fft as _scipy_fft
+        except ImportError:
+            _scipy_fft = None
+    return _scipy_fft
+
+
+def fft2(a, workers=None, overwrite=False):
+    """2-D FFT over the last two axes, multithreaded when scipy is present.
+
+    With ``overwrite`` the input may be reused for the output, which saves
+    a full copy on large frames.
+    """
+    if _scipy() is not None:
+        return _scipy_fft.fft2(a, axes=(-2, -1), workers=FFT_WORKERS if workers is None else workers,
+                               overwrite_x=overwrite)
+    return np.fft.fft2(a, axes=(-2, -1))
+
+
+def ifft2(a, overwrite=False, workers=None):
+    """Inverse 2-D FFT over the last two axes."""
+    if _scipy() is not None:
+        return _scipy_fft.ifft2(a, axes=(-2, -1), workers=FFT_WORKERS if workers is None else workers,
+                                overwrite_x=overwrite)
+    return np.fft.ifft2(a, axes=(-2, -1))
+
+
+def fast_length(n):
+    """Smallest FFT-friendly length >= n."""
+    if _scipy() is not None:
+        return _scipy_fft.next_fast_len(int(n))
+    length = 1
+    while length < n:
+        length *= 2
+    # 3 * 2^k is nearly as fast and often much closer
+    three = 3 * length // 4
+    return three if three >= n else length
+
+
+# -- Input conversion ----------------------------------------------------------
+def to_gray(frame):
+    """Return a frame (gray or BGR, any integer/float dtype) as float32 2-D."""
+    frame = np.asarray(frame)
+    if frame.ndim == 3:
+        if frame.shape[2] == 1:
+            frame = frame[:, :, 0]
+        else:
+            # Same BGR weights as cv2.cvtColor(..., COLOR_BGR2GRAY)
+            weights = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+            return frame[:, :, :3].astype(np.float32) @ weights
+    return frame.astype(np.float32, copy=False)
+
+
+def hologram_field(frame, mean=None):
+    """Complex64 field at the sensor plane (amplitude = sqrt of intensity).
+
+    Intensities are divided by ``mean``, by default the frame's own mean;
+    tiles of a larger frame pass the whole frame's.
+    """
+    gray = to_gray(frame)
+    mean = (float(gray.mean()) if mean is None else float(mean)) or 1.0
+    # In place on one float32 copy: this runs once per frame on the hot path
+    amplitude = np.maximum(gray, 0)
+    amplitude *= np.float32(1.0 / mean)
+    np.sqrt(amplitude, out=amplitude)
+    field = np.zeros(gray.shape, dtype=np.complex64)
+    field.real = amplitude
+    return field
+
+
+# -- Transfer functions --------------------------------------------------------
+def _frequencies(shape, pixel_pitch):
+    ny, nx = shape
+    fy = np.fft.fftfreq(ny, d=pixel_pitch)
+    fx = np.fft.fftfreq(nx, d=pixel_pitch)
+    return fy[:, None] ** 2 + fx[None, :] ** 2
+
+
+def wavenumber_offset(method, shape, wavelength, pixel_pitch):
+    """Split the axial wavenumber as kz = k0 + dk for the given method.
+
+    Returns (k0, dk, evanescent). dk is small enough to be held in float32
+    without losing phase accuracy, and every transfer function is then
+    H(z) = exp(i k0 z) * exp(i z dk), which lets z-sweeps build many
+    kernels from one dk array. ``evanescent`` is a mask or None.
+    """
+    f2 = _frequencies(shape, pixel_pitch)
+    k0 = 2 * np.pi / wavelength
+    if method == "angular_spectrum":
+        arg = (1.0 / wavelength ** 2) - f2
+        evanescent = arg < 0
+        np.maximum(arg, 0, out=arg)
+        # sqrt(a) - 1/l written to avoid cancellation at low frequencies
+        dk = -2 * np.pi * f2 / (np.sqrt(arg) + 1.0 / wavelength)
+        if not evanescent.any():
+            evanescent = None
+    elif method == "fresnel":
+        dk = -np.pi * wavelength * f2
+        evanescent = None
+    else:
+        raise ValueError(f"Unknown propagation method: {method}")
+    return k0, dk.astype(np.float32), evanescent
+
+
+def kernels_from_offset(k0, dk, evanescent, z):
+    """Transfer function(s) for a scalar z or a 1-D array of z values.
+
+    For an array the result has shape (len(z),) + dk.shape.
+    """
+    z = np.asarray(z, dtype=np.float64)
+    zb = z.reshape(z.shape + (1, 1))
+    phase = zb.astype(np.float32) * dk
+    kernel = np.empty(phase.shape, dtype=np.complex64)
+    np.cos(phase, out=kernel.real)
+    np.sin(phase, out=kernel.imag)
+    del phase
+    carrier = np.exp(1j * k0 * z).astype(np.complex64)
+    kernel *= carrier.reshape(zb.shape)
+    if evanescent is not None:
+        kernel[..., evanescent] = 0
+    return kernel
+
+
+def angular_spectrum_kernel(shape, wavelength, pixel_pitch, z):
+    """Angular-spectrum transfer function H(fx, fy) in unshifted FFT layout.
+
+    Evanescent components (fx^2 + fy^2 > 1/wavelength^2) are suppressed.
+    """
+    return kernels_from_offset(*wavenumber_offset("angular_spectrum", shape, wavelength, pixel_pitch), z)
+
+
+def fresnel_kernel(shape, wavelength, pixel_pitch, z):
+    """Paraxial (Fresnel) transfer function in unshifted FFT layout."""
+    return kernels_from_offset(*wavenumber_offset("fresnel", shape, wavelength, pixel_pitch), z)
+
+
+_KERNELS = {
+    "angular_spectrum": angular_spectrum_kernel,
+    "fresnel": fresnel_kernel,
+}
+
+
+class TransferFunctionCache:
+    """Thread-safe LRU cache of transfer functions.
+
+    Keys are (method, shape, wavelength, pitch, z); the cache is bounded by
+    the total number of bytes held, since a 5 MP complex64 kernel is 40 MB.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(method, shape, wavelength, pixel_pitch, z):
+        # Round so 1e-3 and 0.001000000001 share an entry
+        return (method, tuple(shape), round(wavelength, 15), round(pixel_pitch, 15), round(z, 12))
+
+    def get(self, method, shape, wavelength, pixel_pitch, z):
+        if method not in _KERNELS:
+            raise ValueError(f"Unknown propagation method: {method}")
+        key = self.key(method, shape, wavelength, pixel_pitch, z)
+        with self._lock:
+            kernel = self._items.get(key)
+            if kernel is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return kernel
+            self.misses += 1
+        # Build outside the lock so other threads are not blocked meanwhile
+        kernel = _KERNELS[method](tuple(shape), wavelength, pixel_pitch, z)
+        kernel.setflags(write=False)
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = kernel
+                self._bytes += kernel.nbytes
+                while self._bytes > self.max_bytes and len(self._items) > 1:
+                    _, old = self._items.popitem(last=False)
+                    self._bytes -= old.nbytes
+            return self._items[key]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+# Shared by every caller unless one passes its own cache
+kernel_cache = TransferFunctionCache()
+
+
+# -- Propagation ---------------------------------------------------------------
+def propagate(field, z, wavelength=DEFAULT_WAVELENGTH, pixel_pitch=DEFAULT_PIXEL_PITCH,
+              method="angular_spectrum", cache=None):
+    """Propagate a complex field by distance z (negative z back-propagates)."""
+    spectrum = fft2(np.asarray(field, dtype=np.complex64))
+    return propagate_spectrum(spectrum, z, wavelength, pixel_pitch, method, cache, overwrite=True)
+
+
+def propagate_spectrum(spectrum, z, wavelength=DEFAULT_WAVELENGTH, pixel_pitch=DEFAULT_PIXEL_PITCH,
+                       method="angular_spectrum", cache=None, overwrite=False):
+    """Propagate an already transformed field; lets callers reuse one FFT.
+
+    With ``overwrite`` the spectrum is multiplied in place, saving a copy
+    when the caller has no further use for it.
+    """
+    cache = kernel_cache if cache is None else cache
+    kernel = cache.get(method, spectrum.shape[-2:], wavelength, pixel_pitch, z)
+    if overwrite and spectrum.dtype == kernel.dtype:
+        spectrum *= kernel
+        product = spectrum
+    else:
+        product = spectrum * kernel
+    return ifft2(product, overwrite=True).astype(np.complex64, copy=False)
+
+
+def reconstruct(frame, z=DEFAULT_DISTANCE, wavelength=DEFAULT_WAVELENGTH,
+                pixel_pitch=DEFAULT_PIXEL_PITCH, method="angular_spectrum", cache=None):
+    """Back-propagate a recorded hologram to the object plane z metres away.
+
+    Returns the complex64 object field; use ``intensity``/``amplitude`` and
+    ``to_uint8`` to get something displayable.
+    """
+    # The field is ours, so the forward FFT and the kernel multiply reuse it
+    spectrum = fft2(hologram_field(frame), overwrite=True)
+    return propagate_spectrum(spectrum, -z, wavelength, pixel_pitch, method, cache, overwrite=True)
+
+
+# -- Tiled reconstruction ------------------------------------------------------
+# Overlap-save: each tile is reconstructed from a window that extends past
+# it by the diffraction spread at that distance, so the tile's own pixels
+# see every hologram pixel that can reach them, and only those are kept.
+# Cores abut exactly, so the tiles stitch without seams, and peak memory
+# is a few tiles whatever the sensor size.
+MEAN_SAMPLE_ROWS = 64  # rows read to estimate a frame's mean when it is not given
+
+
+def diffraction_margin(z, wavelength=DEFAULT_WAVELENGTH, pixel_pitch=DEFAULT_PIXEL_PITCH):
+    """Pixels a point spreads over at distance ``z`` (for the highest sampled frequency)."""
+    sin_theta = min(wavelength / (2 * pixel_pitch), 0.99)
+    spread = abs(z) * sin_theta / np.sqrt(1 - sin_theta ** 2)
+    return int(np.ceil(spread / pixel_pitch)) + 8
+
+
+class TileGrid:
+    """Core tiles covering a frame, each with the padded window it is computed from.
+
+    Every window is ``size`` x ``size`` (one FFT length for all tiles, so
+    one transfer function serves them all) and holds its core plus at
+    least ``margin`` pixels on every side.
+    """
+
+    def __init__(self, shape, margin, tile=None):
+        self.shape = tuple(shape[:2])
+        self.margin = int(margin)
+        if not tile:
+            # Big enough that the margins cost less than the core
+            tile = max(512, 2 * self.margin)
+        tile = int(min(tile, max(self.shape)))
+        self.size = fast_length(tile + 2 * self.margin)
+        self.tile = self.size - 2 * self.margin
+        ny, nx = self.shape
+        self.boxes = [(x, y, min(self.tile, nx - x), min(self.tile, ny - y))
+                      for y in range(0, ny, self.tile) for x in range(0, nx, self.tile)]
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def window(self, box):
+        """(x0, y0) of the padded window around the core ``box`` (may lie outside the frame)."""
+        x, y, _, _ = box
+        return x - self.margin, y - self.margin
+
+
+def _read_window(frame, x0, y0, size):
+    """``size`` x ``size`` window of ``frame`` at (x0, y0); the frame is mirrored past its edges."""
+    ny, nx = frame.shape[:2]
+    # Mirror indices (period 2n), then read only the rows/columns needed
+    xs = np.mod(np.arange(x0, x0 + size), 2 * nx)
+    xs = np.where(xs >= nx, 2 * nx - 1 - xs, xs)
+    ys = np.mod(np.arange(y0, y0 + size), 2 * ny)
+    ys = np.where(ys >= ny, 2 * ny - 1 - ys, ys)
+    y_lo, y_hi = int(ys.min()), int(ys.max()) + 1
+    x_lo, x_hi = int(xs.min()), int(xs.max()) + 1
+    block = np.asarray(frame[y_lo:y_hi, x_lo:x_hi])
+    return block[(ys - y_lo)[:, None], (xs - x_lo)[None, :]]
+
+
+def frame_mean(frame, rows=256, sample=None):
+    """Mean gray level, read ``rows`` rows at a time (frames may be memory-mapped).
+
+    With ``sample``, only that many evenly spaced rows are read: an
+    estimate that touches a small fraction of a large frame.
+    """
+    if sample and sample < frame.shape[0]:
+        picked = np.linspace(0, frame.shape[0] - 1, int(sample)).round().astype(np.intp)
+        return float(to_gray(np.asarray(frame[picked])).mean(dtype=np.float64))
+    total = 0.0
+    for start in range(0, frame.shape[0], rows):
+        total += float(to_gray(frame[start:start + rows]).sum(dtype=np.float64))
+    return total / (frame.shape[0] * frame.shape[1])
+
+
+def _finish(field, output):
+    if output == "amplitude":
+        return np.abs(field).astype(np.float32, copy=False)
+    if output == "intensity":
+        return intensity(field).astype(np.float32, copy=False)
+    return field
+
+
+def reconstruct_tile(frame, box, grid, z=DEFAULT_DISTANCE, wavelength=DEFAULT_WAVELENGTH,
+                     pixel_pitch=DEFAULT_PIXEL_PITCH, method="angular_spectrum", mean=None, output="field",
+                     cache=None, workers=None):
+    """Reconstruct the core ``box`` (x, y, w, h) of ``grid``; the frame is read only around it.
+
+    ``mean`` is the whole frame's mean level; without it an estimate from
+    MEAN_SAMPLE_ROWS evenly spaced rows is used.
+    """
+    x0, y0 = grid.window(box)
+    window = _read_window(frame, x0, y0, grid.size)
+    mean = frame_mean(frame, sample=MEAN_SAMPLE_ROWS) if mean is None else mean
+    cache = kernel_cache if cache is None else cache
+    spectrum = fft2(hologram_field(window, mean), workers)
+    spectrum *= cache.get(method, spectrum.shape, wavelength, pixel_pitch, -z)
+    field = ifft2(spectrum, overwrite=True, workers=workers)
+    _, _, w, h = box
+    m = grid.margin
+    return _finish(field[m:m + h, m:m + w].astype(np.complex64), output)
+
+
+def reconstruct_tiled(frame, z=DEFAULT_DISTANCE, wavelength=DEFAULT_WAVELENGTH, pixel_pitch=DEFAULT_PIXEL_PITCH,
+                      method="angular_spectrum", tile=None, output="field", out=None, workers=None,
+                      cache=None, progress=None):
+    """Reconstruct a large frame tile by tile on a thread pool.
+
+    Tiles are ``tile`` px (about; rounded to a fast FFT length with the
+    margin) plus the diffraction margin at ``z``; by default they are
+    sized from the margin. ``out`` (an array or memmap of the frame's
+    shape) receives the result, otherwise one is allocated. Each tile's
+    FFTs run single threaded; ``workers`` tiles run at once.
+    """
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown output: {output}")
+    grid = TileGrid(frame.shape, diffraction_margin(z, wavelength, pixel_pitch), tile)
+    if out is None:
+        out = np.empty(grid.shape, np.complex64 if output == "field" else np.float32)
+    mean = frame_mean(frame)
+    cache = kernel_cache if cache is None else cache
+    workers = workers or os.cpu_count() or 1
+
+    def run(box):
+        x, y, w, h = box
+        out[y:y + h, x:x + w] = reconstruct_tile(frame, box, grid, z, wavelength, pixel_pitch, method, mean,
+                                                 output, cache, workers=1)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded number of tiles in flight so memory stays at a few tiles
+        pending = deque()
+        done = 0
+        for box in grid.boxes:
+            pending.append(pool.submit(run, box))
+            while len(pending) >= 2 * workers or (pending and box is grid.boxes[-1]):
+                pending.popleft().result()
+                done += 1
+                if progress:
+                    progress(done / len(grid), f"tile {done} of {len(grid)}")
+    return out
+
+
+def reconstruct_roi(frame, roi, z=DEFAULT_DISTANCE, wavelength=DEFAULT_WAVELENGTH,
+                    pixel_pitch=DEFAULT_PIXEL_PITCH, method="angular_spectrum", output="field", mean=None,
+                    cache=None):
+    """Reconstruct only the region ``roi`` = (x, y, w, h) of a frame, as one tile.
+
+    The frame is read only around the region (plus the diffraction
+    margin) and, unless ``mean`` (the whole frame's mean level, see
+    frame_mean) is given, at MEAN_SAMPLE_ROWS rows spread over the frame
+    to estimate it, so this is cheap on memory-mapped full-sensor frames.
+    """
+    x, y, w, h = (int(v) for v in roi)
+    ny, nx = frame.shape[:2]
+    if w <= 0 or h <= 0 or x < 0 or y < 0 or x + w > nx or y + h > ny:
+        raise ValueError(f"ROI {roi} is outside the {nx}x{ny} frame")
+    # A one-tile grid the size of the region; its window is read from the full frame
+    grid = TileGrid((h, w), diffraction_margin(z, wavelength, pixel_pitch), max(w, h))
+    return reconstruct_tile(frame, (x, y, w, h), grid, z, wavelength, pixel_pitch, method, mean, output, cache)
+
+
+# -- Z-stacks ------------------------------------------------------------------
+OUTPUTS = ("amplitude", "intensity", "field")
+
+
+class ZStack:
+    """Lazily reconstructed stack of planes at several distances.
+
+    The hologram spectrum is computed once. Planes are reconstructed only
+    when first accessed, a chunk at a time: every chunk builds its transfer
+    functions and inverse FFTs as one batched array operation, with the
+    chunk size chosen so that the working set stays under
+    ``memory_budget`` bytes. Materialized planes are kept (up to
+    ``max_cached_planes``, least recently used dropped first) so repeated
+    access is free; by default as many as fit in ``memory_budget``, and
+    never fewer than one chunk.
+
+    ``output`` selects what is stored per plane: "amplitude" or "intensity"
+    (float32) or the complex "field" (complex64).
+    """
+
+    # Working bytes per pixel per plane: float32 phase + complex64 kernel
+    # (reused for the product) + complex64 inverse FFT output.
+    _BYTES_PER_PIXEL = 4 + 8 + 8
+
+    def __init__(self, frame, distances, wavelength=DEFAULT_WAVELENGTH,
+                 pixel_pitch=DEFAULT_PIXEL_PITCH, method="angular_spectrum",
+                 output="amplitude", memory_budget=1024 ** 3, max_cached_planes=None):
+        if output not in OUTPUTS:
+            raise ValueError(f"Unknown z-stack output: {output}")
+        self.distances = np.atleast_1d(np.asarray(distances, dtype=np.float64))
+        self.wavelength = wavelength
+        self.pixel_pitch = pixel_pitch
+        self.method = method
+        self.output = output
+
+        self.spectrum = fft2(hologram_field(frame))
+        self.shape = self.spectrum.shape
+        self._offset = wavenumber_offset(method, self.shape, wavelength, pixel_pitch)
+
+        plane_bytes = self.shape[0] * self.shape[1] * self._BYTES_PER_PIXEL
+        self.chunk_size = int(max(1, min(len(self.distances), memory_budget // plane_bytes)))
+        if max_cached_planes is None:
+            stored_bytes = self.shape[0] * self.shape[1] * (8 if output == "field" else 4)
+            max_cached_planes = memory_budget // stored_bytes
+        # A chunk is kept whole, so the plane that triggered it is never dropped
+        self.max_cached_planes = int(max(max_cached_planes, self.chunk_size))
+        self._planes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.distances)
+
+    def __getitem__(self, index):
+        index = self._normalize(index)
+        with self._lock:
+            plane = self._planes.get(index)
+            if plane is None:
+                stop = min(index + self.chunk_size, len(self))
+                self._materialize([i for i in range(index, stop) if i not in self._planes])
+                plane = self._planes[index]
+            else:
+                self._planes.move_to_end(index)
+            return plane
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _normalize(self, index):
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("z-stack index out of range")
+        return index
+
+    def is_materialized(self, index):
+        return self._normalize(index) in self._planes
+
+    def materialize(self, indices=None):
+        """Reconstruct the given planes (all by default) in batched chunks."""
+        indices = range(len(self)) if indices is None else indices
+        indices = sorted({self._normalize(i) for i in indices})
+        with self._lock:
+            self._materialize([i for i in indices if i not in self._planes])
+
+    def _materialize(self, indices):
+        for start in range(0, len(indices), self.chunk_size):
+            chunk = indices[start:start + self.chunk_size]
+            # Back-propagation: the object plane sits upstream of the sensor
+            kernels = kernels_from_offset(*self._offset, -self.distances[chunk])
+            kernels *= self.spectrum
+            fields = ifft2(kernels, overwrite=True)
+            del kernels
+            for i, f in zip(chunk, fields):
+                if self.output == "amplitude":
+                    plane = np.abs(f).astype(np.float32, copy=False)
+                elif self.output == "intensity":
+                    plane = intensity(f).astype(np.float32, copy=False)
+                else:
+                    plane = f.astype(np.complex64)
+                self._planes[i] = plane
+            del fields
+            while len(self._planes) > self.max_cached_planes:
+                self._planes.popitem(last=False)
+
+    def release(self, indices=None):
+        """Drop cached planes (all by default) to free their memory."""
+        with self._lock:
+            if indices is None:
+                self._planes.clear()
+            else:
+                for i in indices:
+                    self._planes.pop(self._normalize(i), None)
+
+    def to_array(self):
+        """Materialize everything into one (n, ny, nx) array."""
+        return np.stack([self[i] for i in range(len(self))])
+
+
+def z_stack(frame, start, stop, count, **kwargs):
+    """Convenience wrapper: ``count`` planes evenly spaced from start to stop."""
+    return ZStack(frame, np.linspace(start, stop, int(count)), **kwargs)
+
+
+def amplitude(field):
+    return np.abs(field)
+
+
+def intensity(field):
+    return field.real ** 2 + field.imag ** 2
+
+
+def to_uint8(image, low=0.5, high=99.5):
+    """Stretch a float image to 0-255 using percentiles (robust to hot pixels)."""
+    image = np.asarray(image, dtype=np.float32)
+    # Percentiles on a strided subsample are plenty and much cheaper
+    step = max(1, int(np.sqrt(image.size / 250000)))
+    lo, hi = np.percentile(image[::step, ::step], (low, high))
+    if hi <= lo:
+        hi = lo + 1.0
+    out = (image - lo) * (255.0 / (hi - lo))
+    np.clip(out, 0, 255, out=out)
+    return out.astype(np.uint8)
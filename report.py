@@ -0,0 +1,638 @@
+"""PDF report rendering, shared by MainWindow and the batch command line.
+
+Reports are laid out in two passes: a counting pass on a stand-in canvas
+works out how many pages each sample needs, so every page can be numbered
+"Page X of N" correctly, including inside a consolidated batch report.
+
+Batch reports can also be produced from the command line:
+
+    python report.py samples.csv -o batch_report.pdf
+    python report.py samples.json -o reports/ --per-sample
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import numpy as np
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+LOGO_PATH = "saglo.jpeg"
+
+# Embedded images are resampled to EMBED_DPI for the size they are drawn at
+# and stored as JPEG (lossy, small) or Flate (lossless). Prepared images are
+# cached on disk so regenerating a report reuses them.
+EMBED_DPI = 200
+EMBED_CODECS = ("jpeg", "flate")
+EMBED_CODEC = "jpeg"
+JPEG_QUALITY = 90
+EMBED_CACHE_DIR = os.path.join("cache", "report_images")
+
+REQUIRED_FIELDS = [
+    'college_name', 'department', 'user', 'print_time', 'page_number', 'total_pages',
+    'sample_name', 'solvent', 'analysis', 'method', 'plate_material',
+    'batch_no', 'ar_no', 'equipment_no', 'reviewed_by', 'reviewed_date',
+    'analysed_by', 'analysed_date', 'software_version', 'status',
+    'image_name', 'image_captured_date', 'created_date', 'field_name'
+]
+
+
+def missing_fields(data):
+    """Names of required report fields that are absent or blank."""
+    return [key for key in REQUIRED_FIELDS if key not in data or not str(data[key]).strip()]
+
+
+def _image_size(image):
+    """(width, height) of a file path or an images.ImageHandle."""
+    if isinstance(image, str):
+        if image.lower().endswith(".npy"):
+            shape = np.load(image, mmap_mode='r').shape
+            return shape[1], shape[0]
+        return ImageReader(image).getSize()
+    return image.size
+
+
+def _image_pixels(image):
+    if isinstance(image, str):
+        import images
+
+        handle = images.ImageHandle.from_file(image, cv2.IMREAD_UNCHANGED)
+        if handle is None:
+            raise IOError(f"Failed to load {image}")
+        return handle.array
+    return image.array
+
+
+def _source_hash(image):
+    import images
+
+    if isinstance(image, str):
+        return images.file_hash(image)
+    return image.content_hash()
+
+
+def embedded_image(image, draw_width, draw_height, dpi=EMBED_DPI, codec=EMBED_CODEC,
+                   quality=JPEG_QUALITY, cache_dir=EMBED_CACHE_DIR):
+    """ImageReader for ``image`` resampled to ``dpi`` at the drawn size (points).
+
+    Images are only ever shrunk, with area interpolation. ``codec`` is
+    "jpeg" (passed through to the PDF as-is) or "flate" (PNG on disk,
+    zlib-compressed pixels in the PDF). The result is cached under
+    ``cache_dir`` by source hash, DPI, codec and pixel size; pass
+    ``cache_dir=None`` to skip the cache.
+    """
+    if codec not in EMBED_CODECS:
+        raise ValueError(f"Unknown image codec: {codec}")
+    src_w, src_h = _image_size(image)
+    scale = min(1.0, draw_width / 72.0 * dpi / src_w, draw_height / 72.0 * dpi / src_h)
+    size = (max(1, round(src_w * scale)), max(1, round(src_h * scale)))
+    ext = ".jpg" if codec == "jpeg" else ".png"
+
+    cache_path = None
+    if cache_dir:
+        quality_tag = f"q{quality}" if codec == "jpeg" else ""
+        name = f"{_source_hash(image)}_{dpi}dpi_{size[0]}x{size[1]}_{codec}{quality_tag}{ext}"
+        cache_path = os.path.join(cache_dir, name)
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                return ImageReader(io.BytesIO(f.read()))
+
+    pixels = _image_pixels(image)
+    if pixels.dtype != np.uint8:
+        pixels = cv2.normalize(pixels, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+    if pixels.ndim == 3 and pixels.shape[2] == 4:
+        pixels = cv2.cvtColor(pixels, cv2.COLOR_BGRA2BGR)
+    if size != (src_w, src_h):
+        pixels = cv2.resize(pixels, size, interpolation=cv2.INTER_AREA)
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if codec == "jpeg" else [cv2.IMWRITE_PNG_COMPRESSION, 6]
+    ok, buf = cv2.imencode(ext, pixels, params)
+    if not ok:
+        raise IOError(f"Failed to encode image as {codec}")
+    data = buf.tobytes()
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)  # atomic, batch workers may race
+    return ImageReader(io.BytesIO(data))
+
+
+def _resolution_note(image, embed):
+    src_w, src_h = _image_size(image)
+    dpi, codec, quality = embed
+    encoding = f"JPEG q{quality}" if codec == "jpeg" else "Flate"
+    return f"Original {src_w} x {src_h} px; embedded at {dpi} dpi, {encoding}"
+
+
+class _PageCounter:
+    """Stands in for a canvas during the counting pass; draws nothing."""
+
+    def __init__(self):
+        self.pages = 0
+
+    def showPage(self):
+        self.pages += 1
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def _render(c, data, image, focus, extra_images, first_page, total_pages, warnings, progress=None,
+            embed=(EMBED_DPI, EMBED_CODEC, JPEG_QUALITY), tables=()):
+    """Draw one sample starting on ``first_page``; returns the pages used.
+
+    ``progress(fraction, message)`` is called before each image is drawn.
+    ``embed`` is the (dpi, codec, quality) used for embedded images.
+    """
+    measuring = isinstance(c, _PageCounter)
+    data = dict({key: '' for key in REQUIRED_FIELDS}, **data)
+    w, h = A4
+    margin = 40
+    y = h - margin
+
+    # === Draw Header Logo ===
+    logo_path = LOGO_PATH
+    logo_height = 50  # desired height in points
+    logo_drawn = False
+    if os.path.exists(logo_path):
+        try:
+            c.drawImage(logo_path, margin, y - logo_height, height=logo_height, preserveAspectRatio=True, mask='auto')
+            logo_drawn = True
+        except Exception as e:
+            warnings.append(f"Could not load logo: {e}")
+    if logo_drawn:
+        y -= (logo_height + 10)  # Add spacing below logo
+    else:
+        y -= 20  # fallback spacing
+
+    def draw_label_value(label, value, x, y, label_width=100):
+        c.drawString(x, y, f"{label}:")
+        c.drawString(x + label_width, y, str(value))
+
+    # Title
+    c.setFont("Helvetica-Bold", 14)
+    c.drawCentredString(w / 2, y, str(data['college_name']))
+    y -= 20
+    c.setFont("Helvetica", 10)
+    draw_label_value("Department", data['department'], margin, y)
+    draw_label_value("User", data['user'], w / 2, y)
+    y -= 15
+    draw_label_value("Print Time", data['print_time'], margin, y)
+    c.drawRightString(w - margin, y, f"Page {first_page} of {total_pages}")
+    y -= 15
+    c.line(margin, y, w - margin, y)
+
+    # Sample info
+    y -= 30
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin, y, "Sample Details:")
+    y -= 15
+    c.setFont("Helvetica", 10)
+    draw_label_value("Sample Name", data['sample_name'], margin, y)
+    draw_label_value("Solvent", data['solvent'], w / 2, y)
+    y -= 15
+    draw_label_value("Analysis", data['analysis'], margin, y)
+    draw_label_value("Method", data['method'], w / 2, y)
+    y -= 15
+    draw_label_value("Slide Material", data['plate_material'], margin, y)
+    y -= 15
+    draw_label_value("Batch Number", data['batch_no'], margin, y)
+    draw_label_value("AR Number", data['ar_no'], w / 2, y)
+    y -= 15
+    draw_label_value("Equipment Number", data['equipment_no'], margin, y)
+    y -= 15
+    c.line(margin, y, w - margin, y)
+
+    # Authorization
+    y -= 30
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin, y, "Authorization:")
+    y -= 15
+    c.setFont("Helvetica", 10)
+    draw_label_value("Reviewed By", data['reviewed_by'], margin, y)
+    draw_label_value("Date", data['reviewed_date'], w / 2, y)
+    y -= 15
+    draw_label_value("Analysed By", data['analysed_by'], margin, y)
+    draw_label_value("Date", data['analysed_date'], w / 2, y)
+    y -= 15
+    draw_label_value("Software Version", data['software_version'], margin, y)
+    draw_label_value("Status", data['status'], w / 2, y)
+    y -= 15
+    c.line(margin, y, w - margin, y)
+
+    # Image Metadata
+    y -= 30
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(margin, y, "Image Info:")
+    y -= 15
+    c.setFont("Helvetica", 10)
+    draw_label_value("Image Name", data['image_name'], margin, y)
+    y -= 15
+    draw_label_value("Image Captured Date", data['image_captured_date'], margin, y)
+    draw_label_value("Created Date", data['created_date'], w / 2, y)
+    y -= 15
+    draw_label_value("Magnigication", data['field_name'], margin, y)
+    if focus is not None:
+        draw_label_value("Focus Distance", f"{focus.z * 1e3:.3f} mm ({focus.metric})", w / 2, y)
+    y -= 15
+    c.line(margin, y, w - margin, y)
+
+    page = [first_page]
+
+    def end_page():
+        c.setFont("Helvetica-Oblique", 9)
+        c.setFillColorRGB(0.4, 0.4, 0.4)  # gray color
+        c.drawCentredString(w / 2, 20, "Report generated by SAGLO-Holosoft Software")
+        c.drawRightString(w - margin, 20, f"Page {page[0]} of {total_pages}")
+        c.showPage()
+        page[0] += 1
+
+    note_height = 12  # resolution note under every image
+
+    def draw_note(image, y):
+        c.setFont("Helvetica-Oblique", 8)
+        c.setFillColorRGB(0.4, 0.4, 0.4)
+        c.drawString(margin, y + 2, _resolution_note(image, embed))
+        c.setFillColorRGB(0, 0, 0)
+
+    def fit(image):
+        # Full text width, but never taller than one page
+        img_width, img_height = _image_size(image)
+        max_height = h - 2 * margin - 40 - note_height
+        draw_width = w - 2 * margin
+        draw_height = draw_width * img_height / img_width
+        if draw_height > max_height:
+            draw_width *= max_height / draw_height
+            draw_height = max_height
+        return draw_width, draw_height
+
+    # Draw Image with dynamic size and avoid overlap
+    try:
+        draw_width, draw_height = fit(image)
+
+        y -= (draw_height + 20 + note_height)  # leave 20px spacing
+
+        if y < margin:
+            end_page()
+            y = h - margin - draw_height - note_height
+
+        if not measuring:
+            if progress:
+                progress(0.1, "main image")
+            c.drawImage(embedded_image(image, draw_width, draw_height, *embed), margin, y + note_height,
+                        width=draw_width, height=draw_height, preserveAspectRatio=True, mask='auto')
+            draw_note(image, y)
+    except Exception as e:
+        warnings.append(f"Failed to add image: {e}")
+
+    # Measurement tables: a caption, a bold header row, then one line per row
+    row_height = 14
+    for caption, rows in tables:
+        if not rows:
+            continue
+        col_width = (w - 2 * margin) / len(rows[0])
+        if y - 35 - 2 * row_height < margin:
+            end_page()
+            y = h - margin
+        c.setFont("Helvetica-Bold", 12)
+        c.setFillColorRGB(0, 0, 0)
+        y -= 25
+        c.drawString(margin, y, caption)
+        y -= 6
+        for i, row in enumerate(rows):
+            if y - row_height < margin:
+                end_page()
+                y = h - margin
+            y -= row_height
+            c.setFont("Helvetica-Bold" if i == 0 else "Helvetica", 9)
+            for j, cell in enumerate(row):
+                c.drawString(margin + j * col_width + 2, y + 4, str(cell))
+            if i == 0:
+                c.line(margin, y + 1, w - margin, y + 1)
+        y -= 5
+
+    # Additional images, each with a caption, starting new pages as needed
+    for n, (caption, extra) in enumerate(extra_images, 1):
+        try:
+            draw_width, draw_height = fit(extra)
+
+            if y - (draw_height + 35 + note_height) < margin:
+                end_page()
+                y = h - margin
+
+            c.setFont("Helvetica-Bold", 12)
+            c.setFillColorRGB(0, 0, 0)
+            c.drawString(margin, y - 15, caption)
+            y -= (draw_height + 35 + note_height)
+            if not measuring:
+                if progress:
+                    progress(0.1 + 0.7 * n / (len(extra_images) + 1), caption.lower())
+                c.drawImage(embedded_image(extra, draw_width, draw_height, *embed), margin, y + note_height,
+                            width=draw_width, height=draw_height, preserveAspectRatio=True, mask='auto')
+                draw_note(extra, y)
+        except Exception as e:
+            warnings.append(f"Failed to add {caption.lower()} image: {e}")
+
+    end_page()
+    return page[0] - first_page
+
+
+def count_pages(data, image, focus=None, extra_images=(), tables=()):
+    """Number of pages the report for one sample takes."""
+    counter = _PageCounter()
+    _render(counter, data, image, focus, extra_images, 1, 1, [], tables=tables)
+    return counter.pages
+
+
+def draw_report(pdf_path, data, image, focus=None, extra_images=(), first_page=1, total_pages=None,
+                progress=None, dpi=EMBED_DPI, codec=EMBED_CODEC, quality=JPEG_QUALITY, tables=()):
+    """Render the report PDF for one image.
+
+    ``image`` is a file path or an in-memory images.ImageHandle. ``focus``
+    is an optional autofocus.FocusResult and ``extra_images`` a list of
+    (caption, path or handle) drawn after the main image, e.g. the
+    colorized result. ``first_page``/``total_pages`` place the sample inside
+    a larger document; by default the report is numbered on its own.
+    Problems with the logo or an image do not abort the report; they are
+    returned as warning strings.
+
+    ``progress(fraction, message)`` is called as rendering advances. It may
+    raise to abort: nothing is written until the final save, so an aborted
+    report leaves no partial file behind.
+
+    Images are embedded at ``dpi`` for their drawn size, as ``codec``
+    ("jpeg" at ``quality``, or lossless "flate"); each one is captioned
+    with its original pixel size.
+
+    ``tables`` is a list of (caption, rows) drawn after the main image,
+    the first row being the header, e.g. detect.Detection.report_tables().
+    """
+    if total_pages is None:
+        total_pages = first_page - 1 + count_pages(data, image, focus, extra_images, tables)
+    warnings = []
+    c = canvas.Canvas(pdf_path, pagesize=A4)
+    _render(c, data, image, focus, extra_images, first_page, total_pages, warnings, progress,
+            (dpi, codec, quality), tables)
+    if progress:
+        progress(0.85, "writing PDF")
+    c.save()
+    return warnings
+
+
+# -- Batch reports -------------------------------------------------------------
+def load_samples(path):
+    """Read per-sample report fields from a CSV or JSON file.
+
+    CSV: one row per sample with an ``image`` column plus any report
+    fields. JSON: a list of such objects, or {"defaults": {...},
+    "samples": [...]} where the defaults apply to every sample. Relative
+    image paths are resolved against the file's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    defaults = {}
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            content = json.load(f)
+        if isinstance(content, dict):
+            defaults = content.get('defaults', {})
+            content = content.get('samples', [])
+        rows = content
+    else:
+        with open(path, newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    samples = []
+    for row in rows:
+        sample = dict(defaults)
+        sample.update({k: v for k, v in row.items() if v not in (None, '')})
+        if 'image' not in sample:
+            raise ValueError(f"Sample without an 'image' entry in {path}")
+        if not os.path.isabs(sample['image']):
+            sample['image'] = os.path.join(base, sample['image'])
+        sample.setdefault('image_name', os.path.splitext(os.path.basename(sample['image']))[0])
+        samples.append(sample)
+    return samples
+
+
+def _sample_focus(sample):
+    import autofocus
+
+    return autofocus.load_focus(sample['image'])
+
+
+def _render_sample(pdf_path, sample, first_page, total_pages, embed):
+    """Worker: render one sample to its own PDF file."""
+    warnings = [f"Missing field: {key}" for key in missing_fields(sample)]
+    dpi, codec, quality = embed
+    warnings.extend(draw_report(pdf_path, sample, sample['image'], _sample_focus(sample),
+                                first_page=first_page, total_pages=total_pages,
+                                dpi=dpi, codec=codec, quality=quality))
+    return pdf_path, warnings
+
+
+def _copy_objects(part, pages, f, offsets):
+    """Write ``pages`` of the parsed ``part`` and every object they use to ``f``.
+
+    Objects get the next free numbers in ``offsets`` and their references
+    are rewritten to match; returns the new page numbers.
+    """
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+    numbers = {}
+    queue = []
+
+    def number(old):
+        if old not in numbers:
+            numbers[old] = len(offsets)
+            offsets.append(None)
+            queue.append(old)
+        return numbers[old]
+
+    def renumber(obj):
+        # dict/list access, not pypdf's, which would resolve the references
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(number(obj.idnum), 0, None)
+        if isinstance(obj, DictionaryObject):
+            for key, value in dict.items(obj):
+                dict.__setitem__(obj, key, renumber(value))
+        elif isinstance(obj, ArrayObject):
+            for i, value in enumerate(list.__iter__(obj)):
+                list.__setitem__(obj, i, renumber(value))
+        return obj
+
+    page_ids = {page.indirect_reference.idnum for page in pages}
+    kids = [number(page.indirect_reference.idnum) for page in pages]
+    while queue:
+        old = queue.pop()
+        obj = part.get_object(old)
+        if old in page_ids:
+            # Pages now hang off the merged page tree (object 2)
+            dict.pop(obj, "/Parent", None)
+            obj = renumber(obj)
+            obj[NameObject("/Parent")] = IndirectObject(2, 0, None)
+        else:
+            obj = renumber(obj)
+        offsets[numbers[old]] = f.tell()
+        f.write(b"%d 0 obj\n" % numbers[old])
+        obj.write_to_stream(f)
+        f.write(b"\nendobj\n")
+    return kids
+
+
+def _merge_pdfs(parts, output):
+    """Concatenate the rendered parts into ``output``, one part in memory at a time.
+
+    pypdf parses each part (any xref or object-stream layout); its pages
+    and the objects they use are written straight to the output under new
+    numbers. Only byte offsets and page numbers are kept until the page
+    tree, catalog and xref table are written at the end, so memory does
+    not grow with the page count.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ImportError("Consolidated reports need pypdf (pip install pypdf)") from e
+
+    offsets = [0, None, None]  # 1: catalog, 2: page tree (written last)
+    kids = []
+    with open(output, 'wb') as f:
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for path in parts:
+            part = PdfReader(path)
+            # Inherited page attributes are copied onto the pages when listed
+            kids.extend(_copy_objects(part, list(part.pages), f, offsets))
+        offsets[2] = f.tell()
+        f.write(b"2 0 obj\n<< /Type /Pages /Count %d /Kids [ " % len(kids)
+                + b" ".join(b"%d 0 R" % kid for kid in kids) + b" ] >>\nendobj\n")
+        offsets[1] = f.tell()
+        f.write(b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % len(offsets))
+        f.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets[1:]))
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets), xref))
+
+
+def _unique_names(names):
+    """``names`` with repeats suffixed _2, _3, ... so no two are the same."""
+    used = set()
+    unique = []
+    for name in names:
+        candidate, n = name, 1
+        while candidate in used:
+            n += 1
+            candidate = f"{name}_{n}"
+        used.add(candidate)
+        unique.append(candidate)
+    return unique
+
+
+def render_batch(samples, output, per_sample=False, workers=None, log=print, progress=None,
+                 dpi=EMBED_DPI, codec=EMBED_CODEC, quality=JPEG_QUALITY):
+    """Render reports for many samples on a process pool.
+
+    With ``per_sample`` each sample becomes ``output/Report_<name>.pdf``
+    (``_2``, ``_3``, ... added when image names repeat). Otherwise one
+    consolidated PDF is written to ``output``: page numbers are worked out
+    up front, every sample is rendered as its own part in parallel, and
+    the parts are then copied into the output one at a time, so memory
+    does not grow with the number of pages. Returns a summary dict.
+
+    ``progress(fraction, message)`` is called after every finished sample;
+    if it raises, queued samples are dropped and the exception propagates.
+    """
+    workers = workers or os.cpu_count() or 1
+    warnings = {}
+    embed = (dpi, codec, quality)
+
+    if per_sample:
+        os.makedirs(output, exist_ok=True)
+        names = _unique_names([s['image_name'] for s in samples])
+        jobs = [(os.path.join(output, f"Report_{name}.pdf"), s, 1, None, embed)
+                for name, s in zip(names, samples)]
+        outputs = _run_jobs(jobs, workers, warnings, log, progress)
+        return {'reports': outputs, 'pages': None, 'warnings': warnings}
+
+    focus = [_sample_focus(s) for s in samples]
+    pages = [count_pages(s, s['image'], f) for s, f in zip(samples, focus)]
+    total = sum(pages)
+    starts = [1 + sum(pages[:i]) for i in range(len(pages))]
+
+    part_dir = tempfile.mkdtemp(prefix="report_parts_", dir=os.path.dirname(os.path.abspath(output)))
+    try:
+        jobs = [(os.path.join(part_dir, f"{i:06d}.pdf"), s, start, total, embed)
+                for i, (s, start) in enumerate(zip(samples, starts))]
+        parts = _run_jobs(jobs, workers, warnings, log, progress)
+        _merge_pdfs(sorted(parts), output)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+    return {'reports': [output], 'pages': total, 'warnings': warnings}
+
+
+def _run_jobs(jobs, workers, warnings, log, progress=None):
+    outputs = []
+    # Spawned, not forked: the GUI calls this from a worker thread, and a
+    # child forked while other threads hold locks can deadlock
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = set()
+        queue = iter(jobs)
+        # Bounded in-flight work: finished parts are already on disk
+        for job in queue:
+            pending.add(pool.submit(_render_sample, *job))
+            if len(pending) >= workers * 2:
+                break
+        try:
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    pdf_path, sample_warnings = future.result()
+                    outputs.append(pdf_path)
+                    if sample_warnings:
+                        warnings[pdf_path] = sample_warnings
+                    job = next(queue, None)
+                    if job is not None:
+                        pending.add(pool.submit(_render_sample, *job))
+                log(f"{len(outputs)}/{len(jobs)} reports rendered")
+                if progress:
+                    progress(len(outputs) / len(jobs), f"{len(outputs)}/{len(jobs)} reports")
+        except BaseException:
+            # Only the samples already running are waited for on the way out
+            for future in pending:
+                future.cancel()
+            raise
+    return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render batch PDF reports from a CSV/JSON of report fields.")
+    parser.add_argument("samples", help="CSV or JSON file with one entry per sample")
+    parser.add_argument("-o", "--output", default="batch_report.pdf",
+                        help="output PDF (or directory with --per-sample)")
+    parser.add_argument("--per-sample", action="store_true", help="write one PDF per sample")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--dpi", type=int, default=EMBED_DPI, help="print resolution of embedded images")
+    parser.add_argument("--codec", choices=EMBED_CODECS, default=EMBED_CODEC, help="embedded image compression")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG quality (1-100)")
+    args = parser.parse_args(argv)
+
+    summary = render_batch(load_samples(args.samples), args.output, args.per_sample, args.workers,
+                           dpi=args.dpi, codec=args.codec, quality=args.quality)
+    for source, sample_warnings in summary['warnings'].items():
+        for warning in sample_warnings:
+            print(f"{source}: {warning}", file=sys.stderr)
+    print(f"Wrote {len(summary['reports'])} PDF(s)"
+          + (f", {summary['pages']} pages" if summary['pages'] else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
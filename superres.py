@@ -0,0 +1,372 @@
+"""Pixel super-resolution from sub-pixel-shifted hologram sequences.
+
+A sequence of frames of the same sample, each shifted by a fraction of a
+pixel (hand or stage jitter, a tilted source), samples the hologram on a
+finer grid than the sensor pitch. The shifts are estimated by phase
+correlation on a windowed centre crop: one batched FFT per chunk of
+frames for the integer peak, then an upsampled DFT around it (a pair of
+small matrix products per frame) and a parabolic fit for sub-pixel
+precision. The cross-power spectrum is tapered towards high frequencies,
+where noise and the sensor's filtering would otherwise bias the peak;
+check_shifts (``--check``) measures the error on known shifts. Each frame is
+then added onto a grid ``factor`` times finer at its shift; for a fixed
+shift that is one strided slice, so accumulating a frame is a single
+array operation. Grid points no frame landed on are filled by normalized
+convolution. The ``iterative`` method refines that estimate with a few
+rounds of back-projection.
+
+Frames are read and processed a chunk at a time (float32), so only the
+reference crop, one chunk and a few fine-grid arrays are in memory: 64
+frames of 20 MP fuse at 2x in about 2 GB, whatever the frame count.
+
+    sr = super_resolve("bursts/burst_20250101_120000", factor=2, pixel_pitch=1.4e-6)
+    field = recon.reconstruct(sr.image, z, wavelength, sr.pixel_pitch)
+
+Nothing in here imports Qt.
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+import rawstore
+import reconstruction as recon
+from track import Sequence
+
+METHODS = ("shift_and_add", "iterative")
+TAPER_CUTOFF = 0.15  # cycles/px: spectral weighting of the phase correlation
+
+
+# -- Shift estimation ------------------------------------------------------------
+def _crop(frame, size):
+    """Centre ``size`` x ``size`` crop as float32 (size clipped to the frame)."""
+    ny, nx = frame.shape[:2]
+    y0, x0 = (ny - size) // 2, (nx - size) // 2
+    return recon.to_gray(frame[y0:y0 + size, x0:x0 + size]).astype(np.float32)
+
+
+def _window(size):
+    hann = np.hanning(size).astype(np.float32)
+    return hann[:, None] * hann[None, :]
+
+
+def _upsampled_peak(cross, peak, upsample):
+    """Refine integer peaks of the inverse of ``cross`` (k, n, n) by a local upsampled DFT.
+
+    Evaluates the correlation on a 1.5 px neighbourhood of each peak at
+    1/``upsample`` px steps, without a full upsampled FFT, then fits a
+    parabola through the best sample and its neighbours on each axis.
+    """
+    k, n, _ = cross.shape
+    span = int(np.ceil(1.5 * upsample)) | 1  # odd, so the integer peak is a sample
+    offsets = (np.arange(span) - span // 2) / upsample
+    freqs = np.fft.fftfreq(n) * n
+    # (k, span) sample positions around each peak along y and x
+    ys = peak[:, 0:1] + offsets[None, :]
+    xs = peak[:, 1:2] + offsets[None, :]
+    kernel_y = np.exp(2j * np.pi * ys[:, :, None] * freqs[None, None, :] / n).astype(np.complex64)
+    kernel_x = np.exp(2j * np.pi * freqs[None, :, None] * xs[:, None, :] / n).astype(np.complex64)
+    local = np.abs(kernel_y @ cross @ kernel_x)
+    best = local.reshape(k, -1).argmax(axis=1)
+    iy, ix = np.unravel_index(best, (span, span))
+    iy, ix = np.clip(iy, 1, span - 2), np.clip(ix, 1, span - 2)
+    rows = np.arange(k)
+    dy = _parabola(local[rows, iy - 1, ix], local[rows, iy, ix], local[rows, iy + 1, ix])
+    dx = _parabola(local[rows, iy, ix - 1], local[rows, iy, ix], local[rows, iy, ix + 1])
+    return np.stack([ys[rows, iy] + dy / upsample, xs[rows, ix] + dx / upsample], axis=1)
+
+
+def _parabola(left, centre, right):
+    """Vertex offset (in samples, within +-0.5) of the parabola through three samples."""
+    curvature = left - 2 * centre + right
+    offset = np.divide(0.5 * (left - right), curvature, out=np.zeros_like(centre), where=curvature < 0)
+    return np.clip(offset, -0.5, 0.5)
+
+
+def _taper(n, cutoff=TAPER_CUTOFF):
+    """Gaussian weights (n, n) over spatial frequency, ``cutoff`` cycles/px wide."""
+    f = np.fft.fftfreq(n).astype(np.float32)
+    return np.exp(-(f[:, None] ** 2 + f[None, :] ** 2) / (2 * cutoff ** 2))
+
+
+def estimate_shifts(reference, frames, upsample=20, taper=None):
+    """Shifts (k, 2) as (dy, dx) in pixels of each of ``frames`` relative to ``reference``.
+
+    ``reference`` is the windowed crop's spectrum (see ShiftEstimator);
+    positive values mean the frame's content moved down/right. ``taper``
+    weights the whitened cross-power spectrum (see _taper): near the
+    Nyquist frequency its phase is dominated by noise and by how the
+    sensor and any resampling filtered the image, and left at full weight
+    it biases the peak by a tenth of a pixel or more.
+    """
+    spectra = recon.fft2(frames)
+    cross = spectra * np.conj(reference)[None]
+    cross /= np.maximum(np.abs(cross), 1e-12)
+    if taper is not None:
+        cross *= taper
+    correlation = np.abs(recon.ifft2(cross))
+    k, n, _ = correlation.shape
+    flat = correlation.reshape(k, -1).argmax(axis=1)
+    peak = np.stack(np.unravel_index(flat, (n, n)), axis=1).astype(np.float64)
+    peak[peak > n // 2] -= n  # wrap to signed shifts
+    if upsample > 1:
+        peak = _upsampled_peak(cross.astype(np.complex64), peak, upsample)
+    return peak
+
+
+class ShiftEstimator:
+    """Phase correlation of frames against a fixed reference crop."""
+
+    def __init__(self, reference_frame, crop=512, upsample=20):
+        ny, nx = reference_frame.shape[:2]
+        self.crop = int(min(crop, ny, nx))
+        self.upsample = upsample
+        self.window = _window(self.crop)
+        self.taper = _taper(self.crop)
+        self.reference = recon.fft2(self._prepare(reference_frame[None])[0])
+
+    def _prepare(self, frames):
+        crops = np.stack([_crop(f, self.crop) for f in frames])
+        crops -= crops.mean(axis=(1, 2), keepdims=True)
+        crops *= self.window
+        return crops
+
+    def __call__(self, frames):
+        return estimate_shifts(self.reference, self._prepare(frames), self.upsample, self.taper)
+
+
+def check_shifts(frame, crop=512, trials=8, max_shift=3.0, seed=0):
+    """Largest and mean error (px) of the estimator on known, non-circular shifts of ``frame``.
+
+    Shifted copies are resampled (bicubic) from the frame and cropped, so
+    content enters and leaves at the edges as it does between real
+    captures, unlike a circular shift, which phase correlation recovers
+    exactly. Run it on a capture from the camera in use: at 2x the fine
+    grid is 0.5 px, so errors should stay well below about 0.1 px.
+    """
+    image = recon.to_gray(frame)
+    border = int(np.ceil(max_shift)) + 2
+    ny, nx = image.shape
+    if min(ny, nx) <= 2 * border + 16:
+        raise ValueError("Frame too small to check shift estimation")
+    rng = np.random.default_rng(seed)
+    truth = rng.uniform(-max_shift, max_shift, (int(trials), 2))
+
+    def shifted(dy, dx):
+        matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+        moved = cv2.warpAffine(image, matrix, (nx, ny), flags=cv2.INTER_CUBIC)
+        return moved[border:ny - border, border:nx - border]
+
+    estimator = ShiftEstimator(shifted(0.0, 0.0), crop)
+    errors = np.abs(estimator([shifted(dy, dx) for dy, dx in truth]) - truth)
+    return float(errors.max()), float(errors.mean())
+
+
+# -- Fusion ----------------------------------------------------------------------
+def _span(offset, factor, length):
+    """Coarse index range [first, last] whose fine index i * factor + offset is on the grid."""
+    first = max(0, -(offset // factor))
+    last = min(length - 1, (length * factor - 1 - offset) // factor)
+    return first, last
+
+
+def _taps(shift, factor, shape):
+    """Bilinear placement of a frame with ``shift`` on the fine grid.
+
+    Coarse pixel i (centre i + 0.5) shows the reference at i - shift,
+    which is fine position ((i - shift) + 0.5) * factor - 0.5 = i * factor
+    + offset. Each of the four fine pixels around it gets a bilinear
+    weight; every tap is one (weight, fine slice, coarse slice) triple.
+    """
+    axes = []
+    for s, n in zip(shift, shape):
+        offset = (0.5 - s) * factor - 0.5
+        base = int(np.floor(offset))
+        frac = offset - base
+        options = []
+        for o, w in ((base, 1.0 - frac), (base + 1, frac)):
+            first, last = _span(o, factor, n)
+            if w > 1e-6 and last >= first:
+                options.append((w, slice(first * factor + o, last * factor + o + 1, factor),
+                                slice(first, last + 1)))
+        axes.append(options)
+    return [(np.float32(wy * wx), (fy, fx), (cy, cx))
+            for wy, fy, cy in axes[0] for wx, fx, cx in axes[1]]
+
+
+def _fill(total, count, factor, hit=0.25):
+    """Weighted average where samples landed; normalized convolution elsewhere."""
+    sigma = max(0.5, factor / 2.0)
+    smooth_total = cv2.GaussianBlur(total, (0, 0), sigma)
+    smooth_count = cv2.GaussianBlur(count, (0, 0), sigma)
+    image = np.divide(smooth_total, smooth_count, out=np.zeros_like(total), where=smooth_count > 1e-6)
+    sampled = count >= hit
+    image[sampled] = total[sampled] / count[sampled]
+    return image
+
+
+def _box(factor):
+    """Centred 1-D box ``factor`` fine pixels wide (half-weight ends when even)."""
+    if factor % 2:
+        return np.full(factor, 1.0 / factor, np.float32)
+    kernel = np.ones(factor + 1, np.float32)
+    kernel[[0, -1]] = 0.5
+    return kernel / factor
+
+
+class SuperResolution:
+    """A fused fine-grid image and how it was made."""
+
+    def __init__(self, image, factor, pixel_pitch, shifts, coverage, method, source=None):
+        self.image = image  # float32, ``factor`` times the frame size
+        self.factor = factor
+        self.pixel_pitch = pixel_pitch  # of the fine grid
+        self.shifts = shifts  # (frames, 2) dy, dx in sensor pixels
+        self.coverage = coverage  # fraction of fine pixels hit by at least one frame
+        self.method = method
+        self.source = source
+
+    @property
+    def frames(self):
+        return len(self.shifts)
+
+    def to_uint8(self):
+        return recon.to_uint8(self.image)
+
+    def summary(self):
+        return (f"{self.frames} frames, {self.factor}x, {self.pixel_pitch * 1e6:.3f} µm pitch, "
+                f"{self.coverage * 100:.0f}% of the fine grid sampled ({self.method})")
+
+    def report_tables(self):
+        spread = np.ptp(self.shifts, axis=0) if self.frames else np.zeros(2)
+        rows = [("Measurement", "Value"),
+                ("Frames fused", f"{self.frames}"),
+                ("Upsampling", f"{self.factor}x ({self.method.replace('_', ' ')})"),
+                ("Effective pixel pitch", f"{self.pixel_pitch * 1e6:.3f} µm"),
+                ("Shift range (x / y)", f"{spread[1]:.2f} / {spread[0]:.2f} px"),
+                ("Fine grid sampled", f"{self.coverage * 100:.1f} %")]
+        return [("Pixel Super-Resolution", rows)]
+
+    def save(self, base_path):
+        """Write ``<base>_sr.npy`` (float32, with pitch metadata) and a PNG preview; returns both paths."""
+        raw_path = rawstore.write_raw(base_path + "_sr" + rawstore.RAW_EXT, self.image,
+                                      pixel_pitch=self.pixel_pitch, factor=self.factor, method=self.method,
+                                      frames=self.frames, shifts=self.shifts.round(4).tolist(),
+                                      source=self.source)
+        preview_path = base_path + "_sr.png"
+        directory = os.path.dirname(preview_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        cv2.imwrite(preview_path, self.to_uint8())
+        return raw_path, preview_path
+
+
+def _chunks(sequence, chunk):
+    for start in range(0, len(sequence), chunk):
+        indices = range(start, min(start + chunk, len(sequence)))
+        # Own float32 copies: frames are scaled in place and sources may be read-only memmaps
+        yield indices, [np.array(recon.to_gray(sequence.frame(i)), np.float32) for i in indices]
+
+
+def super_resolve(source, factor=2, pixel_pitch=recon.DEFAULT_PIXEL_PITCH, method="shift_and_add",
+                  iterations=3, crop=512, chunk=4, progress=None):
+    """Fuse a shifted sequence (burst directory, raw stack or capture files) onto a finer grid.
+
+    Frames are read ``chunk`` at a time; the first frame is the
+    reference. ``iterative`` re-reads the frames for each of
+    ``iterations`` back-projection rounds.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown super-resolution method: {method}")
+    factor = int(factor)
+    sequence = source if isinstance(source, Sequence) else Sequence(source)
+    n = len(sequence)
+    if n < 2:
+        raise ValueError("Super-resolution needs at least two frames")
+    reference = recon.to_gray(sequence.frame(0))
+    ny, nx = reference.shape
+    reference_mean = float(reference.mean()) or 1.0
+    estimator = ShiftEstimator(reference, crop)
+    del reference
+    passes = 1 + (iterations if method == "iterative" else 0)
+    total = np.zeros((ny * factor, nx * factor), np.float32)
+    count = np.zeros_like(total)
+    shifts = np.zeros((n, 2))
+    gains = np.ones(n)
+
+    def report(step, done):
+        if progress:
+            progress((step * n + done) / (passes * n),
+                     f"{'fusing' if step == 0 else f'refining {step}/{iterations}'}: frame {done} of {n}")
+
+    # Pass 1: shifts and shift-and-add
+    for indices, frames in _chunks(sequence, chunk):
+        shifts[indices.start:indices.stop] = estimator(frames)
+        for i, frame in zip(indices, frames):
+            gains[i] = reference_mean / (float(frame.mean()) or 1.0)
+            frame *= np.float32(gains[i])
+            for weight, fine, coarse in _taps(shifts[i], factor, (ny, nx)):
+                total[fine] += weight * frame[coarse]
+                count[fine] += weight
+        report(0, indices.stop)
+    coverage = float((count >= 0.25).mean())
+    image = _fill(total, count, factor)
+    del total
+
+    # Iterative back-projection: each coarse pixel integrates factor x factor fine pixels
+    box = _box(factor)
+    for step in range(1, passes):
+        error = np.zeros_like(image)
+        count[:] = 0
+        simulated = cv2.sepFilter2D(image, -1, box, box)
+        for indices, frames in _chunks(sequence, chunk):
+            for i, frame in zip(indices, frames):
+                frame *= np.float32(gains[i])
+                taps = _taps(shifts[i], factor, (ny, nx))
+                # Bilinear sample of the simulated frame, then the residual
+                # splatted back with the same weights
+                predicted = np.zeros_like(frame)
+                for weight, fine, coarse in taps:
+                    predicted[coarse] += weight * simulated[fine]
+                residual = frame - predicted
+                for weight, fine, coarse in taps:
+                    error[fine] += weight * residual[coarse]
+                    count[fine] += weight
+            report(step, indices.stop)
+        # Spread each correction back over the fine pixels its coarse pixel covers
+        image += cv2.sepFilter2D(_fill(error, count, factor), -1, box, box)
+
+    name = getattr(source, 'path', None) or (source if isinstance(source, str) else None)
+    return SuperResolution(image, factor, pixel_pitch / factor, shifts, coverage, method, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuse sub-pixel-shifted captures into a finer-pitch hologram.")
+    parser.add_argument("inputs", nargs="+", help="burst directory, raw stack, or capture files/directories/globs")
+    parser.add_argument("-o", "--output", default="superres", help="output base path (_sr.npy/_sr.png added)")
+    parser.add_argument("--factor", type=int, default=2, help="upsampling factor")
+    parser.add_argument("--method", choices=METHODS, default="shift_and_add")
+    parser.add_argument("--iterations", type=int, default=3, help="back-projection rounds (iterative)")
+    parser.add_argument("--pitch", type=float, default=recon.DEFAULT_PIXEL_PITCH * 1e6, help="sensor pitch in µm")
+    parser.add_argument("--chunk", type=int, default=4, help="frames read at a time")
+    parser.add_argument("--check", action="store_true",
+                        help="only measure the shift estimation error on known shifts of the first frame")
+    args = parser.parse_args(argv)
+
+    source = args.inputs[0] if len(args.inputs) == 1 else args.inputs
+    if args.check:
+        worst, mean = check_shifts(Sequence(source).frame(0))
+        print(f"Shift error on known shifts: max {worst:.3f} px, mean {mean:.3f} px")
+        return 0
+    sr = super_resolve(source, args.factor, args.pitch * 1e-6, args.method, args.iterations, chunk=args.chunk,
+                       progress=lambda f, msg: print(msg, end="\r"))
+    print()
+    raw_path, _ = sr.save(args.output)
+    print(f"{sr.summary()}; saved {raw_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
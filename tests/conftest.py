@@ -0,0 +1,34 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reconstruction as recon  # noqa: E402
+
+WAVELENGTH = 532e-9
+PITCH = 1.67e-6
+
+
+def make_hologram(shape=(256, 256), z=1e-3, disks=((0.5, 0.5, 6),), phase=False, seed=0):
+    """In-line hologram of absorbing (or phase) disks ``z`` metres from the sensor.
+
+    ``disks`` are (y, x) as fractions of the frame plus a radius in pixels.
+    """
+    ny, nx = shape
+    yy, xx = np.mgrid[:ny, :nx]
+    obj = np.ones(shape, np.complex64)
+    for fy, fx, r in disks:
+        inside = (yy - fy * ny) ** 2 + (xx - fx * nx) ** 2 <= r * r
+        obj[inside] = np.exp(1j * 1.5) if phase else 0.2
+    field = recon.propagate(obj, z, WAVELENGTH, PITCH)
+    noise = np.random.default_rng(seed).normal(0, 0.002, shape)
+    return (recon.intensity(field) + noise).astype(np.float32)
+
+
+@pytest.fixture
+def hologram():
+    return make_hologram((256, 320), disks=((0.3, 0.3, 5), (0.6, 0.7, 8)))
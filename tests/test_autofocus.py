@@ -0,0 +1,41 @@
+import pytest
+
+import autofocus
+from conftest import PITCH, WAVELENGTH, make_hologram
+
+
+@pytest.mark.parametrize("search", autofocus.SEARCHES)
+@pytest.mark.parametrize("phase_object", [False, True])
+def test_finds_the_focus_distance(search, phase_object):
+    z = 1.7e-3
+    frame = make_hologram((256, 256), z, disks=((0.4, 0.4, 6), (0.6, 0.65, 9)), phase=phase_object)
+    result = autofocus.autofocus(frame, 0.2e-3, 5e-3, WAVELENGTH, PITCH, search=search)
+    assert result.metric == autofocus.DEFAULT_METRIC
+    assert result.z == pytest.approx(z, abs=0.02e-3)
+    assert result.evaluations < 80
+
+
+def test_downsampled_first_pass_and_progress():
+    z = 0.8e-3
+    disks = tuple((y, x, 7) for y in (0.3, 0.5, 0.7) for x in (0.3, 0.5, 0.7))
+    frame = make_hologram((512, 512), z, disks=disks)
+    calls = []
+    result = autofocus.autofocus(frame, 0.2e-3, 5e-3, WAVELENGTH, PITCH, downsample=2,
+                                 progress=lambda f, msg: calls.append(f))
+    assert result.z == pytest.approx(z, abs=0.02e-3)
+    assert len(calls) == result.evaluations
+    assert all(0 < f < 1 for f in calls)
+
+
+def test_result_round_trips_through_the_sidecar(tmp_path):
+    frame = make_hologram((128, 128), 1e-3)
+    result = autofocus.autofocus(frame, 0.5e-3, 2e-3, WAVELENGTH, PITCH, coarse_planes=9)
+    image = str(tmp_path / "capture_1.png")
+    autofocus.save_focus(result, image)
+    loaded = autofocus.load_focus(image)
+    assert loaded.z == result.z and loaded.history == result.history
+
+
+def test_rejects_unknown_metric():
+    with pytest.raises(ValueError):
+        autofocus.autofocus(make_hologram((64, 64)), 1e-3, 2e-3, metric="nope")
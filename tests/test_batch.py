@@ -0,0 +1,65 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import batch
+from conftest import PITCH, WAVELENGTH, make_hologram
+
+DISTANCES = (0.8e-3, 1.2e-3, 1.6e-3, 2.0e-3)
+
+
+@pytest.fixture
+def captures(tmp_path):
+    """Four 16-bit holograms; two share a file name in different folders."""
+    paths = []
+    for i, z in enumerate(DISTANCES):
+        folder = tmp_path / ("a" if i < 2 else "b")
+        folder.mkdir(exist_ok=True)
+        frame = make_hologram((192, 192), z, disks=((0.5, 0.5, 7),), seed=i)
+        path = str(folder / f"capture_{i % 3}.png")
+        cv2.imwrite(path, np.clip(frame * 20000, 0, 65535).astype(np.uint16))
+        paths.append(path)
+    return paths
+
+
+def _run(tmp_path, *args):
+    out = str(tmp_path / "out")
+    argv = [str(tmp_path / "a"), str(tmp_path / "b"), "-o", out, "--pitch", str(PITCH * 1e6),
+            "--wavelength", str(WAVELENGTH * 1e9), "--workers", "2", *args]
+    return out, batch.main(argv)
+
+
+def test_end_to_end(captures, tmp_path):
+    out, status = _run(tmp_path, "--steps", "autofocus,reconstruct", "--z-range", "0.4", "2.4",
+                       "--downsample", "1")
+    assert status == 0
+    with open(os.path.join(out, batch.SUMMARY_FILE)) as f:
+        summary = json.load(f)
+    assert summary['processed'] == 4 and summary['failed'] == 0
+    with open(os.path.join(out, batch.PROGRESS_FILE)) as f:
+        records = {r['source']: r for r in map(json.loads, f)}
+    assert set(records) == set(captures)
+    for path, z in zip(captures, DISTANCES):
+        assert records[path]['z'] == pytest.approx(z, abs=0.1e-3)
+    recons = sorted(name for name in os.listdir(out) if name.endswith("_recon.png"))
+    # capture_0 is in both folders: the second one gets a suffix
+    assert recons == ["capture_0_2_recon.png", "capture_0_recon.png",
+                      "capture_1_recon.png", "capture_2_recon.png"]
+
+
+def test_resume_skips_finished_frames(captures, tmp_path):
+    out, _ = _run(tmp_path, "--steps", "reconstruct")
+    _, status = _run(tmp_path, "--steps", "reconstruct")
+    assert status == 0
+    with open(os.path.join(out, batch.SUMMARY_FILE)) as f:
+        summary = json.load(f)
+    assert summary['skipped'] == 4 and summary['processed'] == 0
+
+
+def test_output_stems_are_stable():
+    paths = ["x/capture_1.png", "y/capture_1.png", "y/capture_2.tif", "z/capture_1.npy"]
+    stems = batch.output_stems(paths)
+    assert [stems[p] for p in paths] == ["capture_1", "capture_1_2", "capture_2", "capture_1_3"]
@@ -0,0 +1,57 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import burst
+import rawstore
+
+
+def test_stack_writer_grows_and_trims(tmp_path):
+    path = str(tmp_path / "stack.npy")
+    frames = [np.full((4, 5), i, np.uint16) for i in range(6)]
+    with rawstore.StackWriter(path, capacity=100, frame_shape=(4, 5), dtype=np.uint16, camera=1) as writer:
+        for i in (2, 0, 1, 4, 3):  # writer threads finish out of order
+            writer[i] = frames[i]
+    raw = rawstore.open_raw(path)
+    assert raw.shape == (5, 4, 5)
+    assert [int(raw[i][0, 0]) for i in range(5)] == [0, 1, 2, 3, 4]
+    assert raw.meta['camera'] == 1
+    # Nothing is reserved for frames that never arrived
+    assert os.path.getsize(path) < 100 * frames[0].nbytes
+
+
+def test_stack_writer_rejects_wrong_shape(tmp_path):
+    writer = rawstore.StackWriter(str(tmp_path / "s.npy"), 4, (4, 5), np.uint8)
+    try:
+        np.testing.assert_raises(ValueError, writer.__setitem__, 0, np.zeros((5, 4), np.uint8))
+    finally:
+        writer.close()
+
+
+def test_raw_burst_records_every_frame(tmp_path):
+    out = str(tmp_path / "burst")
+    recorder = burst.BurstRecorder(out, count=12, fmt="raw", writers=2, min_slots=4, max_slots=4)
+    for i in range(12):
+        frame = np.full((16, 24), i, np.uint8)
+        while not recorder.offer(frame, seq=i):
+            time.sleep(0.001)  # every slot is queued; a real camera would drop this frame
+    assert recorder.wait(10)
+    stats = recorder.stats()
+    assert stats['written'] == stats['recorded'] == 12
+    raw = rawstore.open_raw(os.path.join(out, "frames" + rawstore.RAW_EXT))
+    assert raw.shape == (12, 16, 24)
+    assert [int(raw[i][0, 0]) for i in range(12)] == list(range(12))
+    with open(os.path.join(out, burst.STATS_FILE)) as f:
+        assert len(json.load(f)['timestamps']) == 12
+
+
+def test_stop_keeps_the_frames_recorded(tmp_path):
+    out = str(tmp_path / "burst")
+    recorder = burst.BurstRecorder(out, count=50, fmt="raw")
+    for i in range(5):
+        assert recorder.offer(np.zeros((8, 8), np.uint16))
+    recorder.stop()
+    assert recorder.wait(10)
+    assert rawstore.open_raw(os.path.join(out, "frames" + rawstore.RAW_EXT)).shape == (5, 8, 8)
@@ -0,0 +1,64 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import catalog
+import images
+import rawstore
+
+
+@pytest.fixture
+def store(tmp_path):
+    cat = catalog.Catalog(str(tmp_path / "acquisitions"))
+    yield cat
+    cat.close()
+
+
+def _png(tmp_path, name, value):
+    path = str(tmp_path / name)
+    cv2.imwrite(path, np.full((20, 30), value, np.uint8))
+    return path
+
+
+def test_add_keeps_the_original_bytes(store, tmp_path):
+    path = _png(tmp_path, "upload_1.png", 7)
+    record = store.add_file(path, operator="ana", batch_no="B1")
+    with open(path, 'rb') as a, open(record['full_path'], 'rb') as b:
+        assert a.read() == b.read()
+    assert record['path'].startswith(os.path.join(catalog.OBJECTS_DIR, record['sha1'][:2]))
+    assert store.get(record['id'])['batch_no'] == "B1"
+
+
+def test_same_content_is_stored_once(store, tmp_path):
+    first = store.add_file(_png(tmp_path, "a.png", 9))
+    second = store.add_file(_png(tmp_path, "b.png", 9))
+    assert first['id'] != second['id']
+    assert first['full_path'] == second['full_path']
+
+
+def test_pages_newest_first_with_filters(store, tmp_path):
+    for i in range(7):
+        handle = images.ImageHandle.from_array(np.full((4, 4), i, np.uint8),
+                                               captured_at=f"2026-01-0{i + 1}T10:00:00")
+        store.add(handle, "capture", operator="ana" if i % 2 else "ben")
+    records, cursor = store.page(limit=3)
+    seen = [r['captured_at'] for r in records]
+    while cursor is not None:
+        records, cursor = store.page(cursor, limit=3)
+        seen.extend(r['captured_at'] for r in records)
+    assert seen == sorted(seen, reverse=True) and len(seen) == 7
+    assert store.count(operator="ana") == 3
+    assert store.count(since="2026-01-05") == 3
+
+
+def test_raw_frames_are_linked_not_reencoded(store, tmp_path):
+    frame = np.arange(40 * 50, dtype=np.uint16).reshape(40, 50)
+    path = rawstore.write_raw(str(tmp_path / "capture_1.npy"), frame, camera=2)
+    record = store.add(images.ImageHandle.from_file(path), "capture")
+    stored = rawstore.open_raw(record['full_path'])
+    assert np.array_equal(stored.data, frame)
+    assert stored.meta['camera'] == 2
+    with open(path, 'rb') as a, open(record['full_path'], 'rb') as b:
+        assert a.read() == b.read()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import phase
+
+
+def _gaussian_phase(shape=(200, 240), peak=40.0):
+    ny, nx = shape
+    yy, xx = np.mgrid[:ny, :nx]
+    return (peak * np.exp(-((yy - ny / 2) ** 2 + (xx - nx / 2) ** 2) / (2 * 35.0 ** 2))).astype(np.float32)
+
+
+@pytest.mark.parametrize("method", phase.METHODS)
+def test_unwraps_a_steep_gaussian(method):
+    truth = _gaussian_phase()
+    field = np.exp(1j * truth).astype(np.complex64)
+    unwrapped = phase.unwrap(field, method)
+    error = (unwrapped - unwrapped.mean()) - (truth - truth.mean())
+    assert np.abs(error).max() < 1e-4
+
+
+@pytest.mark.parametrize("quality", phase.QUALITIES)
+def test_quality_maps_and_progress(quality):
+    truth = _gaussian_phase((120, 150), 25.0)
+    amplitude = np.linspace(0.5, 1.0, truth.size, dtype=np.float32).reshape(truth.shape)
+    calls = []
+    unwrapped = phase.unwrap(amplitude * np.exp(1j * truth), "quality_guided", quality,
+                             progress=lambda f, msg: calls.append(f))
+    np.testing.assert_allclose(unwrapped - unwrapped[0, 0], truth - truth[0, 0], atol=1e-3)
+    assert calls and calls == sorted(calls) and calls[-1] <= 1.0
+
+
+def test_phase_map_removes_tilt():
+    ny, nx = 100, 120
+    yy, xx = np.mgrid[:ny, :nx]
+    tilt = 0.3 * xx - 0.2 * yy + 1.0
+    bump = _gaussian_phase((ny, nx), 10.0)
+    result = phase.phase_map(np.exp(1j * (tilt + bump)), method="least_squares")
+    flat = phase.remove_tilt(bump)
+    assert np.abs(result.phase - flat).max() < 1e-2
+    assert result.opl.dtype == np.float32
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        phase.unwrap(np.ones((8, 8), np.complex64), "magic")
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import reconstruction as recon
+from conftest import PITCH, WAVELENGTH, make_hologram
+
+
+def test_propagation_round_trip():
+    rng = np.random.default_rng(1)
+    field = np.exp(1j * rng.uniform(-np.pi, np.pi, (128, 96))).astype(np.complex64)
+    back = recon.propagate(recon.propagate(field, 1e-3, WAVELENGTH, PITCH), -1e-3, WAVELENGTH, PITCH)
+    # Evanescent components are dropped, so allow for a little loss
+    assert np.abs(back - field).mean() < 1e-2
+
+
+@pytest.mark.parametrize("method", recon.METHODS)
+def test_reconstruct_focuses_the_object(method):
+    z = 1e-3
+    frame = make_hologram(z=z)
+    focused = recon.amplitude(recon.reconstruct(frame, z, WAVELENGTH, PITCH, method))
+    blurred = recon.amplitude(recon.reconstruct(frame, z / 2, WAVELENGTH, PITCH, method))
+    centre = focused[128 - 3:128 + 3, 128 - 3:128 + 3].mean()
+    # The twin image lifts it, but in focus the disk's centre is dark
+    assert centre < 0.7 * np.median(focused)
+    assert centre < blurred[128 - 3:128 + 3, 128 - 3:128 + 3].mean()
+
+
+def test_reconstruct_matches_reference(hologram):
+    z = 1.2e-3
+    field = recon.reconstruct(hologram, z, WAVELENGTH, PITCH)
+    assert field.dtype == np.complex64
+    kernel = recon.angular_spectrum_kernel(hologram.shape, WAVELENGTH, PITCH, -z)
+    reference = np.fft.ifft2(np.fft.fft2(np.sqrt(hologram / hologram.astype(np.float64).mean())) * kernel)
+    assert np.abs(field - reference).max() / np.abs(reference).max() < 1e-5
+
+
+def test_reconstruct_leaves_the_frame_untouched(hologram):
+    before = hologram.copy()
+    recon.reconstruct(hologram, 1e-3, WAVELENGTH, PITCH)
+    assert np.array_equal(hologram, before)
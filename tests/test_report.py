@@ -0,0 +1,61 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("reportlab")
+pypdf = pytest.importorskip("pypdf")
+
+import report  # noqa: E402
+
+
+@pytest.fixture
+def samples(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the embedded-image cache is relative
+    image = str(tmp_path / "capture_1.png")
+    cv2.imwrite(image, (np.random.default_rng(0).random((120, 160)) * 255).astype(np.uint8))
+    # A name that looks like a PDF reference must come through as text
+    return [dict(image=image, image_name=f"sample {i} 12 0 R", sample_name=f"S{i}") for i in range(3)]
+
+
+def test_consolidated_report_numbers_pages_across_samples(samples, tmp_path):
+    output = str(tmp_path / "batch.pdf")
+    summary = report.render_batch(samples, output, workers=1, log=lambda message: None)
+    reader = pypdf.PdfReader(output, strict=True)
+    total = summary['pages']
+    assert len(reader.pages) == total
+    texts = [page.extract_text() for page in reader.pages]
+    for number, text in enumerate(texts, 1):
+        assert f"Page {number} of {total}" in text
+    assert sum("12 0 R" in text for text in texts) == len(samples)
+    assert not list(tmp_path.glob("report_parts_*"))
+
+
+def test_merge_keeps_every_page_of_every_part(samples, tmp_path):
+    parts = []
+    for i, sample in enumerate(samples):
+        path = str(tmp_path / f"part{i}.pdf")
+        report.draw_report(path, sample, sample['image'])
+        parts.append(path)
+    # A part written by pypdf with compressed content streams
+    writer = pypdf.PdfWriter(clone_from=parts[0])
+    for page in writer.pages:
+        page.compress_content_streams()
+    writer.write(str(tmp_path / "compressed.pdf"))
+    parts.append(str(tmp_path / "compressed.pdf"))
+
+    output = str(tmp_path / "merged.pdf")
+    report._merge_pdfs(parts, output)
+    merged = pypdf.PdfReader(output, strict=True)
+    expected = [page.extract_text() for part in parts for page in pypdf.PdfReader(part).pages]
+    assert [page.extract_text() for page in merged.pages] == expected
+
+
+def test_per_sample_reports_do_not_overwrite(samples, tmp_path):
+    for sample in samples:
+        sample['image_name'] = "same"
+    summary = report.render_batch(samples, str(tmp_path / "out"), per_sample=True, workers=1,
+                                  log=lambda message: None)
+    names = sorted(os.path.basename(path) for path in summary['reports'])
+    assert names == ["Report_same.pdf", "Report_same_2.pdf", "Report_same_3.pdf"]
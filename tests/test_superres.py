@@ -0,0 +1,28 @@
+import cv2
+import numpy as np
+import pytest
+
+import superres
+
+
+@pytest.fixture(scope="module")
+def texture():
+    rng = np.random.default_rng(3)
+    noise = rng.normal(size=(300, 300)).astype(np.float32)
+    return cv2.GaussianBlur(noise, (0, 0), 2.0)
+
+
+def test_sub_pixel_shifts_of_a_cropped_scene(texture):
+    # Non-circular shifts: content enters and leaves at the edges
+    worst, mean = superres.check_shifts(texture, crop=256, trials=8, max_shift=3.0)
+    assert worst < 0.1
+    assert mean < 0.05
+
+
+def test_estimator_reports_known_shift(texture):
+    matrix = np.float32([[1, 0, 1.25], [0, 1, -0.5]])
+    moved = cv2.warpAffine(texture, matrix, texture.shape[::-1], flags=cv2.INTER_CUBIC)
+    estimator = superres.ShiftEstimator(texture[8:-8, 8:-8], crop=256)
+    (dy, dx), = estimator([moved[8:-8, 8:-8]])
+    assert dy == pytest.approx(-0.5, abs=0.1)
+    assert dx == pytest.approx(1.25, abs=0.1)
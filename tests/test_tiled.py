@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import reconstruction as recon
+from conftest import PITCH, WAVELENGTH, make_hologram
+
+Z = 0.8e-3
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return make_hologram((600, 700), Z, disks=((0.3, 0.3, 6), (0.5, 0.6, 9), (0.8, 0.2, 4)))
+
+
+def _interior(a, border):
+    return a[border:-border, border:-border]
+
+
+def test_tiled_matches_full_frame(frame):
+    full = recon.reconstruct(frame, Z, WAVELENGTH, PITCH)
+    tiled = recon.reconstruct_tiled(frame, Z, WAVELENGTH, PITCH, tile=128, workers=2)
+    assert tiled.shape == full.shape and tiled.dtype == np.complex64
+    # The full-frame FFT wraps around and the tiles mirror, so only
+    # compare where neither edge treatment reaches
+    border = recon.diffraction_margin(Z, WAVELENGTH, PITCH)
+    error = np.abs(_interior(tiled, border) - _interior(full, border)).max()
+    assert error / np.abs(full).max() < 1e-2
+
+
+def test_tiled_into_memmap_with_progress(frame, tmp_path):
+    out = np.lib.format.open_memmap(str(tmp_path / "amp.npy"), mode='w+', dtype=np.float32, shape=frame.shape)
+    calls = []
+    recon.reconstruct_tiled(frame, Z, WAVELENGTH, PITCH, tile=256, output="amplitude", out=out,
+                            progress=lambda f, msg: calls.append(f))
+    expected = np.abs(recon.reconstruct_tiled(frame, Z, WAVELENGTH, PITCH, tile=256))
+    np.testing.assert_allclose(out, expected, rtol=1e-5, atol=1e-6)
+    assert calls[-1] == 1.0
+
+
+def test_roi_matches_tiled(frame):
+    roi = (200, 150, 180, 140)
+    x, y, w, h = roi
+    region = recon.reconstruct_roi(frame, roi, Z, WAVELENGTH, PITCH, mean=recon.frame_mean(frame))
+    tiled = recon.reconstruct_tiled(frame, Z, WAVELENGTH, PITCH, tile=128)[y:y + h, x:x + w]
+    assert region.shape == (h, w)
+    assert np.abs(region - tiled).max() / np.abs(tiled).max() < 5e-3
+
+
+def test_roi_outside_frame_is_rejected(frame):
+    with pytest.raises(ValueError):
+        recon.reconstruct_roi(frame, (650, 0, 100, 100), Z, WAVELENGTH, PITCH)
@@ -0,0 +1,44 @@
+import numpy as np
+
+import reconstruction as recon
+from conftest import PITCH, WAVELENGTH
+
+
+def test_planes_match_single_reconstructions(hologram):
+    distances = np.linspace(0.5e-3, 2e-3, 7)
+    stack = recon.ZStack(hologram, distances, WAVELENGTH, PITCH, output="field", memory_budget=4 << 20)
+    assert stack.chunk_size < len(distances)  # several batched chunks
+    for z, plane in zip(distances, stack):
+        single = recon.reconstruct(hologram, z, WAVELENGTH, PITCH)
+        assert np.abs(plane - single).max() / np.abs(single).max() < 1e-5
+
+
+def test_outputs_agree(hologram):
+    distances = [0.8e-3, 1.6e-3]
+    field = recon.ZStack(hologram, distances, WAVELENGTH, PITCH, output="field").to_array()
+    amplitude = recon.ZStack(hologram, distances, WAVELENGTH, PITCH, output="amplitude").to_array()
+    intensity = recon.ZStack(hologram, distances, WAVELENGTH, PITCH, output="intensity").to_array()
+    assert amplitude.dtype == intensity.dtype == np.float32
+    np.testing.assert_allclose(amplitude, np.abs(field), rtol=1e-5)
+    np.testing.assert_allclose(intensity, np.abs(field) ** 2, rtol=1e-4)
+
+
+def test_planes_are_lazy(hologram):
+    stack = recon.z_stack(hologram, 0.5e-3, 2e-3, 10, wavelength=WAVELENGTH, pixel_pitch=PITCH,
+                          memory_budget=2 << 20)
+    assert not any(stack.is_materialized(i) for i in range(len(stack)))
+    stack[4]
+    assert stack.is_materialized(4)
+    assert not stack.is_materialized(0)
+
+
+def test_plane_cache_is_bounded_by_the_budget(hologram):
+    plane_bytes = hologram.size * 4
+    stack = recon.z_stack(hologram, 0.5e-3, 2e-3, 20, wavelength=WAVELENGTH, pixel_pitch=PITCH,
+                          memory_budget=6 * plane_bytes)
+    assert stack.max_cached_planes == 6
+    for plane in stack:
+        pass
+    cached = sum(stack.is_materialized(i) for i in range(len(stack)))
+    assert 0 < cached <= stack.max_cached_planes
+    assert stack.is_materialized(len(stack) - 1)  # least recently used go first
@@ -0,0 +1,260 @@
+"""Persistent thumbnail cache for image previews.
+
+Thumbnails are keyed by the image's content hash, so a file that moves (or
+a capture that has only just been stored) still hits the cache. Each image
+gets a small pyramid, one JPEG per size in SIZES, all made from a single
+decode. Lookups try an in-memory LRU first, then the disk cache, and only
+then schedule generation on a thread pool. Both caches are bounded in
+bytes and evict the least recently used entries.
+
+Sources can be a file path, an images.ImageHandle, or a catalog record
+(which already carries its hash). Nothing in here imports Qt; callbacks run
+on the worker thread, so GUI code should forward them through a signal.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import images
+
+CACHE_DIR = os.path.join("cache", "thumbnails")
+SIZES = (64, 128, 256, 512)  # longest side in pixels
+JPEG_QUALITY = 85
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir=CACHE_DIR, sizes=SIZES, max_disk_bytes=256 << 20,
+                 max_memory_bytes=64 << 20, workers=2):
+        self.cache_dir = cache_dir
+        self.sizes = tuple(sorted(sizes))
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self._memory = OrderedDict()  # (sha1, size) -> array
+        self._memory_bytes = 0
+        self._path_hashes = {}  # (path, mtime, length) -> sha1
+        self._pending = {}  # sha1 -> future
+        self._waiters = {}  # sha1 -> callbacks still wanting the pending future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._disk_bytes = None  # measured lazily on the first write
+
+    # -- Keys ------------------------------------------------------------------
+    def key(self, source):
+        """Content hash of a path, ImageHandle or catalog record."""
+        if isinstance(source, dict):
+            return source['sha1']
+        if isinstance(source, str):
+            stat = os.stat(source)
+            memo = (source, stat.st_mtime_ns, stat.st_size)
+            sha1 = self._path_hashes.get(memo)
+            if sha1 is None:
+                sha1 = self._path_hashes[memo] = images.file_hash(source)
+            return sha1
+        return source.content_hash()
+
+    def level(self, size):
+        """Smallest pyramid size that is at least ``size``."""
+        return next((s for s in self.sizes if s >= size), self.sizes[-1])
+
+    def _file(self, sha1, level):
+        return os.path.join(self.cache_dir, sha1[:2], f"{sha1}_{level}.jpg")
+
+    # -- Lookup ----------------------------------------------------------------
+    def get(self, source, size):
+        """The cached thumbnail (BGR uint8) for ``source``, or None.
+
+        Never decodes the source image; use ``request`` for that.
+        """
+        return self._lookup(self.key(source), self.level(size))
+
+    def _lookup(self, sha1, level):
+        with self._lock:
+            thumb = self._memory.get((sha1, level))
+            if thumb is not None:
+                self._memory.move_to_end((sha1, level))
+                return thumb
+        path = self._file(sha1, level)
+        thumb = cv2.imread(path, cv2.IMREAD_COLOR) if os.path.exists(path) else None
+        if thumb is not None:
+            try:
+                os.utime(path)  # mtime marks recent use for disk eviction
+            except OSError:
+                pass
+            self._remember(sha1, level, thumb)
+        return thumb
+
+    def request(self, source, size, callback=None):
+        """Return the thumbnail now if cached, otherwise generate it in the background.
+
+        ``callback(sha1, thumb)`` runs on a worker thread once the pyramid
+        is ready (thumb is None if the source could not be read). Returns
+        the thumbnail or None.
+        """
+        try:
+            sha1 = self.key(source)
+        except OSError:
+            return None
+        level = self.level(size)
+        thumb = self._lookup(sha1, level)
+        if thumb is not None:
+            return thumb
+        with self._lock:
+            future = self._pending.get(sha1)
+            if future is None:
+                future = self._pending[sha1] = self._pool.submit(self._generate, sha1, source)
+            if callback is not None:
+                self._waiters[sha1] = self._waiters.get(sha1, 0) + 1
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(sha1, self._level_of(f, level)))
+        return None
+
+    def cancel(self, sha1):
+        """Withdraw one callback's interest in a pending thumbnail.
+
+        Generation is dropped if it has not started and nobody else is
+        waiting for it; the callbacks then get None.
+        """
+        with self._lock:
+            waiting = self._waiters.get(sha1, 0) - 1
+            if waiting > 0:
+                self._waiters[sha1] = waiting
+                return
+            self._waiters.pop(sha1, None)
+            future = self._pending.get(sha1)
+            if future is not None and future.cancel():
+                del self._pending[sha1]
+
+    def _level_of(self, future, level):
+        try:
+            pyramid = future.result()
+        except Exception:
+            return None
+        return pyramid.get(level) if pyramid else None
+
+    # -- Generation ------------------------------------------------------------
+    def _generate(self, sha1, source):
+        try:
+            if isinstance(source, dict):
+                source = source['full_path']
+            if isinstance(source, str):
+                # JPEG decoders can skip detail we would throw away anyway
+                flags = cv2.IMREAD_REDUCED_COLOR_2 if source.lower().endswith((".jpg", ".jpeg")) else cv2.IMREAD_COLOR
+                frame = images.read_image(source, flags)
+            else:
+                frame = source.array
+            if frame is None:
+                return None
+            if frame.dtype != np.uint8:
+                frame = cv2.normalize(frame, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            elif frame.shape[2] == 4:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+            pyramid = {}
+            current = frame
+            # Largest first, each level resized from the previous one
+            for level in reversed(self.sizes):
+                scale = level / max(current.shape[:2])
+                if scale < 1:
+                    size = (max(1, round(current.shape[1] * scale)), max(1, round(current.shape[0] * scale)))
+                    current = cv2.resize(current, size, interpolation=cv2.INTER_AREA)
+                pyramid[level] = current
+                self._store(sha1, level, current)
+                self._remember(sha1, level, current)
+            return pyramid
+        finally:
+            with self._lock:
+                self._pending.pop(sha1, None)
+                self._waiters.pop(sha1, None)
+
+    def _remember(self, sha1, level, thumb):
+        with self._lock:
+            key = (sha1, level)
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = thumb
+            self._memory_bytes += thumb.nbytes
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, old = self._memory.popitem(last=False)
+                self._memory_bytes -= old.nbytes
+
+    def _store(self, sha1, level, thumb):
+        path = self._file(sha1, level)
+        ok, buf = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+        if not ok:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buf.tobytes())
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self.disk_usage()
+            else:
+                self._disk_bytes += buf.nbytes
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self.evict()
+
+    # -- Disk maintenance ------------------------------------------------------
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                entries.extend(e for e in os.scandir(shard.path) if e.name.endswith(".jpg"))
+        return entries
+
+    def disk_usage(self):
+        total = 0
+        for entry in self._entries():
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def evict(self):
+        """Delete least recently used files until the disk cache is 80% full."""
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # removed by another thread meanwhile
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.8
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_default = None
+
+
+def default_cache():
+    """The process-wide cache used by the GUI."""
+    global _default
+    if _default is None:
+        _default = ThumbnailCache()
+    return _default
@@ -0,0 +1,521 @@
+"""Multi-object tracking through burst and time-lapse sequences.
+
+Frames are read one at a time from a burst recording (a ``frames.npy``
+stack or numbered PNGs next to ``burst.json``) or a series of
+``capture_<timestamp>`` files, segmented with detect on a small pool of
+threads, and linked to the open tracks as they arrive:
+
+* candidate (track, object) pairs within ``radius`` px of each track's
+  predicted position come from a grid hash with sorted searches, so a
+  frame costs about one lookup per object;
+* pairs that are unambiguous (one candidate each way) are assigned as
+  arrays; the rest are split into connected clusters and each cluster is
+  solved with the Hungarian algorithm (scipy) or greedily by distance;
+* a track that finds no object stays open for ``max_gap`` frames, then
+  is closed: its summary is kept and its points have already gone to
+  the points CSV.
+
+Only the open tracks and one summary row per finished track are held in
+memory, so a sequence of any length runs in linear time.
+
+    tracks = track_sequence("bursts/burst_20250101_120000", "tracks/", pixel_pitch=1.4e-6)
+    tables = tracks.report_tables()
+
+Nothing in here imports Qt.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+import burst
+import detect
+import images
+import rawstore
+import reconstruction as recon
+from localize import components
+
+ASSIGNMENTS = ("hungarian", "nearest")
+POINT_COLUMNS = ("track", "frame", "t_s", "x_px", "y_px", "area_px")
+TRACK_COLUMNS = ("track", "first_frame", "last_frame", "points", "duration_s", "path_um", "net_um",
+                 "mean_speed_um_s", "net_speed_um_s", "straightness")
+POINTS_FILE = "tracks_points.csv"
+TRACKS_FILE = "tracks.csv"
+TRAJECTORIES_FILE = "trajectories.png"
+
+_STAMP = re.compile(r"_(\d{8}_\d{6})(?:_(\d{3}))?")
+
+
+# -- Sequences -------------------------------------------------------------------
+def stamp_time(path):
+    """Capture time (epoch seconds) from a ``<prefix>_YYYYmmdd_HHMMSS[_mmm]`` name, else the mtime."""
+    match = _STAMP.search(os.path.basename(path))
+    if match:
+        t = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+        return t + int(match.group(2) or 0) / 1000.0
+    return os.path.getmtime(path)
+
+
+class Sequence:
+    """A burst recording or a list of capture files, read one frame at a time."""
+
+    def __init__(self, source):
+        self.stack = None
+        self.paths = []
+        self.timestamps = []
+        sources = [source] if isinstance(source, str) else list(source)
+        stats_path = os.path.join(sources[0], burst.STATS_FILE) if len(sources) == 1 else ""
+        if os.path.isfile(stats_path):
+            with open(stats_path) as f:
+                stats = json.load(f)
+            self.timestamps = [entry['t'] if entry else None for entry in stats.get('timestamps', [])]
+            raw_path = os.path.join(sources[0], "frames" + rawstore.RAW_EXT)
+            if os.path.exists(raw_path):
+                self.stack = rawstore.open_raw(raw_path)
+            else:
+                self.paths = sorted(os.path.join(sources[0], name) for name in os.listdir(sources[0])
+                                    if name.startswith("frame_") and name.endswith(".png"))
+            count = len(self.stack) if self.stack is not None else len(self.paths)
+            count = min(count, len(self.timestamps)) if self.timestamps else count
+            self.paths = self.paths[:count]
+            self.count = count
+        elif len(sources) == 1 and sources[0].lower().endswith(rawstore.RAW_EXT):
+            self.stack = rawstore.open_raw(sources[0])
+            self.timestamps = [entry['t'] if entry else None
+                               for entry in self.stack.meta.get('timestamps', [])]
+            self.count = len(self.stack)
+        else:
+            self.paths = sorted(images.find_images(sources), key=stamp_time)
+            self.timestamps = [stamp_time(p) for p in self.paths]
+            self.count = len(self.paths)
+        if len(self.timestamps) < self.count or any(t is None for t in self.timestamps[:self.count]):
+            self.timestamps = []  # incomplete: fall back to frame numbers
+
+    def __len__(self):
+        return self.count
+
+    def time(self, index, frame_interval=1.0):
+        """Seconds since the first frame."""
+        if self.timestamps:
+            return float(self.timestamps[index] - self.timestamps[0])
+        return index * frame_interval
+
+    def frame(self, index):
+        """Grayscale frame ``index`` as an array."""
+        if self.stack is not None:
+            frame = np.asarray(self.stack[index])
+        else:
+            frame = images.read_image(self.paths[index], cv2.IMREAD_ANYDEPTH | cv2.IMREAD_ANYCOLOR)
+            if frame is None:
+                raise IOError(f"Failed to load {self.paths[index]}")
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+
+# -- Linking ---------------------------------------------------------------------
+def pairs_within(ax, ay, bx, by, radius):
+    """All (i, j, squared distance) with point a[i] within ``radius`` of point b[j].
+
+    The b points are bucketed into radius-sized cells and sorted by cell;
+    each a point looks up its own and the eight neighbouring cells with
+    sorted searches.
+    """
+    if not len(ax) or not len(bx):
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    lo_x = min(float(ax.min()), float(bx.min()))
+    lo_y = min(float(ay.min()), float(by.min()))
+    bcx = np.floor((bx - lo_x) / radius).astype(np.int64)
+    bcy = np.floor((by - lo_y) / radius).astype(np.int64)
+    acx = np.floor((ax - lo_x) / radius).astype(np.int64)
+    acy = np.floor((ay - lo_y) / radius).astype(np.int64)
+    span = int(max(bcx.max(), acx.max())) + 3
+    key = (bcy + 1) * span + (bcx + 1)
+    order = np.argsort(key, kind='stable')
+    sorted_key = key[order]
+    found_i, found_j = [], []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            query = (acy + dy + 1) * span + (acx + dx + 1)
+            lo = np.searchsorted(sorted_key, query, 'left')
+            counts = np.searchsorted(sorted_key, query, 'right') - lo
+            if not counts.any():
+                continue
+            i = np.repeat(np.arange(len(ax)), counts)
+            offsets = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+            found_i.append(i)
+            found_j.append(order[np.repeat(lo, counts) + offsets])
+    if not found_i:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0)
+    i, j = np.concatenate(found_i), np.concatenate(found_j)
+    d2 = (ax[i] - bx[j]) ** 2 + (ay[i] - by[j]) ** 2
+    close = d2 <= radius * radius
+    return i[close], j[close], d2[close]
+
+
+def _solve_cluster(i, j, d2, method):
+    """Assignment inside one ambiguous cluster of candidate pairs: (i, j) arrays."""
+    if method == "hungarian":
+        try:
+            from scipy.optimize import linear_sum_assignment
+        except ImportError:
+            linear_sum_assignment = None
+        if linear_sum_assignment is not None:
+            rows, row_index = np.unique(i, return_inverse=True)
+            cols, col_index = np.unique(j, return_inverse=True)
+            big = float(d2.max()) * 1e3 + 1.0  # pairs that are not candidates
+            cost = np.full((len(rows), len(cols)), big)
+            cost[row_index, col_index] = d2
+            r, c = linear_sum_assignment(cost)
+            real = cost[r, c] < big
+            return rows[r[real]], cols[c[real]]
+    # Greedy: closest pair first
+    used_i, used_j, out_i, out_j = set(), set(), [], []
+    for k in np.argsort(d2, kind='stable'):
+        if i[k] not in used_i and j[k] not in used_j:
+            used_i.add(i[k])
+            used_j.add(j[k])
+            out_i.append(i[k])
+            out_j.append(j[k])
+    return np.asarray(out_i, np.int64), np.asarray(out_j, np.int64)
+
+
+def assign(i, j, d2, n_tracks, n_objects, method="hungarian"):
+    """Resolve candidate pairs into a one-to-one assignment: (track, object) arrays."""
+    if not len(i):
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    per_track = np.bincount(i, minlength=n_tracks)
+    per_object = np.bincount(j, minlength=n_objects)
+    simple = (per_track[i] == 1) & (per_object[j] == 1)
+    out_i, out_j = [i[simple]], [j[simple]]
+    rest = ~simple
+    if rest.any():
+        i, j, d2 = i[rest], j[rest], d2[rest]
+        # Clusters of tracks and objects joined by candidate pairs
+        label = components(n_tracks + n_objects, i, n_tracks + j)[i]
+        order = np.argsort(label, kind='stable')
+        bounds = np.flatnonzero(np.r_[True, label[order][1:] != label[order][:-1], True])
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            part = order[start:stop]
+            ci, cj = _solve_cluster(i[part], j[part], d2[part], method)
+            out_i.append(ci)
+            out_j.append(cj)
+    return np.concatenate(out_i).astype(np.int64), np.concatenate(out_j).astype(np.int64)
+
+
+# -- Tracker ---------------------------------------------------------------------
+class Tracks:
+    """Finished tracks, one summary row each (see TRACK_COLUMNS)."""
+
+    def __init__(self, rows, frames, duration, pixel_pitch, trajectories=None, points_path=None):
+        self.rows = rows
+        self.frames = frames
+        self.duration = duration
+        self.pixel_pitch = pixel_pitch
+        self.trajectories = trajectories  # BGR image of all tracks, or None
+        self.points_path = points_path
+        table = np.asarray(rows, np.float64).reshape(-1, len(TRACK_COLUMNS))
+        for k, name in enumerate(TRACK_COLUMNS):
+            setattr(self, name, table[:, k])
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def count(self):
+        return len(self.rows)
+
+    def save_csv(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TRACK_COLUMNS)
+            writer.writerows(self.rows)
+        return path
+
+    def summary(self):
+        result = {'tracks': self.count, 'frames': self.frames, 'duration_s': self.duration}
+        if self.count:
+            speed = self.mean_speed_um_s
+            result.update(points_mean=float(self.points.mean()), points_median=float(np.median(self.points)),
+                          speed_mean_um_s=float(speed.mean()), speed_std_um_s=float(speed.std()),
+                          speed_median_um_s=float(np.median(speed)), speed_max_um_s=float(speed.max()),
+                          net_speed_mean_um_s=float(self.net_speed_um_s.mean()),
+                          straightness_mean=float(self.straightness.mean()))
+        return result
+
+    def report_tables(self, bins=8):
+        s = self.summary()
+        rows = [("Measurement", "Value"),
+                ("Tracks", f"{s['tracks']}"),
+                ("Frames", f"{s['frames']} ({s['duration_s']:.1f} s)")]
+        if self.count:
+            rows += [("Track length (mean / median)", f"{s['points_mean']:.1f} / {s['points_median']:.0f} frames"),
+                     ("Speed (mean ± SD)", f"{s['speed_mean_um_s']:.2f} ± {s['speed_std_um_s']:.2f} µm/s"),
+                     ("Speed (median / max)", f"{s['speed_median_um_s']:.2f} / {s['speed_max_um_s']:.2f} µm/s"),
+                     ("Net velocity (mean)", f"{s['net_speed_mean_um_s']:.2f} µm/s"),
+                     ("Straightness (mean)", f"{s['straightness_mean']:.2f}")]
+        tables = [("Object Tracking", rows)]
+        if self.count:
+            counts, edges = np.histogram(self.mean_speed_um_s, bins=bins)
+            distribution = [("Speed (µm/s)", "Tracks", "Share")]
+            distribution += [(f"{lo:.2f} - {hi:.2f}", f"{n}", f"{n * 100 / self.count:.1f} %")
+                             for lo, hi, n in zip(edges[:-1], edges[1:], counts)]
+            tables.append(("Speed Distribution", distribution))
+        return tables
+
+
+class Tracker:
+    """Streaming frame-to-frame linker.
+
+    Feed each frame's object centroids with ``update``; ``finish`` closes
+    the remaining tracks and returns Tracks. Track points are written to
+    ``points_path`` (CSV) once a track reaches ``min_length`` points;
+    shorter tracks are discarded as noise.
+    """
+
+    def __init__(self, radius=15.0, max_gap=2, min_length=5, method="hungarian",
+                 pixel_pitch=recon.DEFAULT_PIXEL_PITCH, points_path=None, shape=None):
+        if method not in ASSIGNMENTS:
+            raise ValueError(f"Unknown assignment method: {method}")
+        self.radius = float(radius)
+        self.max_gap = int(max_gap)
+        self.min_length = max(1, int(min_length))
+        self.method = method
+        self.pixel_pitch = pixel_pitch
+        self.frames = 0
+        self.last_time = 0.0
+        self.rows = []
+        self._next_id = 1
+        # Open tracks, one entry per track in parallel arrays
+        self._state = {name: np.empty(0, dtype) for name, dtype in (
+            ('id', np.int64), ('x', np.float64), ('y', np.float64), ('vx', np.float64), ('vy', np.float64),
+            ('frame', np.int64), ('t', np.float64), ('first_frame', np.int64), ('t0', np.float64),
+            ('x0', np.float64), ('y0', np.float64), ('points', np.int64), ('path', np.float64))}
+        self._pending = {}  # track id -> rows held until the track is long enough
+        self._points_file = None
+        self._points = None
+        if points_path:
+            directory = os.path.dirname(points_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._points_file = open(points_path, 'w', newline='')
+            self._points = csv.writer(self._points_file)
+            self._points.writerow(POINT_COLUMNS)
+        self.points_path = points_path
+        self.canvas = np.zeros(tuple(shape[:2]) + (3,), np.uint8) if shape is not None else None
+
+    def _color(self, ids):
+        hues = (ids * 47 % 180).astype(np.uint8).reshape(-1, 1, 1)
+        hsv = np.concatenate([hues, np.full_like(hues, 220), np.full_like(hues, 255)], axis=2)
+        return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR).reshape(-1, 3).tolist()
+
+    def _emit(self, ids, points, frame, t, x, y, area):
+        """Write points of tracks that are long enough, hold the others."""
+        rows = zip(ids.tolist(), [frame] * len(ids), [round(t, 6)] * len(ids), np.round(x, 3).tolist(),
+                   np.round(y, 3).tolist(), np.asarray(area).tolist())
+        long_enough = (points >= self.min_length).tolist()
+        reached = (points == self.min_length).tolist()
+        for row, ready, first in zip(rows, long_enough, reached):
+            if not ready:
+                self._pending.setdefault(row[0], []).append(row)
+                continue
+            if first:
+                held = self._pending.pop(row[0], ())
+                if self._points is not None:
+                    self._points.writerows(held)
+            if self._points is not None:
+                self._points.writerow(row)
+
+    def update(self, frame, t, x, y, area=None):
+        """Link one frame's objects (centroid arrays, frame number, time in s)."""
+        x = np.asarray(x, np.float64)
+        y = np.asarray(y, np.float64)
+        area = np.zeros(len(x), np.int64) if area is None else np.asarray(area)
+        state = self._state
+        self.frames += 1
+        self.last_time = t
+
+        # Constant-velocity prediction, across any missed frames
+        elapsed = frame - state['frame']
+        px = state['x'] + state['vx'] * elapsed
+        py = state['y'] + state['vy'] * elapsed
+        i, j, d2 = pairs_within(px, py, x, y, self.radius)
+        ti, oj = assign(i, j, d2, len(px), len(x), self.method)
+
+        # Matched tracks move on
+        step = np.hypot(x[oj] - state['x'][ti], y[oj] - state['y'][ti])
+        gap = np.maximum(elapsed[ti], 1)
+        if self.canvas is not None and len(ti):
+            for color, a, b in zip(self._color(state['id'][ti]),
+                                   np.c_[state['x'][ti], state['y'][ti]].astype(int).tolist(),
+                                   np.c_[x[oj], y[oj]].astype(int).tolist()):
+                cv2.line(self.canvas, tuple(a), tuple(b), color, 1, cv2.LINE_AA)
+        state['vx'][ti] = (x[oj] - state['x'][ti]) / gap
+        state['vy'][ti] = (y[oj] - state['y'][ti]) / gap
+        state['x'][ti] = x[oj]
+        state['y'][ti] = y[oj]
+        state['frame'][ti] = frame
+        state['t'][ti] = t
+        state['points'][ti] += 1
+        state['path'][ti] += step
+
+        # Unmatched objects start tracks
+        new = np.ones(len(x), bool)
+        new[oj] = False
+        n_new = int(new.sum())
+        ids = np.arange(self._next_id, self._next_id + n_new, dtype=np.int64)
+        self._next_id += n_new
+        zeros = np.zeros(n_new)
+        frames = np.full(n_new, frame, np.int64)
+        started = {'id': ids, 'x': x[new], 'y': y[new], 'vx': zeros, 'vy': zeros, 'frame': frames,
+                   't': np.full(n_new, t), 'first_frame': frames, 't0': np.full(n_new, t),
+                   'x0': x[new], 'y0': y[new], 'points': np.ones(n_new, np.int64), 'path': zeros}
+        for name in state:
+            state[name] = np.concatenate([state[name], started[name]])
+        self._emit(np.r_[state['id'][ti], ids], np.r_[state['points'][ti], started['points']], frame, t,
+                   np.r_[x[oj], x[new]], np.r_[y[oj], y[new]], np.r_[area[oj], area[new]])
+
+        # Tracks that have been missing too long are finished
+        self._close(frame - state['frame'] > self.max_gap)
+
+    def _close(self, done):
+        if not done.any():
+            return
+        state = self._state
+        um = self.pixel_pitch * 1e6
+        for k in np.flatnonzero(done):
+            track_id = int(state['id'][k])
+            self._pending.pop(track_id, None)
+            points = int(state['points'][k])
+            if points < self.min_length:
+                continue
+            duration = float(state['t'][k] - state['t0'][k])
+            path = float(state['path'][k]) * um
+            net = float(np.hypot(state['x'][k] - state['x0'][k], state['y'][k] - state['y0'][k])) * um
+            self.rows.append((track_id, int(state['first_frame'][k]), int(state['frame'][k]), points,
+                              round(duration, 6), round(path, 3), round(net, 3),
+                              round(path / duration, 4) if duration > 0 else 0.0,
+                              round(net / duration, 4) if duration > 0 else 0.0,
+                              round(net / path, 4) if path > 0 else 0.0))
+        keep = ~done
+        for name in state:
+            state[name] = state[name][keep]
+
+    def finish(self):
+        """Close all open tracks and the points file; returns Tracks."""
+        self._close(np.ones(len(self._state['id']), bool))
+        if self._points_file is not None:
+            self._points_file.close()
+            self._points_file = None
+        self.rows.sort()
+        return Tracks(self.rows, self.frames, self.last_time, self.pixel_pitch, self.canvas, self.points_path)
+
+
+# -- Whole sequences -------------------------------------------------------------
+def track_sequence(source, out_dir=None, pixel_pitch=recon.DEFAULT_PIXEL_PITCH, z=None,
+                   wavelength=recon.DEFAULT_WAVELENGTH, recon_method="angular_spectrum", radius=15.0, max_gap=2,
+                   min_length=5, assignment="hungarian", frame_interval=1.0, workers=None, progress=None,
+                   **options):
+    """Track objects through a burst directory, a raw stack or capture files.
+
+    Frames are segmented with detect (``options`` are passed on), after
+    reconstruction at ``z`` metres when given. Segmentation runs ahead of
+    linking on ``workers`` threads with a bounded read-ahead. With
+    ``out_dir``, the points, the per-track table and a trajectory image
+    are written there. Times come from the recording's timestamps, or
+    ``frame_interval`` seconds per frame without them.
+    """
+    sequence = Sequence(source)
+    n = len(sequence)
+    if not n:
+        raise ValueError("No frames to track")
+    shape = sequence.frame(0).shape
+    points_path = os.path.join(out_dir, POINTS_FILE) if out_dir else None
+    tracker = Tracker(radius, max_gap, min_length, assignment, pixel_pitch, points_path, shape)
+
+    def segment(index):
+        frame = sequence.frame(index)
+        if z is not None:
+            plane = recon.amplitude(recon.reconstruct(frame, z, wavelength, pixel_pitch, recon_method))
+        else:
+            plane = frame
+        result = detect.detect(plane, None, pixel_pitch, **options)
+        return result.centroids[:, 0], result.centroids[:, 1], result.area
+
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        ahead = deque()
+        submitted = 0
+        for index in range(n):
+            # Keep a bounded number of frames in flight ahead of the linker
+            while submitted < n and submitted - index < 2 * workers:
+                ahead.append(pool.submit(segment, submitted))
+                submitted += 1
+            x, y, area = ahead.popleft().result()
+            tracker.update(index, sequence.time(index, frame_interval), x, y, area)
+            if progress and (index % 10 == 0 or index == n - 1):
+                progress((index + 1) / n, f"frame {index + 1} of {n}")
+    tracks = tracker.finish()
+    if out_dir:
+        tracks.save_csv(os.path.join(out_dir, TRACKS_FILE))
+        cv2.imwrite(os.path.join(out_dir, TRAJECTORIES_FILE), trajectory_image(tracks, sequence.frame(n - 1)))
+    return tracks
+
+
+def trajectory_image(tracks, background=None):
+    """BGR image of all trajectories, drawn over ``background`` (a frame) when given."""
+    lines = tracks.trajectories
+    if background is None:
+        return lines
+    base = cv2.cvtColor(recon.to_uint8(background), cv2.COLOR_GRAY2BGR) // 2
+    if lines is None:
+        return base
+    drawn = lines.any(axis=2)
+    base[drawn] = lines[drawn]
+    return base
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Track objects through a burst recording or capture series.")
+    parser.add_argument("inputs", nargs="+", help="burst directory, raw stack, or capture files/directories/globs")
+    parser.add_argument("-o", "--output", default="tracks", help="output directory")
+    parser.add_argument("--pitch", type=float, default=recon.DEFAULT_PIXEL_PITCH * 1e6, help="pixel pitch in µm")
+    parser.add_argument("--z", type=float, default=None, help="reconstruct at this distance (mm) before detecting")
+    parser.add_argument("--wavelength", type=float, default=recon.DEFAULT_WAVELENGTH * 1e9, help="nm")
+    parser.add_argument("--method", choices=recon.METHODS, default="angular_spectrum")
+    parser.add_argument("--radius", type=float, default=15.0, help="largest move between frames in pixels")
+    parser.add_argument("--max-gap", type=int, default=2, help="frames a track may miss before it ends")
+    parser.add_argument("--min-length", type=int, default=5, help="shortest track kept, in points")
+    parser.add_argument("--assignment", choices=ASSIGNMENTS, default="hungarian")
+    parser.add_argument("--threshold", choices=detect.THRESHOLDS, default="otsu")
+    parser.add_argument("--min-area", type=int, default=9, help="smallest object in pixels")
+    parser.add_argument("--frame-interval", type=float, default=1.0,
+                        help="seconds per frame when the recording has no timestamps")
+    parser.add_argument("--workers", type=int, default=None, help="segmentation threads")
+    args = parser.parse_args(argv)
+
+    source = args.inputs[0] if len(args.inputs) == 1 else args.inputs
+    tracks = track_sequence(source, args.output, args.pitch * 1e-6, None if args.z is None else args.z * 1e-3,
+                            args.wavelength * 1e-9, args.method, args.radius, args.max_gap, args.min_length,
+                            args.assignment, args.frame_interval, args.workers,
+                            progress=lambda f, msg: print(msg, end="\r"),
+                            method=args.threshold, min_area=args.min_area)
+    print()
+    s = tracks.summary()
+    print(f"{s['tracks']} tracks over {s['frames']} frames, written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())